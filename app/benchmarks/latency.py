@@ -0,0 +1,161 @@
+"""
+Concurrent mixed-traffic latency benchmark for the Task Manager API.
+
+Drives a running server with a weighted mix of GET/list/create/update requests
+from many concurrent clients and reports throughput plus p50/p95/p99 latency.
+Run it once against the previous build and once against the current one with
+the same arguments to compare event-loop behaviour under load.
+
+Usage (from app/):
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.latency --base-url http://127.0.0.1:8000 \
+        --concurrency 50 --requests 5000 --seed-tasks 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+import httpx
+
+DEFAULT_MIX = "get=60,list=5,create=15,update=20"
+
+
+def _now_rfc3339() -> str:
+    # Microsecond precision keeps successive writes from the same client ordered
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def parse_mix(spec: str) -> List[Tuple[str, int]]:
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix.append((name.strip(), int(weight)))
+    return mix
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+async def _seed(client: httpx.AsyncClient, count: int) -> List[int]:
+    ids: List[int] = []
+    run = uuid.uuid4().hex[:8]
+    for i in range(count):
+        resp = await client.post(
+            "/tasks",
+            json={
+                "title": f"bench-{run}-{i}",
+                "content": "seeded by benchmarks.latency",
+                "request_timestamp": _now_rfc3339(),
+            },
+        )
+        if resp.status_code == 201 and "id" in resp.json():
+            ids.append(resp.json()["id"])
+    return ids
+
+
+async def _worker(
+    client: httpx.AsyncClient,
+    ops: List[str],
+    weights: List[int],
+    ids: List[int],
+    remaining: List[int],
+    latencies: Dict[str, List[float]],
+    statuses: Dict[str, Dict[int, int]],
+) -> None:
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        op = random.choices(ops, weights)[0]
+        start = time.perf_counter()
+        if op == "get" and ids:
+            resp = await client.get(f"/tasks/{random.choice(ids)}")
+        elif op == "list":
+            resp = await client.get("/tasks")
+        elif op == "update" and ids:
+            resp = await client.put(
+                f"/tasks/{random.choice(ids)}",
+                json={"content": uuid.uuid4().hex, "request_timestamp": _now_rfc3339()},
+            )
+        else:
+            op = "create"
+            resp = await client.post(
+                "/tasks",
+                json={"title": f"bench-{uuid.uuid4().hex}", "request_timestamp": _now_rfc3339()},
+            )
+            if resp.status_code == 201 and "id" in resp.json():
+                ids.append(resp.json()["id"])
+        latencies[op].append((time.perf_counter() - start) * 1000.0)
+        statuses[op][resp.status_code] += 1
+
+
+async def run(args: argparse.Namespace) -> Dict[str, object]:
+    mix = parse_mix(args.mix)
+    ops = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        ids = await _seed(client, args.seed_tasks)
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        remaining = [args.requests]
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                _worker(client, ops, weights, ids, remaining, latencies, statuses)
+                for _ in range(args.concurrency)
+            )
+        )
+        elapsed = time.perf_counter() - start
+
+    everything = [v for samples in latencies.values() for v in samples]
+    report: Dict[str, object] = {
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "requests": len(everything),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(everything) / elapsed, 1) if elapsed else 0.0,
+        "overall_ms": {
+            "p50": round(percentile(everything, 50), 2),
+            "p95": round(percentile(everything, 95), 2),
+            "p99": round(percentile(everything, 99), 2),
+        },
+        "per_op": {},
+    }
+    for op, samples in sorted(latencies.items()):
+        report["per_op"][op] = {
+            "count": len(samples),
+            "p50_ms": round(percentile(samples, 50), 2),
+            "p95_ms": round(percentile(samples, 95), 2),
+            "p99_ms": round(percentile(samples, 99), 2),
+            "statuses": dict(statuses[op]),
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--seed-tasks", type=int, default=500)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted op mix (default: {DEFAULT_MIX})")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Cost of the metrics hooks behind GET /metrics.
+
+Measures, in-process and without a database:
+  - the per-request hook (counter + histogram with method/route/status labels),
+  - the per-query hook (statement classification + histogram),
+  - rendering the registry with a realistic number of series,
+  - end-to-end requests through the full middleware stack (GET /livez over ASGI) with
+    the hooks on and off.
+Compare the per-request numbers with the latency of real routes (benchmarks.latency) to
+judge whether the hooks can stay on in production.
+
+Usage (from app/):
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.metrics_overhead --iterations 200000 --requests 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Callable, Dict
+
+import httpx
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest
+
+import main as app_main
+from core import metrics
+from core.db import _statement_class
+
+
+def _ns_per_call(fn: Callable[[], None], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return round((time.perf_counter() - start) / iterations * 1e9, 1)
+
+
+def hook_costs(iterations: int) -> Dict[str, float]:
+    reg = CollectorRegistry()
+    requests = Counter("r_total", "", ["method", "route", "status"], registry=reg)
+    latency = Histogram("r_seconds", "", ["method", "route", "status"], registry=reg, buckets=metrics.LATENCY_BUCKETS)
+    queries = Histogram("q_seconds", "", ["statement"], registry=reg, buckets=metrics.LATENCY_BUCKETS)
+    labels = ("GET", "/tasks/{task_id}", "200")
+    statement = "SELECT id, title, content FROM tasks WHERE id = %s"
+
+    def request_hook() -> None:
+        requests.labels(*labels).inc()
+        latency.labels(*labels).observe(0.0042)
+
+    def query_hook() -> None:
+        queries.labels(_statement_class(statement)).observe(0.0007)
+
+    # Populate a registry the size of a busy replica: 20 routes x 3 statuses
+    for route in range(20):
+        for code in ("200", "404", "409"):
+            for _ in range(10):
+                requests.labels("GET", f"/route/{route}", code).inc()
+                latency.labels("GET", f"/route/{route}", code).observe(0.01)
+    render_start = time.perf_counter()
+    rounds = 200
+    for _ in range(rounds):
+        generate_latest(reg)
+    return {
+        "request_hook_ns": _ns_per_call(request_hook, iterations),
+        "query_hook_ns": _ns_per_call(query_hook, iterations),
+        "render_us": round((time.perf_counter() - render_start) / rounds * 1e6, 1),
+    }
+
+
+async def _requests_per_second(count: int) -> float:
+    transport = httpx.ASGITransport(app=app_main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(200):  # warm-up
+            await client.get("/livez")
+        start = time.perf_counter()
+        for _ in range(count):
+            await client.get("/livez")
+        return count / (time.perf_counter() - start)
+
+
+async def end_to_end(count: int) -> Dict[str, float]:
+    report: Dict[str, float] = {}
+    for enabled in (False, True, False, True):
+        metrics.METRICS_ENABLED = enabled
+        key = "rps_metrics_on" if enabled else "rps_metrics_off"
+        report[key] = max(report.get(key, 0.0), round(await _requests_per_second(count), 1))
+    on_us = 1e6 / report["rps_metrics_on"]
+    off_us = 1e6 / report["rps_metrics_off"]
+    report["overhead_us_per_request"] = round(on_us - off_us, 2)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    report = {
+        "hooks": hook_costs(args.iterations),
+        "end_to_end": asyncio.run(end_to_end(args.requests)),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
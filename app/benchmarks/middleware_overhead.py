@@ -0,0 +1,102 @@
+"""
+Per-request cost of the correlation-ID middleware: the previous `@app.middleware("http")`
+version (BaseHTTPMiddleware: extra task + body stream copy per request) against the pure
+ASGI CorrelationIdMiddleware, with a no-middleware app as the floor.
+
+Runs in-process over ASGI (no server, no database) on a small JSON route and on a
+streamed response of --chunks chunks.
+
+Usage (from app/):
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.middleware_overhead --requests 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Dict
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from core import metrics
+from core.middleware import CorrelationIdMiddleware
+
+
+def _build_app(kind: str, chunks: int) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/item")
+    async def item():
+        return {"id": 1, "title": "bench", "done": False}
+
+    @app.get("/stream")
+    async def stream():
+        async def body():
+            for i in range(chunks):
+                yield b'{"id":%d}\n' % i
+
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+
+    if kind == "base_http":
+        # The middleware as it was before the ASGI rewrite
+        @app.middleware("http")
+        async def correlation_id_middleware(request: Request, call_next):
+            correlation_id = (
+                request.headers.get("correlation-id")
+                or request.headers.get("correlation_id")
+                or str(uuid.uuid4())
+            )
+            request.state.correlation_id = correlation_id
+            response = await call_next(request)
+            response.headers["x-correlation-id"] = correlation_id
+            response.headers["correlation_id"] = correlation_id
+            return response
+
+    elif kind == "asgi":
+        app.add_middleware(CorrelationIdMiddleware)
+    return app
+
+
+async def _per_request_us(app: FastAPI, path: str, count: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(200):  # warm-up
+            await client.get(path)
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            for _ in range(count):
+                await client.get(path)
+            best = min(best, (time.perf_counter() - start) / count * 1e6)
+        return round(best, 1)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    # Compare the header/context handling only; request metrics are benchmarked separately
+    metrics.METRICS_ENABLED = False
+    report: Dict[str, Dict[str, float]] = {}
+    for path in ("/item", "/stream"):
+        results = {}
+        for kind in ("none", "base_http", "asgi"):
+            results[f"{kind}_us"] = await _per_request_us(_build_app(kind, args.chunks), path, args.requests)
+        results["saved_us_per_request"] = round(results["base_http_us"] - results["asgi_us"], 1)
+        report[path] = results
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--chunks", type=int, default=100)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+On-disk size of the Task Manager tables and of each of their indexes (InnoDB).
+
+Run it against the same database before and after a schema change (e.g. the
+VARCHAR -> DATETIME(6)/DATE migration) and compare the JSON reports. Pair it with
+a write-heavy latency run for the write-path side of the comparison:
+    python -m benchmarks.latency --mix create=50,update=50
+
+Usage (from app/, with DATABASE_URL or DB_* set like for the API):
+    python -m benchmarks.schema_size --analyze
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from typing import Dict
+
+from sqlalchemy import bindparam, text
+
+from core.db import close_db, get_db
+
+TABLES = ["tasks", "scheduled_ops", "task_tombstones"]
+
+
+async def run(args: argparse.Namespace) -> Dict[str, object]:
+    report: Dict[str, object] = {}
+    async with get_db() as conn:
+        if args.analyze:
+            # Refresh the persistent statistics so the page counts below are current
+            for table in TABLES:
+                await conn.execute(text(f"ANALYZE TABLE {table}"))
+        result = await conn.execute(
+            text(
+                """
+                SELECT TABLE_NAME, TABLE_ROWS, DATA_LENGTH, INDEX_LENGTH
+                FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN :tables
+                """
+            ).bindparams(bindparam("tables", expanding=True)),
+            {"tables": TABLES},
+        )
+        for name, rows, data_length, index_length in result.all():
+            report[name] = {
+                "rows_estimate": int(rows or 0),
+                "data_bytes": int(data_length or 0),
+                "index_bytes": int(index_length or 0),
+                "indexes": {},
+            }
+        try:
+            result = await conn.execute(
+                text(
+                    """
+                    SELECT table_name, index_name, stat_value * @@innodb_page_size
+                    FROM mysql.innodb_index_stats
+                    WHERE database_name = DATABASE() AND stat_name = 'size'
+                    """
+                )
+            )
+            for table, index, size in result.all():
+                if table in report:
+                    report[table]["indexes"][index] = int(size)
+        except Exception as e:
+            # Needs SELECT on mysql.innodb_index_stats; table-level totals are still reported
+            report["index_stats_error"] = str(e)
+    await close_db()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--analyze", action="store_true", help="run ANALYZE TABLE first")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
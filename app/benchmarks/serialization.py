@@ -0,0 +1,226 @@
+"""
+Task response serialization: the previous pydantic path (row dicts returned from the route,
+validated against response_model and re-encoded by JSONResponse) against the bytes fast
+path of core.serialization, with orjson and with the stdlib fallback.
+
+First checks on --rows generated rows (non-ASCII, control characters, quotes, NULLs,
+timestamps with and without microseconds) that every encoder produces exactly the bytes of
+the pydantic path, for single tasks, pages and NDJSON lines, both in-process and through
+FastAPI over ASGI. It exits non-zero on any difference, before timing anything.
+
+Then reports encode time per page and requests per second on a page route, in-process over
+ASGI (no server, no database).
+
+Usage (from app/):
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.serialization --rows 2000 --page-size 100 --requests 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from core import serialization
+from core.db import row_to_task
+from core.models import TaskOut
+
+_ALPHABET = (
+    "abcXYZ 0123456789 éàüß Ωλ 中文 😀🚀 \"\\/ <>&' \t\n\r\x00\x01\x1f\x7f    ﻿"
+)
+
+_PAGE = TypeAdapter(List[TaskOut])
+
+
+def _text(rnd: random.Random, max_len: int) -> str:
+    return "".join(rnd.choice(_ALPHABET) for _ in range(rnd.randint(1, max_len)))
+
+
+def generate_rows(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Rows shaped like `SELECT * FROM tasks` results (naive UTC DATETIME(6), TINYINT done).
+    """
+    rnd = random.Random(seed)
+    base = datetime(2025, 1, 1)
+    rows = []
+    for i in range(1, count + 1):
+        created = base + timedelta(seconds=rnd.randint(0, 10**8))
+        if rnd.random() < 0.5:
+            created = created.replace(microsecond=rnd.randint(1, 999_999))
+        rows.append(
+            {
+                "id": i * rnd.randint(1, 10**6),
+                "title": _text(rnd, 60),
+                "content": None if rnd.random() < 0.3 else _text(rnd, 400),
+                "due_date": None if rnd.random() < 0.3 else date(2025, 1, 1) + timedelta(days=rnd.randint(0, 3650)),
+                "done": rnd.randint(0, 1),
+                "created_at": created,
+                "updated_at": created + timedelta(microseconds=rnd.choice((0, 1, 250_000, 10**6))),
+                "last_request_ts": created,
+            }
+        )
+    return rows
+
+
+# The previous code path, step for step
+def pydantic_page(rows: List[Dict[str, Any]]) -> bytes:
+    tasks = _PAGE.validate_python([row_to_task(r) for r in rows])
+    return JSONResponse(_PAGE.dump_python(tasks, mode="json")).body
+
+
+def pydantic_task(row: Dict[str, Any]) -> bytes:
+    return JSONResponse(TaskOut.model_validate(row_to_task(row)).model_dump(mode="json")).body
+
+
+def pydantic_ndjson_line(row: Dict[str, Any]) -> bytes:
+    return TaskOut.model_validate(row_to_task(row)).model_dump_json().encode() + b"\n"
+
+
+def stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def _encoders() -> Dict[str, Dict[str, Callable[[Any], bytes]]]:
+    # name -> (one task, a page, an NDJSON line) encoders over DB rows
+    encoders = {
+        "json": {
+            "task": lambda row: stdlib_dumps(row_to_task(row)),
+            "page": lambda rows: stdlib_dumps([row_to_task(r) for r in rows]),
+            "line": lambda row: stdlib_dumps(row_to_task(row)) + b"\n",
+        }
+    }
+    if serialization.orjson is not None:
+        encoders["orjson"] = {
+            "task": serialization.task_json,
+            "page": serialization.tasks_json,
+            "line": serialization.task_ndjson_line,
+        }
+    return encoders
+
+
+def _build_app(kind: str, rows: List[Dict[str, Any]], page_size: int) -> FastAPI:
+    app = FastAPI()
+
+    if kind == "pydantic":
+
+        @app.get("/tasks", response_model=List[TaskOut])
+        async def page_old():
+            return [row_to_task(r) for r in rows[:page_size]]
+
+        @app.get("/tasks/{index}", response_model=TaskOut)
+        async def task_old(index: int):
+            return row_to_task(rows[index])
+
+    else:
+
+        @app.get("/tasks", response_model=List[TaskOut])
+        async def page_new():
+            return serialization.json_response(serialization.tasks_json(rows[:page_size]))
+
+        @app.get("/tasks/{index}", response_model=TaskOut)
+        async def task_new(index: int):
+            return serialization.json_response(serialization.task_json(rows[index]))
+
+    return app
+
+
+def check_identical(rows: List[Dict[str, Any]], page_size: int) -> Dict[str, Any]:
+    mismatches: List[str] = []
+    for name, encode in _encoders().items():
+        for i, row in enumerate(rows):
+            if encode["task"](row) != pydantic_task(row):
+                mismatches.append(f"{name}: task row {i}")
+            if encode["line"](row) != pydantic_ndjson_line(row):
+                mismatches.append(f"{name}: ndjson row {i}")
+        for start in range(0, len(rows), page_size):
+            page = rows[start:start + page_size]
+            if encode["page"](page) != pydantic_page(page):
+                mismatches.append(f"{name}: page at {start}")
+
+    async def over_asgi() -> None:
+        clients = {}
+        for kind in ("pydantic", "fast"):
+            transport = httpx.ASGITransport(app=_build_app(kind, rows, page_size))
+            clients[kind] = httpx.AsyncClient(transport=transport, base_url="http://bench")
+        paths = ["/tasks", *(f"/tasks/{i}" for i in range(min(len(rows), 200)))]
+        for path in paths:
+            old, new = [await clients[k].get(path) for k in ("pydantic", "fast")]
+            if (old.content, old.headers["content-type"]) != (new.content, new.headers["content-type"]):
+                mismatches.append(f"asgi: {path}")
+        for client in clients.values():
+            await client.aclose()
+
+    asyncio.run(over_asgi())
+    return {"rows": len(rows), "encoders": list(_encoders()), "mismatches": mismatches}
+
+
+def _us_per_call(fn: Callable[[], Any], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return round((time.perf_counter() - start) / iterations * 1e6, 1)
+
+
+def encode_costs(rows: List[Dict[str, Any]], page_size: int, iterations: int) -> Dict[str, float]:
+    page = rows[:page_size]
+    report = {"pydantic_page_us": _us_per_call(lambda: pydantic_page(page), iterations)}
+    for name, encode in _encoders().items():
+        report[f"{name}_page_us"] = _us_per_call(lambda: encode["page"](page), iterations)
+    return report
+
+
+async def _requests_per_second(app: FastAPI, count: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(100):  # warm-up
+            await client.get("/tasks")
+        start = time.perf_counter()
+        for _ in range(count):
+            await client.get("/tasks")
+        return count / (time.perf_counter() - start)
+
+
+async def end_to_end(rows: List[Dict[str, Any]], page_size: int, count: int) -> Dict[str, float]:
+    report: Dict[str, float] = {}
+    apps = {kind: _build_app(kind, rows, page_size) for kind in ("pydantic", "fast")}
+    for kind in ("pydantic", "fast", "pydantic", "fast"):
+        key = f"rps_{kind}"
+        report[key] = max(report.get(key, 0.0), round(await _requests_per_second(apps[kind], count), 1))
+    report["speedup"] = round(report["rps_fast"] / report["rps_pydantic"], 2)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    rows = generate_rows(args.rows)
+    equivalence = check_identical(rows, args.page_size)
+    if equivalence["mismatches"]:
+        print(json.dumps(equivalence, indent=2))
+        sys.exit(1)
+    report = {
+        "encoder": serialization.ENCODER,
+        "equivalence": equivalence,
+        "encode": encode_costs(rows, args.page_size, args.iterations),
+        "end_to_end": asyncio.run(end_to_end(rows, args.page_size, args.requests)),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Compare server.py configurations under the same load.
+
+For each configuration, starts `python server.py` with its env overrides, waits for
+/readyz, drives it with benchmarks.latency from --client-processes load processes (a
+single Python client saturates before a multi-worker server does), stops it and reports
+throughput and latency percentiles side by side.
+
+The server needs a database: export DATABASE_URL (or DB_HOST/DB_USER/...) like for a normal
+run. Each configuration seeds its own tasks.
+
+Usage (from app/):
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.server_configs --requests 5000 --concurrency 64
+    python -m benchmarks.server_configs \\
+        --config "1w-asyncio:WEB_CONCURRENCY=1,SERVER_LOOP=asyncio,SERVER_HTTP=h11" \\
+        --config "4w-uvloop:WEB_CONCURRENCY=4,SERVER_LOOP=uvloop,SERVER_HTTP=httptools"
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+
+from benchmarks import latency
+
+# The previous Dockerfile command (one worker, stdlib loop and h11), then the new knobs
+# one at a time, then everything together
+DEFAULT_CONFIGS = [
+    "1w-asyncio-h11:WEB_CONCURRENCY=1,SERVER_LOOP=asyncio,SERVER_HTTP=h11",
+    "1w-uvloop-httptools:WEB_CONCURRENCY=1,SERVER_LOOP=uvloop,SERVER_HTTP=httptools",
+    "1w-uvloop-httptools-noaccesslog:WEB_CONCURRENCY=1,SERVER_LOOP=uvloop,SERVER_HTTP=httptools,SERVER_ACCESS_LOG=false",
+    "2w-uvloop-httptools:WEB_CONCURRENCY=2,SERVER_LOOP=uvloop,SERVER_HTTP=httptools",
+    "4w-uvloop-httptools:WEB_CONCURRENCY=4,SERVER_LOOP=uvloop,SERVER_HTTP=httptools",
+]
+
+
+def parse_config(spec: str) -> Tuple[str, Dict[str, str]]:
+    name, _, assignments = spec.partition(":")
+    env = {}
+    for part in filter(None, assignments.split(",")):
+        key, _, value = part.partition("=")
+        env[key.strip()] = value.strip()
+    return name.strip(), env
+
+
+def _wait_ready(base_url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/readyz", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server not ready after {timeout}s")
+
+
+def _load_process(args: argparse.Namespace, queue: "multiprocessing.Queue") -> None:
+    queue.put(asyncio.run(latency.run(args)))
+
+
+def _drive(args: argparse.Namespace, base_url: str) -> Dict[str, object]:
+    per_process = argparse.Namespace(
+        base_url=base_url,
+        concurrency=max(1, args.concurrency // args.client_processes),
+        requests=max(1, args.requests // args.client_processes),
+        seed_tasks=args.seed_tasks,
+        mix=args.mix,
+        timeout=args.timeout,
+    )
+    queue: "multiprocessing.Queue" = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=_load_process, args=(per_process, queue))
+        for _ in range(args.client_processes)
+    ]
+    for p in procs:
+        p.start()
+    reports = [queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+    requests = sum(r["requests"] for r in reports)
+    elapsed = max(r["elapsed_s"] for r in reports)
+    statuses: Dict[str, int] = {}
+    for r in reports:
+        for op in r["per_op"].values():
+            for code, n in op["statuses"].items():
+                statuses[str(code)] = statuses.get(str(code), 0) + n
+    return {
+        "requests": requests,
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        # Percentiles of the load processes: mean of the medians, worst tails
+        "p50_ms": round(sum(r["overall_ms"]["p50"] for r in reports) / len(reports), 2),
+        "p95_ms": max(r["overall_ms"]["p95"] for r in reports),
+        "p99_ms": max(r["overall_ms"]["p99"] for r in reports),
+        "statuses": statuses,
+    }
+
+
+def run_config(args: argparse.Namespace, name: str, overrides: Dict[str, str]) -> Dict[str, object]:
+    env = {**os.environ, "SERVER_PORT": str(args.port), **overrides}
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "server.py"],
+        env=env,
+        stdout=subprocess.DEVNULL if not args.server_output else None,
+        stderr=subprocess.DEVNULL if not args.server_output else None,
+    )
+    try:
+        _wait_ready(base_url, args.ready_timeout)
+        result = _drive(args, base_url)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    return {"config": name, "env": overrides, **result}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--config", action="append", default=None,
+        help="name:ENV=VALUE,ENV=VALUE (repeatable; default: a built-in comparison set)",
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=64, help="total concurrent clients")
+    parser.add_argument("--requests", type=int, default=5000, help="total requests per configuration")
+    parser.add_argument("--client-processes", type=int, default=2)
+    parser.add_argument("--seed-tasks", type=int, default=200)
+    parser.add_argument("--mix", default=latency.DEFAULT_MIX)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--ready-timeout", type=float, default=60.0)
+    parser.add_argument("--server-output", action="store_true", help="show the servers' logs")
+    args = parser.parse_args()
+
+    results: List[Dict[str, object]] = []
+    for spec in args.config or DEFAULT_CONFIGS:
+        name, overrides = parse_config(spec)
+        results.append(run_config(args, name, overrides))
+        print(json.dumps(results[-1]), file=sys.stderr)
+    baseline = results[0]["throughput_rps"] or 1.0
+    for r in results:
+        r["vs_first"] = round(r["throughput_rps"] / baseline, 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
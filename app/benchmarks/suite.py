@@ -0,0 +1,599 @@
+"""
+Reproducible load/benchmark suite for the Task Manager API (replaces the load generation of
+terraform/modules/kubernetes/load_test.sh).
+
+Runs named workloads against one target and writes a JSON report (throughput, p50/p95/p99
+latency overall and per operation, status codes, errors) tagged with the git commit, so two
+commits can be compared with --compare.
+
+Targets:
+  inprocess  (default) the app driven over ASGI in this process, lifespan included (the
+             scheduler runs); no network, no server
+  local      `python server.py` started on --port for the run (WEB_CONCURRENCY and
+             SERVER_* from the environment apply), stopped afterwards
+  <URL>      an already running server, e.g. http://127.0.0.1:8000
+Databases (inprocess and local): --db sqlite uses the SQLite backend on a fresh file
+(BENCH_SQLITE_PATH, default /tmp/tasks-bench.db); --db mysql uses DATABASE_URL / DB_*
+like a normal run.
+
+Workloads:
+  read-heavy       point reads, first pages and keyset pages, a trickle of writes
+  write-heavy      updates, creates, and request_timestamp conflicts: stale updates (expected
+                   409) and pairs of concurrent updates of one task racing each other
+  scheduled-burst  bursts of future-dated updates (request_timestamp 0.5-2 s ahead) on
+                   dedicated tasks; also reports the apply lag (execute_at -> visible)
+  list-scan        full keyset scans with limit=1000, NDJSON streams of the whole table
+
+Usage (from app/):
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.suite --db sqlite --output bench-before.json
+    git checkout <other commit>
+    python -m benchmarks.suite --db sqlite --output bench-after.json --compare bench-before.json
+    python -m benchmarks.suite --target http://127.0.0.1:8000 --workload read-heavy --requests 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import platform
+import random
+import signal
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+from benchmarks.latency import percentile
+
+REPORT_VERSION = 1
+
+
+class Workload(NamedTuple):
+    name: str
+    mix: Dict[str, int]
+    seed_tasks: int
+    description: str
+
+
+WORKLOADS: Dict[str, Workload] = {
+    w.name: w
+    for w in (
+        Workload(
+            "read-heavy",
+            {"get": 75, "list": 10, "list_page": 10, "create": 3, "update": 2},
+            2000,
+            "point reads and list pages, 5% writes",
+        ),
+        Workload(
+            "write-heavy",
+            {"update": 40, "create": 20, "stale_update": 15, "race_update": 15, "get": 10},
+            500,
+            "writes with request_timestamp conflicts",
+        ),
+        Workload(
+            "scheduled-burst",
+            {"scheduled_burst": 10, "get": 60, "update": 30},
+            1000,
+            "bursts of future-dated updates plus regular traffic",
+        ),
+        Workload(
+            "list-scan",
+            {"list_page": 50, "get": 35, "scan": 10, "stream": 5},
+            5000,
+            "full keyset scans and NDJSON streams",
+        ),
+    )
+}
+
+SCHEDULED_BURST_SIZE = 25
+# Dedicated tasks for scheduled updates, so no regular update hides their effect
+SCHEDULED_TASKS = 200
+SCAN_PAGE_SIZE = 1000
+SEED_BATCH = 500
+
+
+def rfc3339(dt: datetime) -> str:
+    return dt.isoformat(timespec="microseconds").replace("+00:00", "Z")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _git_commit() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(["git", "status", "--porcelain", "--", "."], capture_output=True, text=True).stdout.strip()
+        )
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    return {
+        "p50": round(percentile(samples, 50), 2),
+        "p95": round(percentile(samples, 95), 2),
+        "p99": round(percentile(samples, 99), 2),
+        "max": round(max(samples, default=0.0), 2),
+        "mean": round(sum(samples) / len(samples), 2) if samples else 0.0,
+    }
+
+
+class Recorder:
+    """
+    Latencies (ms) and status codes per operation.
+    """
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(self, op: str, request: Any) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            resp = await request
+        except httpx.HTTPError as e:
+            self.errors[f"{op}: {type(e).__name__}"] += 1
+            return None
+        self.latencies[op].append((time.perf_counter() - start) * 1000.0)
+        self.statuses[op][str(resp.status_code)] += 1
+        if resp.status_code >= 500:
+            self.errors[f"{op}: HTTP {resp.status_code}"] += 1
+        return resp
+
+
+class _Run:
+    """
+    State of one workload run: the client, the known task ids and the recorder.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, rnd: random.Random, recorder: Recorder) -> None:
+        self.client = client
+        self.rnd = rnd
+        self.rec = recorder
+        self.ids: List[int] = []
+        self.scheduled_ids: List[int] = []
+        self.tag = uuid.uuid4().hex[:8]
+        # (task_id, token, execute_at) of scheduled updates not yet seen applied
+        self.pending: List[Tuple[int, str, datetime]] = []
+        # token -> request_timestamp of every accepted burst write, scheduled or not (a
+        # request that reaches an overloaded server late is applied immediately)
+        self.written: Dict[str, datetime] = {}
+        self.apply_lag_ms: List[float] = []
+        self.scheduled_total = 0
+
+    def _title(self) -> str:
+        return f"bench-{self.tag}-{uuid.UUID(int=self.rnd.getrandbits(128)).hex}"
+
+    async def seed(self, count: int, scheduled: int) -> None:
+        for start in range(0, count + scheduled, SEED_BATCH):
+            n = min(SEED_BATCH, count + scheduled - start)
+            ts = rfc3339(_now() - timedelta(hours=1))
+            body = [{"title": self._title(), "content": "seed" * 16, "request_timestamp": ts} for _ in range(n)]
+            resp = await self.client.post("/tasks:batch", json=body)
+            resp.raise_for_status()
+            for item in resp.json()["results"]:
+                if item["status"] == 201:
+                    self.ids.append(item["body"]["id"])
+        self.rnd.shuffle(self.ids)
+        if scheduled:
+            self.scheduled_ids, self.ids = self.ids[:scheduled], self.ids[scheduled:]
+
+    # Operations
+
+    async def get(self) -> None:
+        await self.rec.call("get", self.client.get(f"/tasks/{self.rnd.choice(self.ids)}"))
+
+    async def list(self) -> None:
+        await self.rec.call("list", self.client.get("/tasks"))
+
+    async def list_page(self) -> None:
+        after = self.rnd.choice(self.ids)
+        await self.rec.call("list_page", self.client.get("/tasks", params={"after_id": after, "limit": 100}))
+
+    async def create(self) -> None:
+        resp = await self.rec.call(
+            "create",
+            self.client.post("/tasks", json={"title": self._title(), "request_timestamp": rfc3339(_now())}),
+        )
+        if resp is not None and resp.status_code == 201:
+            self.ids.append(resp.json()["id"])
+
+    async def update(self) -> None:
+        await self.rec.call(
+            "update",
+            self.client.put(
+                f"/tasks/{self.rnd.choice(self.ids)}",
+                json={"content": uuid.uuid4().hex, "request_timestamp": rfc3339(_now())},
+            ),
+        )
+
+    async def stale_update(self) -> None:
+        # Older than the seed writes: must be rejected with 409
+        await self.rec.call(
+            "stale_update",
+            self.client.put(
+                f"/tasks/{self.rnd.choice(self.ids)}",
+                json={"content": "stale", "request_timestamp": rfc3339(_now() - timedelta(days=1))},
+            ),
+        )
+
+    async def race_update(self) -> None:
+        # Two writers on one task, the older timestamp sent second: one of them may lose
+        task_id = self.rnd.choice(self.ids)
+        now = _now()
+        await asyncio.gather(
+            *(
+                self.rec.call(
+                    "race_update",
+                    self.client.put(
+                        f"/tasks/{task_id}",
+                        json={"content": f"race-{i}", "request_timestamp": rfc3339(now - timedelta(milliseconds=i))},
+                    ),
+                )
+                for i in (0, 1)
+            )
+        )
+
+    async def scheduled_burst(self) -> None:
+        async def one() -> None:
+            task_id = self.rnd.choice(self.scheduled_ids)
+            token = uuid.uuid4().hex
+            execute_at = _now() + timedelta(milliseconds=self.rnd.randint(500, 2000))
+            resp = await self.rec.call(
+                "scheduled",
+                self.client.put(
+                    f"/tasks/{task_id}", json={"content": token, "request_timestamp": rfc3339(execute_at)}
+                ),
+            )
+            if resp is None or resp.status_code != 200:
+                return
+            self.written[token] = execute_at
+            if resp.json().get("scheduled"):
+                self.scheduled_total += 1
+                self.pending.append((task_id, token, execute_at))
+
+        await asyncio.gather(*(one() for _ in range(SCHEDULED_BURST_SIZE)))
+
+    async def scan(self) -> None:
+        start, after, rows = time.perf_counter(), None, 0
+        while True:
+            params: Dict[str, Any] = {"limit": SCAN_PAGE_SIZE}
+            if after is not None:
+                params["after_id"] = after
+            resp = await self.rec.call("scan_page", self.client.get("/tasks", params=params))
+            if resp is None or resp.status_code != 200:
+                return
+            rows += len(resp.json())
+            after = resp.headers.get("x-next-after-id")
+            if after is None:
+                break
+        self.rec.latencies["scan"].append((time.perf_counter() - start) * 1000.0)
+        self.rec.statuses["scan"]["200"] += 1
+
+    async def stream(self) -> None:
+        start = time.perf_counter()
+        try:
+            async with self.client.stream("GET", "/tasks", params={"stream": "true"}) as resp:
+                async for _ in resp.aiter_lines():
+                    pass
+        except httpx.HTTPError as e:
+            self.rec.errors[f"stream: {type(e).__name__}"] += 1
+            return
+        self.rec.latencies["stream"].append((time.perf_counter() - start) * 1000.0)
+        self.rec.statuses["stream"][str(resp.status_code)] += 1
+
+    async def watch_scheduled(self, stop: asyncio.Event, deadline_s: float) -> None:
+        """
+        Poll due scheduled updates until they are visible; the lag is measured from
+        execute_at (resolution: the 50 ms poll period).
+        """
+        give_up: Optional[float] = None
+        while self.pending:
+            if stop.is_set():
+                give_up = give_up or time.monotonic() + deadline_s
+                if time.monotonic() > give_up:
+                    break
+            now = _now()
+            for task_id in {p[0] for p in self.pending if p[2] <= now}:
+                try:
+                    resp = await self.client.get(f"/tasks/{task_id}")
+                except httpx.HTTPError:
+                    continue
+                if resp.status_code != 200:
+                    continue
+                written_at = self.written.get(resp.json().get("content"))
+                if written_at is None:
+                    continue
+                if any(p[0] == task_id and p[2] == written_at for p in self.pending):
+                    self.apply_lag_ms.append((_now() - written_at).total_seconds() * 1000.0)
+                # Earlier writes to the same task were applied before it (or lost to it)
+                self.pending = [p for p in self.pending if p[0] != task_id or p[2] > written_at]
+            await asyncio.sleep(0.05)
+
+    async def watch(self, stop: asyncio.Event, deadline_s: float) -> None:
+        while not stop.is_set():
+            await self.watch_scheduled(stop, deadline_s)
+            await asyncio.sleep(0.05)
+        await self.watch_scheduled(stop, deadline_s)
+
+
+async def _worker(run: _Run, ops: List[str], weights: List[int], remaining: List[int]) -> None:
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        await getattr(run, run.rnd.choices(ops, weights)[0])()
+
+
+async def run_workload(
+    client: httpx.AsyncClient, workload: Workload, args: argparse.Namespace
+) -> Dict[str, Any]:
+    rnd = random.Random(f"{args.seed}:{workload.name}")
+    recorder = Recorder()
+    run = _Run(client, rnd, recorder)
+    scheduled = SCHEDULED_TASKS if "scheduled_burst" in workload.mix else 0
+    seed_started = time.perf_counter()
+    await run.seed(args.seed_tasks or workload.seed_tasks, scheduled)
+    seed_s = time.perf_counter() - seed_started
+
+    ops, weights = list(workload.mix), list(workload.mix.values())
+    remaining = [args.requests]
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(run.watch(stop, 30.0)) if scheduled else None
+    started = time.perf_counter()
+    await asyncio.gather(*(_worker(run, ops, weights, remaining) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    if watcher is not None:
+        await watcher
+
+    # "scan" samples time a whole walk; its pages are counted as "scan_page" requests
+    requests = sum(len(v) for op, v in recorder.latencies.items() if op != "scan")
+    report: Dict[str, Any] = {
+        "description": workload.description,
+        "mix": workload.mix,
+        "seed_tasks": len(run.ids) + len(run.scheduled_ids),
+        "seed_s": round(seed_s, 3),
+        "operations": args.requests,
+        "requests": requests,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": _summary([v for op, samples in recorder.latencies.items() if op != "scan" for v in samples]),
+        "per_op": {
+            op: {"count": len(samples), **_summary(samples), "statuses": dict(recorder.statuses[op])}
+            for op, samples in sorted(recorder.latencies.items())
+        },
+        "errors": dict(recorder.errors),
+    }
+    if scheduled:
+        report["scheduled"] = {
+            "enqueued": run.scheduled_total,
+            "applied_seen": len(run.apply_lag_ms),
+            "not_seen": len(run.pending),
+            "apply_lag_ms": _summary(run.apply_lag_ms),
+        }
+    return report
+
+
+# Targets
+
+
+class _Lifespan:
+    """
+    Runs the ASGI lifespan of `app` (startup/shutdown handlers) for an in-process run.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+        self._queue: "asyncio.Queue[Dict[str, str]]" = asyncio.Queue()
+        self._done: Dict[str, asyncio.Event] = {}
+
+    async def _receive(self) -> Dict[str, str]:
+        return await self._queue.get()
+
+    async def _send(self, message: Dict[str, Any]) -> None:
+        self._done.setdefault(message["type"], asyncio.Event()).set()
+
+    async def _wait(self, message_type: str) -> None:
+        event = self._done.setdefault(message_type, asyncio.Event())
+        await event.wait()
+
+    async def __aenter__(self) -> "_Lifespan":
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+        self._task = asyncio.create_task(self.app(scope, self._receive, self._send))
+        await self._queue.put({"type": "lifespan.startup"})
+        await self._wait("lifespan.startup.complete")
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self._queue.put({"type": "lifespan.shutdown"})
+        await self._wait("lifespan.shutdown.complete")
+        await self._task
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/readyz")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"target not ready after {timeout}s")
+
+
+def _use_fresh_sqlite() -> None:
+    # Read by core.db at import (in-process) or inherited by the server (local)
+    path = os.getenv("BENCH_SQLITE_PATH", "/tmp/tasks-bench.db")
+    for suffix in ("", "-wal", "-shm"):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path + suffix)
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+
+@contextlib.contextmanager
+def local_server(port: int, env: Dict[str, str]) -> Iterator[str]:
+    """
+    `python server.py` on `port` with `env` overrides for the duration of the block.
+    """
+    server = subprocess.Popen(
+        [sys.executable, "server.py"],
+        env={**os.environ, "SERVER_PORT": str(port), **env},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+@contextlib.asynccontextmanager
+async def open_target(args: argparse.Namespace) -> AsyncIterator[httpx.AsyncClient]:
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    if args.db == "sqlite" and args.target in ("inprocess", "local"):
+        _use_fresh_sqlite()
+    if args.target == "inprocess":
+        from main import app
+
+        transport = httpx.ASGITransport(app=app)
+        async with _Lifespan(app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout, limits=limits) as client:
+                await wait_ready(client, args.ready_timeout)
+                yield client
+    elif args.target == "local":
+        env = {"SERVER_ACCESS_LOG": os.getenv("SERVER_ACCESS_LOG", "false")}
+        with local_server(args.port, env) as base_url:
+            async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+                await wait_ready(client, args.ready_timeout)
+                yield client
+    else:
+        async with httpx.AsyncClient(base_url=args.target, timeout=args.timeout, limits=limits) as client:
+            await wait_ready(client, args.ready_timeout)
+            yield client
+
+
+async def run_suite(args: argparse.Namespace) -> Dict[str, Any]:
+    report: Dict[str, Any] = {
+        "version": REPORT_VERSION,
+        **_git_commit(),
+        "started_at": rfc3339(_now()),
+        "target": args.target,
+        "db": args.db if args.target in ("inprocess", "local") else None,
+        "python": platform.python_version(),
+        "settings": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "web_concurrency": os.getenv("WEB_CONCURRENCY") if args.target == "local" else None,
+        },
+        "workloads": {},
+    }
+    async with open_target(args) as client:
+        for name in args.workload or list(WORKLOADS):
+            print(f"running {name}...", file=sys.stderr)
+            report["workloads"][name] = await run_workload(client, WORKLOADS[name], args)
+    return report
+
+
+# Comparison
+
+# (path in a workload report, higher is better)
+COMPARED = [
+    (("throughput_rps",), True),
+    (("latency_ms", "p50"), False),
+    (("latency_ms", "p95"), False),
+    (("latency_ms", "p99"), False),
+    (("scheduled", "apply_lag_ms", "p99"), False),
+]
+
+
+def _get(report: Dict[str, Any], path: Tuple[str, ...]) -> Optional[float]:
+    for key in path:
+        if not isinstance(report, dict) or key not in report:
+            return None
+        report = report[key]
+    return report  # type: ignore[return-value]
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold_pct: float) -> Dict[str, Any]:
+    """
+    Relative change of each compared figure; a regression is a change in the wrong
+    direction larger than threshold_pct.
+    """
+    out: Dict[str, Any] = {"baseline_commit": baseline.get("commit"), "threshold_pct": threshold_pct, "workloads": {}, "regressions": []}
+    for name, workload in current["workloads"].items():
+        base = baseline.get("workloads", {}).get(name)
+        if base is None:
+            continue
+        changes = {}
+        for path, higher_is_better in COMPARED:
+            now, before = _get(workload, path), _get(base, path)
+            if now is None or before is None or not before:
+                continue
+            change = (now - before) / before * 100.0
+            key = ".".join(path)
+            changes[key] = {"baseline": before, "current": now, "change_pct": round(change, 1)}
+            worse = -change if higher_is_better else change
+            if worse > threshold_pct:
+                out["regressions"].append(f"{name}: {key} {change:+.1f}%")
+        out["workloads"][name] = changes
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="inprocess", help="inprocess | local | <base URL>")
+    parser.add_argument("--db", choices=("sqlite", "mysql"), default="sqlite")
+    parser.add_argument("--workload", action="append", choices=list(WORKLOADS), help="repeatable (default: all)")
+    parser.add_argument("--requests", type=int, default=3000, help="operations per workload")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed-tasks", type=int, default=0, help="override the workload's seed size")
+    parser.add_argument("--seed", type=int, default=1, help="RNG seed of the operation sequence")
+    parser.add_argument("--port", type=int, default=8765, help="port of --target local")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--ready-timeout", type=float, default=60.0)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="baseline JSON report to compare with")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in %% (default 10)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 if --compare finds one")
+    args = parser.parse_args()
+
+    # One log line per request would cost more than some requests; the app's own prints
+    # (in-process target) go to stderr so that stdout is only the report
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    with contextlib.redirect_stdout(sys.stderr):
+        report = asyncio.run(run_suite(args))
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(report, json.load(f), args.threshold)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    if args.fail_on_regression and report.get("comparison", {}).get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from core.db import as_db_datetime
+
+# Read-through cache for single task rows (GET /tasks/{id}).
+# Writers (routes and the scheduled-ops executor) refresh or invalidate entries after commit.
+# Env vars:
+#   TASK_CACHE_BACKEND (default "local") — "local" (in-process LRU), "redis" (shared across
+#       replicas, requires the `redis` package), "memory-shared" (in-memory stand-in for the
+#       shared backend, for tests) or "none"
+#   TASK_CACHE_MAX_ENTRIES (default 10000) — size bound of the local LRU / in-memory store
+#   TASK_CACHE_TTL (default 30) — seconds an entry may be served; also bounds how long another
+#       replica's local cache can serve a row after a write elsewhere
+#   TASK_CACHE_REDIS_URL (default redis://localhost:6379/0)
+# Rows read from the read replica are filled with a TTL of at most DB_REPLICA_MAX_LAG, so a
+# row the replica served before catching up is not kept for the full TASK_CACHE_TTL.
+# Writers' stores never replace a newer version of the row (see row_version), so two
+# post-commit stores landing out of order leave the later write cached.
+
+
+def row_version(row: Dict[str, Any]) -> str:
+    """
+    Version of a task row: its last_request_ts, strictly greater on every accepted write,
+    rendered at fixed width so that versions compare as strings.
+    """
+    ts = as_db_datetime(row.get("last_request_ts"))
+    return ts.isoformat(timespec="microseconds") if ts is not None else ""
+
+
+class LRUCache:
+    """
+    Bounded, TTL-aware LRU map with hit/miss/eviction counters. Not thread-safe; it is only
+    used from the event loop.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Unexpired value of `key` without touching the LRU order or the counters."""
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class LocalTaskCache:
+    """
+    In-process task cache. Fills carry a token taken before the DB read, so a read that
+    raced with a write can never put the pre-write row back after the writer refreshed or
+    invalidated the entry; a store never replaces a newer version of the row.
+    """
+
+    backend = "local"
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self._lru = LRUCache(max_entries, ttl_seconds)
+        self._writes = 0
+        # task_id -> value of _writes at its last write (bounded like the cache itself)
+        self._last_write: "OrderedDict[int, int]" = OrderedDict()
+        self.sets = 0
+        self.invalidations = 0
+
+    def _record_write(self, task_id: int) -> None:
+        self._writes += 1
+        self._last_write[task_id] = self._writes
+        self._last_write.move_to_end(task_id)
+        while len(self._last_write) > self._lru.max_entries:
+            self._last_write.popitem(last=False)
+
+    async def get(self, task_id: int) -> Optional[Dict[str, Any]]:
+        return self._lru.get(task_id)
+
+    def fill_token(self, task_id: int) -> int:
+        return self._writes
+
+    async def fill(
+        self, task_id: int, row: Dict[str, Any], token: int, ttl_seconds: Optional[float] = None
+    ) -> None:
+        if self._last_write.get(task_id, 0) > token:
+            return
+        self._lru.set(task_id, dict(row), ttl_seconds)
+        self.sets += 1
+
+    async def store(self, task_id: int, row: Dict[str, Any]) -> None:
+        self._record_write(task_id)
+        current = self._lru.peek(task_id)
+        if current is not None and row_version(current) > row_version(row):
+            return
+        self._lru.set(task_id, dict(row))
+        self.sets += 1
+
+    async def invalidate(self, task_id: int) -> None:
+        self._record_write(task_id)
+        self._lru.delete(task_id)
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            **self._lru.stats(),
+            "sets": self.sets,
+            "invalidations": self.invalidations,
+        }
+
+
+def _version_of(value: bytes) -> bytes:
+    # Stored values are b"<version>\n<payload>"
+    return value.split(b"\n", 1)[0]
+
+
+class InMemorySharedStore:
+    """
+    Stand-in for the shared key/value backend (same async API as RedisStore), for tests
+    and single-process setups.
+    """
+
+    def __init__(self, max_entries: int = 10_000) -> None:
+        self._lru = LRUCache(max_entries, ttl_seconds=0)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._lru.get(key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        self._lru.set(key, value, ttl_seconds)
+
+    async def add(self, key: str, value: bytes, ttl_seconds: float) -> bool:
+        if self._lru.peek(key) is not None:
+            return False
+        self._lru.set(key, value, ttl_seconds)
+        return True
+
+    async def set_newer(self, key: str, value: bytes, ttl_seconds: float) -> bool:
+        current = self._lru.peek(key)
+        if current is not None and _version_of(current) > _version_of(value):
+            return False
+        self._lru.set(key, value, ttl_seconds)
+        return True
+
+    async def delete(self, key: str) -> None:
+        self._lru.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        s = self._lru.stats()
+        return {"size": s["size"], "max_entries": s["max_entries"], "evictions": s["evictions"]}
+
+
+# set_newer(): SET unless the stored value's version line is greater than the new one's
+_SET_NEWER_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current then
+  local version = string.match(current, '^([^\\n]*)')
+  if version > ARGV[2] then
+    return 0
+  end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[3])
+return 1
+"""
+
+
+class RedisStore:
+    """
+    Shared key/value backend on Redis (optional dependency: `pip install redis`).
+    """
+
+    def __init__(self, url: str) -> None:
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as e:  # pragma: no cover - depends on the deployment
+            raise RuntimeError(
+                "TASK_CACHE_BACKEND=redis requires the 'redis' package (pip install redis)"
+            ) from e
+        self._client = redis_asyncio.from_url(url)
+        self._set_newer = self._client.register_script(_SET_NEWER_SCRIPT)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        await self._client.set(key, value, px=max(1, int(ttl_seconds * 1000)))
+
+    async def add(self, key: str, value: bytes, ttl_seconds: float) -> bool:
+        return bool(await self._client.set(key, value, px=max(1, int(ttl_seconds * 1000)), nx=True))
+
+    async def set_newer(self, key: str, value: bytes, ttl_seconds: float) -> bool:
+        args = [value, _version_of(value), max(1, int(ttl_seconds * 1000))]
+        return bool(await self._set_newer(keys=[key], args=args))
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class SharedTaskCache:
+    """
+    Task cache on a shared store: a write on any replica is visible to all of them.
+    Store errors degrade to cache misses so the DB stays the source of truth.
+
+    Entries are b"<row_version>\n<row JSON>". Read-through fills only set an absent key,
+    so a fill that read the row before a concurrent write never replaces what the writer
+    stored; writers' stores are compare-and-set on the version. A delete leaves an empty
+    marker entry for the TTL (a miss for readers) that turns racing fills away.
+    """
+
+    def __init__(self, store: Any, ttl_seconds: float, backend: str) -> None:
+        self._store = store
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    @staticmethod
+    def _key(task_id: int) -> str:
+        return f"tasks:{task_id}"
+
+    async def get(self, task_id: int) -> Optional[Dict[str, Any]]:
+        try:
+            raw = await self._store.get(self._key(task_id))
+        except Exception:
+            self.errors += 1
+            raw = None
+        payload = raw.split(b"\n", 1)[1] if raw is not None else b""
+        if not payload:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(payload)
+
+    @staticmethod
+    def _value(row: Dict[str, Any]) -> bytes:
+        return row_version(row).encode() + b"\n" + json.dumps(row, default=str).encode()
+
+    def fill_token(self, task_id: int) -> int:
+        return 0
+
+    async def fill(
+        self, task_id: int, row: Dict[str, Any], token: int, ttl_seconds: Optional[float] = None
+    ) -> None:
+        try:
+            if await self._store.add(
+                self._key(task_id),
+                self._value(row),
+                self.ttl_seconds if ttl_seconds is None else ttl_seconds,
+            ):
+                self.sets += 1
+        except Exception:
+            self.errors += 1
+
+    async def store(self, task_id: int, row: Dict[str, Any]) -> None:
+        try:
+            if await self._store.set_newer(self._key(task_id), self._value(row), self.ttl_seconds):
+                self.sets += 1
+        except Exception:
+            self.errors += 1
+
+    async def invalidate(self, task_id: int) -> None:
+        try:
+            await self._store.set(self._key(task_id), b"\n", self.ttl_seconds)
+            self.invalidations += 1
+        except Exception:
+            self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "sets": self.sets,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+            **self._store.stats(),
+        }
+
+
+class NullTaskCache:
+    """
+    Cache disabled: every lookup misses, writes are no-ops.
+    """
+
+    backend = "none"
+
+    async def get(self, task_id: int) -> Optional[Dict[str, Any]]:
+        return None
+
+    def fill_token(self, task_id: int) -> int:
+        return 0
+
+    async def fill(
+        self, task_id: int, row: Dict[str, Any], token: int, ttl_seconds: Optional[float] = None
+    ) -> None:
+        return None
+
+    async def store(self, task_id: int, row: Dict[str, Any]) -> None:
+        return None
+
+    async def invalidate(self, task_id: int) -> None:
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend}
+
+
+def build_task_cache() -> Any:
+    backend = os.getenv("TASK_CACHE_BACKEND", "local").lower()
+    max_entries = int(os.getenv("TASK_CACHE_MAX_ENTRIES", "10000"))
+    ttl = float(os.getenv("TASK_CACHE_TTL", "30"))
+    if backend == "none":
+        return NullTaskCache()
+    if backend == "redis":
+        url = os.getenv("TASK_CACHE_REDIS_URL", "redis://localhost:6379/0")
+        return SharedTaskCache(RedisStore(url), ttl, backend)
+    if backend == "memory-shared":
+        return SharedTaskCache(InMemorySharedStore(max_entries), ttl, backend)
+    return LocalTaskCache(max_entries, ttl)
+
+
+# Module-level cache
+task_cache = build_task_cache()
+
+
+__all__ = [
+    "row_version",
+    "LRUCache",
+    "LocalTaskCache",
+    "InMemorySharedStore",
+    "RedisStore",
+    "SharedTaskCache",
+    "NullTaskCache",
+    "build_task_cache",
+    "task_cache",
+]
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+# Correlation ID of the request being served, readable anywhere in its call tree
+# (log records, SQL comments) without threading it through function arguments.
+# Env vars:
+#   LOG_LEVEL (default INFO) — level of the app's log handler
+#   DB_QUERY_COMMENTS (default true) — append /*correlation_id='...'*/ to every SQL statement
+#       sent while serving a request, so slow-query and processlist entries can be traced
+#       back to it
+
+# Client-supplied IDs end up in SQL comments and log lines: only accept a safe charset
+_VALID_ID = re.compile(r"[A-Za-z0-9._:\-]{1,128}")
+
+DB_QUERY_COMMENTS = os.getenv("DB_QUERY_COMMENTS", "true").strip().lower() in ("1", "true", "yes", "on")
+
+correlation_id_var: ContextVar[Optional[str]] = ContextVar("correlation_id", default=None)
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(correlation_id)s] %(name)s: %(message)s"
+
+
+def get_correlation_id() -> Optional[str]:
+    return correlation_id_var.get()
+
+
+def sanitize_correlation_id(value: Optional[str]) -> str:
+    """
+    The client's ID when it is well-formed, a fresh UUID otherwise.
+    """
+    if value and _VALID_ID.fullmatch(value):
+        return value
+    return str(uuid.uuid4())
+
+
+def sql_comment() -> str:
+    """
+    sqlcommenter-style suffix for the current statement ("" outside a request).
+    """
+    cid = correlation_id_var.get()
+    return f" /*correlation_id='{cid}'*/" if cid else ""
+
+
+class CorrelationIdFilter(logging.Filter):
+    """
+    Stamps every record with the current correlation ID ("-" outside a request).
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id_var.get() or "-"
+        return True
+
+
+def configure_logging() -> None:
+    """
+    Attach a correlation-aware handler to the root logger (idempotent).
+    """
+    root = logging.getLogger()
+    if any(isinstance(f, CorrelationIdFilter) for h in root.handlers for f in h.filters):
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler.addFilter(CorrelationIdFilter())
+    root.addHandler(handler)
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+
+__all__ = [
+    "correlation_id_var",
+    "get_correlation_id",
+    "sanitize_correlation_id",
+    "sql_comment",
+    "CorrelationIdFilter",
+    "configure_logging",
+    "DB_QUERY_COMMENTS",
+    "LOG_FORMAT",
+]
@@ -1,20 +1,49 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import math
 import os
 import json
-from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
-from contextlib import contextmanager
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import date, datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+from contextlib import AsyncExitStack, asynccontextmanager
 from dotenv import load_dotenv
 
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import bindparam, event, text
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from core.correlation import DB_QUERY_COMMENTS, sql_comment
+from core.metrics import LATENCY_BUCKETS, METRICS_ENABLED, histogram_summary, sample_value
+from core.storage import StorageBackend, backend_for_url
+from core.tracing import SPAN_KIND_CLIENT, TRACING_ENABLED, set_error, tracer
 
 # Connection configuration: prefer full URL, otherwise build from env
 # Expected env vars:
 #   DATABASE_URL or (DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME)
-# DB driver used: pymysql via SQLAlchemy -> "mysql+pymysql://..."
-# The application code uses DB-API style connections (cursor(), commit()), so get_db yields a DB-API connection.
+# The URL scheme selects the storage backend (core/storage.py): MySQL through aiomysql
+# ("mysql+aiomysql://...", the default) or an embedded SQLite file in WAL mode through
+# aiosqlite ("sqlite:///path/to/tasks.db") for single-node deployments and tests.
+# The application code uses SQLAlchemy AsyncConnections with text() statements and
+# named parameters, so get_db is an async context manager and every query is awaited.
+# Connection pool (per process; set through the Helm ConfigMap in Kubernetes):
+#   DB_POOL_SIZE (default 5) — connections kept open
+#   DB_MAX_OVERFLOW (default 10) — extra connections opened under load, closed on return
+#   DB_POOL_TIMEOUT (default 30) — seconds get_db waits for a connection before failing
+#   DB_POOL_RECYCLE (default 3600) — connection max age in seconds (keep < MySQL wait_timeout)
+#   DB_POOL_PRE_PING (default true) — test each connection on checkout
+#   Sizing: max replicas * processes per pod * (DB_POOL_SIZE + DB_MAX_OVERFLOW) must stay
+#   below MySQL max_connections (minus admin/migration headroom).
+# TASK_TOMBSTONE_RETENTION_DAYS (default 30) — how long deletes stay visible to
+# GET /tasks/changes; older sync positions must resync from scratch.
+
+logger = logging.getLogger("tasks.db")
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 # Load environment variables from app/.env (if present)
@@ -61,11 +90,79 @@ def normalize_rfc3339(dt: datetime) -> str:
     return to_utc(dt).replace(microsecond=0).isoformat().replace("+00:00", "Z")
 
 
-def _build_engine() -> Engine:
+# Temporal columns are native DATETIME(6) (naive UTC) / DATE values: the driver hands back
+# datetime/date objects, so comparisons and range predicates never go through strings.
+
+
+def utc_now() -> datetime:
+    """
+    Current UTC time as a naive datetime with microseconds (the DATETIME(6) column format).
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def to_db_datetime(dt: datetime) -> datetime:
+    """
+    Convert a datetime to the naive-UTC form stored in DATETIME(6) columns.
+    Naive datetimes are interpreted as UTC.
+    """
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def as_db_datetime(value: Any) -> Optional[datetime]:
+    """
+    Column value as a naive UTC datetime. Driver values are returned as-is; strings
+    (JSON payloads, shared cache entries, legacy RFC3339 values) are parsed.
+    """
+    if value is None or isinstance(value, datetime):
+        return value
+    return to_db_datetime(parse_rfc3339(str(value)))
+
+
+def format_rfc3339(value: Any) -> Optional[str]:
+    """
+    Render a stored timestamp as RFC3339 UTC with 'Z' suffix; fractional seconds are only
+    written when present. Example: '2025-09-25T20:00:00Z', '2025-09-25T20:00:00.250000Z'
+    """
+    dt = as_db_datetime(value)
+    if dt is None:
+        return None
+    return dt.isoformat(timespec="microseconds" if dt.microsecond else "seconds") + "Z"
+
+
+def format_api_timestamp(value: Any) -> Optional[str]:
+    """
+    Render a stored timestamp for API responses: RFC3339 UTC in whole seconds with 'Z'
+    suffix, the format clients have always received. Example: '2025-09-25T20:00:00Z'
+    Columns keep their microseconds for ordering, the request_timestamp rule and ETags
+    (format_rfc3339); only the rendering drops them.
+    """
+    dt = as_db_datetime(value)
+    if dt is None:
+        return None
+    return dt.replace(microsecond=0).isoformat() + "Z"
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+POOL_OPTIONS: Dict[str, Any] = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "3600")),
+    "pool_pre_ping": _env_flag("DB_POOL_PRE_PING", "true"),
+}
+
+
+def _database_url() -> str:
     # Allow overriding with full DATABASE_URL
     db_url = os.getenv("DATABASE_URL")
     if db_url:
-        return create_engine(db_url, pool_pre_ping=True)
+        return db_url
 
     user = os.getenv("DB_USER", "root")
     password = os.getenv("DB_PASSWORD", "")
@@ -73,303 +170,738 @@ def _build_engine() -> Engine:
     port = os.getenv("DB_PORT", "3306")
     db = os.getenv("DB_NAME", "tasksdb")
 
-    # Using pymysql driver
-    url = f"mysql+pymysql://{user}:{password}@{host}:{port}/{db}?charset=utf8mb4"
-    return create_engine(url, pool_pre_ping=True, pool_recycle=3600)
+    # Using aiomysql driver (asyncio wrapper around PyMySQL)
+    return f"mysql+aiomysql://{user}:{password}@{host}:{port}/{db}?charset=utf8mb4"
+
+
+def _replica_url() -> Optional[str]:
+    url = os.getenv("DATABASE_REPLICA_URL")
+    if url:
+        return url
+    host = os.getenv("DB_REPLICA_HOST")
+    if not host:
+        return None
+    user = os.getenv("DB_USER", "root")
+    password = os.getenv("DB_PASSWORD", "")
+    port = os.getenv("DB_REPLICA_PORT") or os.getenv("DB_PORT", "3306")
+    db = os.getenv("DB_NAME", "tasksdb")
+    return f"mysql+aiomysql://{user}:{password}@{host}:{port}/{db}?charset=utf8mb4"
+
+
+# Read replica (optional). Read-only routes ask for get_db(read_only=True) and get a
+# connection from the replica pool, except:
+#   - when the request must read its own writes: it carries the x-write-token of a write
+#     committed less than DB_REPLICA_MAX_LAG ago, or a correlation ID that wrote that
+#     recently on this worker (see ReadConsistency)
+#   - when the replica is unavailable: a failed checkout sends the read, and every read for
+#     the next DB_REPLICA_RETRY_INTERVAL seconds, to the primary
+# Env vars:
+#   DATABASE_REPLICA_URL, or DB_REPLICA_HOST (+ DB_REPLICA_PORT, default DB_PORT) with the
+#       primary's DB_USER / DB_PASSWORD / DB_NAME — unset: every read goes to the primary
+#   DB_REPLICA_POOL_SIZE / DB_REPLICA_MAX_OVERFLOW (default: DB_POOL_SIZE / DB_MAX_OVERFLOW)
+#       — replica pool per process; counts against the replica's max_connections
+#   DB_REPLICA_MAX_LAG (default 5) — read-your-writes window in seconds; keep above the
+#       replication lag the replica is allowed to have
+#   DB_REPLICA_RETRY_INTERVAL (default 10) — seconds reads stay on the primary after a
+#       replica failure
+REPLICA_POOL_OPTIONS: Dict[str, Any] = {
+    **POOL_OPTIONS,
+    "pool_size": int(os.getenv("DB_REPLICA_POOL_SIZE") or POOL_OPTIONS["pool_size"]),
+    "max_overflow": int(os.getenv("DB_REPLICA_MAX_OVERFLOW") or POOL_OPTIONS["max_overflow"]),
+}
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+REPLICA_RETRY_INTERVAL_SECONDS = float(os.getenv("DB_REPLICA_RETRY_INTERVAL", "10"))
+
+# Module-level backend and engines
+backend: StorageBackend = backend_for_url(_database_url())
+_engine = backend.create_engine(POOL_OPTIONS)
+_replica_url_value = _replica_url()
+_replica_engine: Optional[AsyncEngine] = (
+    backend_for_url(_replica_url_value).create_engine(REPLICA_POOL_OPTIONS)
+    if _replica_url_value
+    else None
+)
+REPLICA_ENABLED = _replica_engine is not None
+POOLS: Dict[str, AsyncEngine] = {"primary": _engine}
+if _replica_engine is not None:
+    POOLS["replica"] = _replica_engine
+
+# Checkout waits go from a few microseconds (idle connection) up to DB_POOL_TIMEOUT
+POOL_WAIT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+    2.5, 5.0, 10.0, 30.0,
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time get_db waited for a pooled connection (including opening a new one), by pool",
+    ["pool"],
+    buckets=POOL_WAIT_BUCKETS,
+)
+POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total", "get_db calls that gave up after DB_POOL_TIMEOUT", ["pool"]
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "Statement execution time (driver round trip) by statement class and pool",
+    ["statement", "pool"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_READS = Counter(
+    "db_reads_total",
+    "get_db(read_only=True) checkouts by pool and routing reason",
+    ["pool", "reason"],
+)
+REPLICA_FAILURES = Counter(
+    "db_replica_failures_total", "Replica checkouts or queries that failed (reads then go to the primary)"
+)
+_STATEMENT_CLASSES = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE"})
+
+
+def _statement_class(statement: str) -> str:
+    head = statement.lstrip()[:8].split(None, 1)
+    verb = head[0].upper() if head else ""
+    return verb.lower() if verb in _STATEMENT_CLASSES else "other"
+
+
+def _instrument(engine: AsyncEngine, pool_name: str) -> None:
+    """
+    SQL comments, per-statement metrics and tracing spans on every cursor execution of
+    `engine`, labelled with `pool_name`.
+    """
+    sync_engine = engine.sync_engine
+
+    if DB_QUERY_COMMENTS:
+
+        @event.listens_for(sync_engine, "before_cursor_execute", retval=True)
+        def _add_sql_comment(conn, cursor, statement, parameters, context, executemany):
+            # Tag the statement with the current request's correlation ID (see core.correlation)
+            return statement + sql_comment(), parameters
+
+    if METRICS_ENABLED:
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _query_started(conn, cursor, statement, parameters, context, executemany) -> None:
+            context._query_started = time.perf_counter()
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def _query_finished(conn, cursor, statement, parameters, context, executemany) -> None:
+            DB_QUERY_SECONDS.labels(_statement_class(statement), pool_name).observe(
+                time.perf_counter() - context._query_started
+            )
+
+    if TRACING_ENABLED:
+        # One client span per cursor execution, child of the request / scheduler span
+        db_system = engine.dialect.name
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _trace_query_started(conn, cursor, statement, parameters, context, executemany) -> None:
+            context._trace_span = tracer.start_span(
+                f"db.{_statement_class(statement)}",
+                SPAN_KIND_CLIENT,
+                {
+                    "db.system": db_system,
+                    "db.pool": pool_name,
+                    "db.statement": statement[:1000],
+                    "db.executemany": executemany,
+                },
+            )
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def _trace_query_finished(conn, cursor, statement, parameters, context, executemany) -> None:
+            span = getattr(context, "_trace_span", None)
+            if span is not None:
+                span.set_attribute("db.rowcount", cursor.rowcount)
+                span.end()
 
+        @event.listens_for(sync_engine, "handle_error")
+        def _trace_query_failed(exception_context) -> None:
+            span = getattr(exception_context.execution_context, "_trace_span", None)
+            if span is not None:
+                set_error(span, exception_context.original_exception)
+                span.end()
 
-# Module-level engine
-_engine = _build_engine()
 
+for _pool_name, _pool_engine in POOLS.items():
+    _instrument(_pool_engine, _pool_name)
 
-@contextmanager
-def get_db():
+
+class ReadConsistency:
+    """
+    Read-your-writes state of the request being served, set by the HTTP middleware:
+    `read_after` is the commit time (epoch seconds) from the client's x-write-token,
+    `wrote_at` the time of this request's last commit (returned as its x-write-token).
+    """
+
+    __slots__ = ("correlation_id", "read_after", "wrote_at")
+
+    def __init__(self, correlation_id: Optional[str] = None, read_after: Optional[float] = None) -> None:
+        self.correlation_id = correlation_id
+        self.read_after = read_after
+        self.wrote_at: Optional[float] = None
+
+
+read_consistency_var: ContextVar[Optional[ReadConsistency]] = ContextVar(
+    "read_consistency", default=None
+)
+
+# correlation ID -> time of its last commit on this worker, for clients that reuse one
+# correlation ID across a write and the reads that follow it (bounded, oldest first)
+_RECENT_WRITERS_MAX = 10_000
+_recent_writers: "OrderedDict[str, float]" = OrderedDict()
+# Until when (monotonic) reads skip the replica after a failure
+_replica_down_until = 0.0
+
+
+def write_token(wrote_at: float) -> str:
+    return f"{wrote_at:.6f}"
+
+
+def parse_write_token(value: Optional[str]) -> Optional[float]:
     """
-    Context manager that yields a raw DB-API connection (so calling code that uses
-    `with get_db() as conn:` and then `cur = conn.cursor()` still works).
-    The returned connection must be closed by this context manager.
+    Commit time carried by an x-write-token, None when absent or malformed.
     """
-    raw_conn = _engine.raw_connection()
+    if not value:
+        return None
+    try:
+        wrote_at = float(value)
+    except ValueError:
+        return None
+    return wrote_at if math.isfinite(wrote_at) else None
+
+
+def _record_write() -> None:
+    state = read_consistency_var.get()
+    if state is None:
+        return
+    state.wrote_at = time.time()
+    if REPLICA_ENABLED and state.correlation_id:
+        _recent_writers[state.correlation_id] = state.wrote_at
+        _recent_writers.move_to_end(state.correlation_id)
+        while len(_recent_writers) > _RECENT_WRITERS_MAX:
+            _recent_writers.popitem(last=False)
+
+
+def _read_route() -> Tuple[str, str]:
+    """
+    (pool, reason) for a read-only checkout.
+    """
+    if _replica_engine is None:
+        return "primary", "no_replica"
+    if time.monotonic() < _replica_down_until:
+        return "primary", "replica_unavailable"
+    state = read_consistency_var.get()
+    if state is not None:
+        horizon = time.time() - REPLICA_MAX_LAG_SECONDS
+        if state.wrote_at is not None or (state.read_after or 0.0) > horizon:
+            return "primary", "read_your_writes"
+        if state.correlation_id and _recent_writers.get(state.correlation_id, 0.0) > horizon:
+            return "primary", "read_your_writes"
+    return "replica", "replica"
+
+
+def _replica_failed(error: BaseException) -> None:
+    global _replica_down_until
+    REPLICA_FAILURES.inc()
+    _replica_down_until = time.monotonic() + REPLICA_RETRY_INTERVAL_SECONDS
+    logger.warning(
+        "Read replica failed (%s: %s); reads go to the primary for %gs",
+        type(error).__name__, error, REPLICA_RETRY_INTERVAL_SECONDS,
+    )
+
+
+async def _checkout(pool_name: str) -> AsyncConnection:
+    conn = POOLS[pool_name].connect()
+    started = time.perf_counter()
     try:
-        yield raw_conn
+        with tracer.span("db.checkout", SPAN_KIND_CLIENT, {"db.pool": pool_name}):
+            await conn.start()
+    except PoolTimeoutError:
+        POOL_CHECKOUT_TIMEOUTS.labels(pool_name).inc()
+        raise
     finally:
+        POOL_CHECKOUT_WAIT.labels(pool_name).observe(time.perf_counter() - started)
+    _update_pool_gauges(pool_name)
+    return conn
+
+
+@asynccontextmanager
+async def get_db(read_only: bool = False) -> AsyncIterator[AsyncConnection]:
+    """
+    Async context manager that yields a pooled SQLAlchemy AsyncConnection
+    (`async with get_db() as conn:` then `await conn.execute(text(...), params)`).
+    Queries are awaited on the event loop, so a slow statement only suspends the
+    calling request instead of blocking every in-flight request of the worker.
+    Uncommitted work is rolled back when the connection returns to the pool.
+    The checkout wait is recorded in POOL_CHECKOUT_WAIT, timeouts in POOL_CHECKOUT_TIMEOUTS.
+    With read_only=True the connection comes from the read replica when one is configured
+    and the request does not need to read its own recent writes (see _read_route); a
+    replica that fails at checkout is replaced by the primary for this and later reads.
+    """
+    pool_name = "primary"
+    if read_only:
+        pool_name, reason = _read_route()
+        if pool_name == "replica":
+            try:
+                conn = await _checkout("replica")
+            except Exception as e:
+                _replica_failed(e)
+                pool_name, reason = "primary", "replica_unavailable"
+        if pool_name == "primary":
+            conn = await _checkout("primary")
+        DB_READS.labels(pool_name, reason).inc()
+    else:
+        conn = await _checkout("primary")
+    try:
+        yield conn
+    except DBAPIError as e:
+        # A replica that drops mid-query: this read fails, the following ones go to the primary
+        if pool_name == "replica" and (e.connection_invalidated or isinstance(e, OperationalError)):
+            _replica_failed(e)
+        raise
+    finally:
+        await conn.close()
+        _update_pool_gauges(pool_name)
+
+
+@asynccontextmanager
+async def get_replica_db() -> AsyncIterator[AsyncConnection]:
+    """
+    A connection from the replica pool, without routing or fallback (health checks).
+    """
+    conn = await _checkout("replica")
+    try:
+        yield conn
+    finally:
+        await conn.close()
+        _update_pool_gauges("replica")
+
+
+def served_by_replica(conn: AsyncConnection) -> bool:
+    return _replica_engine is not None and conn.engine is _replica_engine
+
+
+async def commit(conn: AsyncConnection) -> None:
+    """
+    Commit the connection's transaction (traced as a db.commit span). The commit time is
+    recorded for read-your-writes routing (ReadConsistency).
+    """
+    with tracer.span("db.commit", SPAN_KIND_CLIENT):
+        await conn.commit()
+    _record_write()
+
+
+async def warm_pool(connections: Optional[int] = None) -> int:
+    """
+    Open `connections` pooled connections at once (default: the pool size) and ping each,
+    so the first requests after startup don't pay for connection setup. The replica pool
+    is warmed too; a replica that does not answer is only logged (reads fall back).
+    Returns the number of connections warmed.
+    """
+    warmed = 0
+    for pool_name, engine in POOLS.items():
+        size = connections or getattr(engine.pool, "size", lambda: 1)()
         try:
-            raw_conn.close()
-        except Exception:
-            pass
-
-
-def init_db() -> None:
-    """
-    Initialize the MySQL schema if it doesn't exist.
-    Uses DDL statements compatible with MySQL.
-    Note: takes the environment-configured DB and runs CREATE TABLE IF NOT EXISTS.
-    """
-    # We use an engine-level connection for DDL
-    with _engine.begin() as conn:
-        # Using VARCHAR for RFC3339 timestamps to keep compatibility with existing code
-        conn.execute(
-            text(
-                """
-                CREATE TABLE IF NOT EXISTS tasks (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    title VARCHAR(255) NOT NULL,
-                    content TEXT,
-                    due_date VARCHAR(10),
-                    done TINYINT NOT NULL DEFAULT 0,
-                    created_at VARCHAR(32) NOT NULL,
-                    updated_at VARCHAR(32) NOT NULL,
-                    last_request_ts VARCHAR(32) NOT NULL,
-                    UNIQUE KEY ux_tasks_title_due (title, due_date)
-                )
-                """
-            )
-        )
-        # Créer les index avec gestion d'erreur
-        try:
-            conn.execute(text("CREATE INDEX idx_tasks_due_date ON tasks(due_date)"))
-        except Exception:
-            pass  # Index existe déjà
-        
-        try:
-            conn.execute(text("CREATE INDEX idx_tasks_updated_at ON tasks(updated_at)"))
-        except Exception:
-            pass  # Index existe déjà
-
-        conn.execute(
-            text(
-                """
-                CREATE TABLE IF NOT EXISTS users (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    username VARCHAR(255) NOT NULL UNIQUE,
-                    email VARCHAR(255),
-                    password_hash VARCHAR(255) NOT NULL,
-                    is_active TINYINT NOT NULL DEFAULT 1,
-                    created_at VARCHAR(32) NOT NULL,
-                    updated_at VARCHAR(32) NOT NULL
+            async with AsyncExitStack() as stack:
+                conns = await asyncio.gather(
+                    *(stack.enter_async_context(engine.connect()) for _ in range(size))
                 )
-                """
-            )
-        )
-        try:
-            conn.execute(text("CREATE INDEX idx_users_username ON users(username)"))
-        except Exception:
-            pass  # Index existe déjà
-        
-        try:
-            conn.execute(text("CREATE INDEX idx_users_email ON users(email)"))
-        except Exception:
-            pass  # Index existe déjà
-
-        conn.execute(
-            text(
-                """
-                CREATE TABLE IF NOT EXISTS scheduled_ops (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    task_id INT,
-                    op_type VARCHAR(32) NOT NULL,
-                    payload TEXT NOT NULL,
-                    execute_at VARCHAR(32) NOT NULL,
-                    request_ts VARCHAR(32) NOT NULL,
-                    created_at VARCHAR(32) NOT NULL
+                await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in conns))
+        except Exception as e:
+            if pool_name == "primary":
+                raise
+            _replica_failed(e)
+            continue
+        _update_pool_gauges(pool_name)
+        warmed += size
+    return warmed
+
+
+def pool_stats(pool_name: str = "primary") -> Dict[str, Any]:
+    """
+    Occupancy of a connection pool, read from the engine without a DB round trip.
+    `saturation` is checked-out connections over size + max_overflow.
+    """
+    pool = POOLS[pool_name].pool
+    size = getattr(pool, "size", lambda: 0)()
+    max_overflow = max(0, getattr(pool, "_max_overflow", 0))
+    checked_out = getattr(pool, "checkedout", lambda: 0)()
+    capacity = size + max_overflow
+    return {
+        "size": size,
+        "max_overflow": max_overflow,
+        "checked_out": checked_out,
+        "idle": getattr(pool, "checkedin", lambda: 0)(),
+        "overflow": max(0, getattr(pool, "overflow", lambda: 0)()),
+        "saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+    }
+
+
+# Set from pool_stats() whenever a connection is checked out or returned through get_db:
+# summed (in use, idle) or maxed (saturation) over the live workers in multiprocess mode
+POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use", "Pooled connections checked out, by pool", ["pool"],
+    multiprocess_mode="livesum",
+)
+POOL_IDLE = Gauge(
+    "db_pool_connections_idle", "Open pooled connections waiting in the pool, by pool", ["pool"],
+    multiprocess_mode="livesum",
+)
+POOL_SATURATION = Gauge(
+    "db_pool_saturation", "Checked-out connections over pool size + max overflow, by pool", ["pool"],
+    multiprocess_mode="livemax",
+)
+
+
+def _update_pool_gauges(pool_name: str) -> None:
+    stats = pool_stats(pool_name)
+    POOL_IN_USE.labels(pool_name).set(stats["checked_out"])
+    POOL_IDLE.labels(pool_name).set(stats["idle"])
+    POOL_SATURATION.labels(pool_name).set(stats["saturation"])
+
+
+def _pool_metrics(pool_name: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "config": dict(options),
+        **pool_stats(pool_name),
+        "checkout_wait_seconds": histogram_summary(POOL_CHECKOUT_WAIT, pool=pool_name),
+        "checkout_timeouts_total": int(sample_value(POOL_CHECKOUT_TIMEOUTS, pool=pool_name)),
+    }
+
+
+def pool_metrics() -> Dict[str, Any]:
+    """
+    Pool configuration, occupancy and checkout instrumentation of this process; with a
+    read replica, the same for its pool plus how reads were routed.
+    """
+    report = _pool_metrics("primary", POOL_OPTIONS)
+    if REPLICA_ENABLED:
+        report["replica"] = {
+            **_pool_metrics("replica", REPLICA_POOL_OPTIONS),
+            "max_lag_s": REPLICA_MAX_LAG_SECONDS,
+            "available": time.monotonic() >= _replica_down_until,
+            "failures_total": int(sample_value(REPLICA_FAILURES)),
+            "reads": {
+                f"{pool}/{reason}": int(sample_value(DB_READS, pool=pool, reason=reason))
+                for pool, reason in (
+                    ("replica", "replica"),
+                    ("primary", "read_your_writes"),
+                    ("primary", "replica_unavailable"),
                 )
-                """
-            )
-        )
-        try:
-            conn.execute(text("CREATE INDEX idx_schedops_execute_at ON scheduled_ops(execute_at)"))
-        except Exception:
-            pass  # Index existe déjà
+            },
+        }
+    return report
+
+
+async def close_db() -> None:
+    """
+    Dispose of the connection pools (called on application shutdown).
+    """
+    for engine in POOLS.values():
+        await engine.dispose()
 
 
-def _row_to_dict(cursor, row) -> Dict[str, Any]:
+def row_to_task(row: Optional[Mapping[str, Any]]) -> Optional[Dict[str, Any]]:
     """
-    Convert a DB-API row (tuple) into a dict using cursor.description.
-    If row is already a mapping-like object, return as dict.
+    Convert a DB row (dict or SQLAlchemy RowMapping) into the serializable dict.
+    due_date is rendered as YYYY-MM-DD and timestamps as RFC3339 UTC strings, like before.
     """
     if row is None:
         return None
-    # If row supports keys() and __getitem__ with strings, try to use it directly
-    try:
-        if hasattr(row, "keys"):
-            return {k: row[k] for k in row.keys()}
-    except Exception:
-        pass
+    done = row.get("done")
+    due_date = row.get("due_date")
+    return {
+        "id": row.get("id"),
+        "title": row.get("title"),
+        "content": row.get("content"),
+        "due_date": due_date.isoformat() if isinstance(due_date, date) else due_date,
+        "done": bool(int(done)) if done is not None else False,
+        "created_at": format_api_timestamp(row.get("created_at")),
+        "updated_at": format_api_timestamp(row.get("updated_at")),
+    }
 
-    # Fallback: use cursor.description to build keys
-    desc = [col[0] for col in cursor.description]
-    return {k: v for k, v in zip(desc, row)}
 
+async def fetch_task_row(conn: AsyncConnection, task_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Fetch the raw tasks row for `task_id` as a dict, or None if it does not exist.
+    """
+    result = await conn.execute(
+        text("SELECT * FROM tasks WHERE id = :id"), {"id": task_id}
+    )
+    row = result.mappings().first()
+    return dict(row) if row is not None else None
 
-def row_to_task(row: Any) -> Dict[str, Any]:
+
+async def fetch_task_rows(
+    conn: AsyncConnection, task_ids: List[int], for_update: bool = False
+) -> Dict[int, Dict[str, Any]]:
     """
-    Convert a DB row (mapping-like or tuple with cursor) into the serializable dict.
-    Keeps due_date as a string (YYYY-MM-DD) like before.
+    Fetch many tasks rows in one query, keyed by id (missing ids are simply absent).
+    With for_update=True the rows stay locked until the caller's transaction ends.
     """
-    if row is None:
+    if not task_ids:
+        return {}
+    sql = "SELECT * FROM tasks WHERE id IN :ids"
+    if for_update:
+        await backend.begin_write(conn)
+        sql += backend.lock_clause()
+    result = await conn.execute(
+        text(sql).bindparams(bindparam("ids", expanding=True)), {"ids": list(task_ids)}
+    )
+    return {r["id"]: dict(r) for r in result.mappings().all()}
+
+
+def task_unique_key(title: Any, due_date: Any) -> Optional[Tuple[str, str]]:
+    """
+    Identity of a task under ux_tasks_title_due, or None when it cannot conflict
+    (NULL due_date). Titles are casefolded to follow MySQL's case-insensitive collation.
+    """
+    if title is None or due_date is None:
         return None
-    if isinstance(row, dict):
-        src = row
-    else:
-        # If it's a DB-API row proxy from some adapters, try mapping access
-        try:
-            src = dict(row)
-        except Exception:
-            # As a last resort, caller should supply mapping; raise to highlight mismatch
-            raise TypeError("Unsupported row type for row_to_task")
+    return (str(title).casefold(), due_date.isoformat() if isinstance(due_date, date) else str(due_date))
+
+
+async def fetch_taken_task_keys(
+    conn: AsyncConnection, pairs: List[Tuple[Any, Any]]
+) -> Dict[Tuple[str, str], int]:
+    """
+    Map each requested (title, due_date) that already exists to its task id,
+    with one indexed lookup for the whole list.
+    """
+    keyed = [(t, d) for t, d in pairs if task_unique_key(t, d)]
+    if not keyed:
+        return {}
+    result = await conn.execute(
+        text(
+            "SELECT id, title, due_date FROM tasks WHERE title IN :titles AND due_date IN :dates"
+        ).bindparams(bindparam("titles", expanding=True), bindparam("dates", expanding=True)),
+        {
+            "titles": sorted({t for t, _ in keyed}),
+            "dates": sorted({task_unique_key(t, d)[1] for t, d in keyed}),
+        },
+    )
     return {
-        "id": src.get("id"),
-        "title": src.get("title"),
-        "content": src.get("content"),
-        "due_date": src.get("due_date"),
-        "done": bool(int(src.get("done"))) if src.get("done") is not None else False,
-        "created_at": src.get("created_at"),
-        "updated_at": src.get("updated_at"),
+        task_unique_key(r["title"], r["due_date"]): r["id"] for r in result.mappings().all()
     }
 
 
 # New helpers for scheduled operations
 
+# Callbacks invoked with the execute_at of every newly committed scheduled op
+# (the executor registers one to wake up early instead of polling).
+_enqueue_listeners: List[Callable[[datetime], None]] = []
+
+
+def add_enqueue_listener(callback: Callable[[datetime], None]) -> None:
+    """
+    Register a callback called with `execute_at` after each enqueue_scheduled_op commit.
+    """
+    _enqueue_listeners.append(callback)
+
+
+def notify_enqueue_listeners(execute_ats: Iterable[datetime]) -> None:
+    """
+    Call the enqueue listeners for ops committed outside enqueue_scheduled_op.
+    """
+    for execute_at in execute_ats:
+        for callback in _enqueue_listeners:
+            callback(execute_at)
+
 
-def enqueue_scheduled_op(
-    conn,
+async def insert_scheduled_op(
+    conn: AsyncConnection,
     task_id: Optional[int],
     op_type: str,
     payload: Dict[str, Any],
-    execute_at: str,
-    request_ts: str,
+    execute_at: datetime,
+    request_ts: datetime,
 ) -> int:
     """
-    Insert a scheduled operation and return its id.
-    Expects `conn` to be a DB-API connection (obtained from get_db()).
-    """
-    cur = conn.cursor()
-    now_iso = iso_utc_now()
-    cur.execute(
-        """
-        INSERT INTO scheduled_ops (task_id, op_type, payload, execute_at, request_ts, created_at)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        """,
-        (task_id, op_type, json.dumps(payload), execute_at, request_ts, now_iso),
+    Insert a scheduled operation inside the caller's transaction (no commit) and return its id.
+    Callers must call notify_enqueue_listeners() once they commit.
+    """
+    result = await conn.execute(
+        text(
+            """
+            INSERT INTO scheduled_ops (task_id, op_type, payload, execute_at, request_ts, created_at)
+            VALUES (:task_id, :op_type, :payload, :execute_at, :request_ts, :created_at)
+            """
+        ),
+        {
+            "task_id": task_id,
+            "op_type": op_type,
+            "payload": json.dumps(payload),
+            "execute_at": execute_at,
+            "request_ts": request_ts,
+            "created_at": utc_now(),
+        },
     )
-    op_id = cur.lastrowid if hasattr(cur, "lastrowid") else None
-    conn.commit()
+    return result.lastrowid
+
+
+async def enqueue_scheduled_op(
+    conn: AsyncConnection,
+    task_id: Optional[int],
+    op_type: str,
+    payload: Dict[str, Any],
+    execute_at: datetime,
+    request_ts: datetime,
+) -> int:
+    """
+    Insert a scheduled operation and return its id.
+    Expects `conn` to be an AsyncConnection (obtained from get_db()).
+    """
+    op_id = await insert_scheduled_op(conn, task_id, op_type, payload, execute_at, request_ts)
+    await commit(conn)
+    notify_enqueue_listeners([execute_at])
     return op_id
 
 
-def fetch_due_scheduled_ops(conn, upto_iso: str) -> List[Dict[str, Any]]:
+async def fetch_next_execute_ats(conn: AsyncConnection, limit: int) -> List[datetime]:
+    """
+    Return the `limit` earliest distinct execute_at values still queued (index-ordered scan).
     """
-    Fetch scheduled operations with execute_at <= upto_iso.
+    result = await conn.execute(
+        text(
+            "SELECT DISTINCT execute_at FROM scheduled_ops ORDER BY execute_at ASC LIMIT :limit"
+        ),
+        {"limit": limit},
+    )
+    return [r[0] for r in result.all()]
+
+
+async def count_scheduled_ops(conn: AsyncConnection, now: datetime) -> Tuple[int, int]:
+    """
+    (queued, due) scheduled ops across all replicas.
+    """
+    result = await conn.execute(
+        text(
+            "SELECT COUNT(*), COALESCE(SUM(execute_at <= :now), 0) FROM scheduled_ops"
+        ),
+        {"now": now},
+    )
+    queued, due = result.one()
+    return int(queued), int(due)
+
+
+async def fetch_due_scheduled_ops(
+    conn: AsyncConnection,
+    upto: datetime,
+    limit: Optional[int] = None,
+    skip_locked: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Fetch scheduled operations with execute_at <= upto.
     Returns list of dicts.
+    With skip_locked=True the rows are claimed (SELECT ... FOR UPDATE SKIP LOCKED) for the
+    caller's transaction: other replicas running the same query skip them instead of
+    waiting, so each due op is handed to exactly one executor.
     """
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT * FROM scheduled_ops WHERE execute_at <= %s ORDER BY execute_at ASC",
-        (upto_iso,),
+    sql = "SELECT * FROM scheduled_ops WHERE execute_at <= :upto ORDER BY execute_at ASC, id ASC"
+    params: Dict[str, Any] = {"upto": upto}
+    if limit is not None:
+        sql += " LIMIT :limit"
+        params["limit"] = limit
+    if skip_locked:
+        await backend.begin_write(conn)
+        sql += backend.lock_clause(skip_locked=True)
+    result = await conn.execute(text(sql), params)
+    return [dict(r) for r in result.mappings().all()]
+
+
+async def delete_scheduled_op(conn: AsyncConnection, op_id: int) -> None:
+    await conn.execute(text("DELETE FROM scheduled_ops WHERE id = :id"), {"id": op_id})
+    await commit(conn)
+
+
+async def delete_scheduled_ops(conn: AsyncConnection, op_ids: List[int]) -> None:
+    """
+    Delete many scheduled ops in one statement, inside the caller's transaction (no commit).
+    """
+    if not op_ids:
+        return
+    await conn.execute(
+        text("DELETE FROM scheduled_ops WHERE id IN :ids").bindparams(
+            bindparam("ids", expanding=True)
+        ),
+        {"ids": list(op_ids)},
     )
-    rows = cur.fetchall()
-    results = []
-    for r in rows:
-        results.append(_row_to_dict(cur, r))
-    return results
 
 
-def delete_scheduled_op(conn, op_id: int) -> None:
-    cur = conn.cursor()
-    cur.execute("DELETE FROM scheduled_ops WHERE id = %s", (op_id,))
-    conn.commit()
+# Tombstones for deleted tasks (delta sync)
 
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TASK_TOMBSTONE_RETENTION_DAYS", "30"))
 
-def process_due_scheduled_ops_once() -> int:
+
+async def insert_task_tombstones(
+    conn: AsyncConnection, task_ids: Iterable[int], deleted_at: datetime
+) -> None:
     """
-    Process all scheduled operations that are due right now.
-    Returns the number of processed operations.
-    Each operation is applied only if its request_ts is still greater than the current stored last_request_ts.
+    Record the deletion of `task_ids`, inside the caller's transaction (no commit).
     """
-    processed = 0
-    with get_db() as conn:
-        cur = conn.cursor()
-        now_iso = iso_utc_now()
-        due_ops = fetch_due_scheduled_ops(conn, now_iso)
-        for op in due_ops:
-            try:
-                op_id = op.get("id")
-                task_id = op.get("task_id")
-                op_type = op.get("op_type")
-                payload = json.loads(op.get("payload", "{}"))
-                req_ts = parse_rfc3339(op.get("request_ts"))
-
-                # For update/delete, check resource exists
-                cur.execute("SELECT * FROM tasks WHERE id = %s", (task_id,))
-                row = cur.fetchone()
-                task_row = _row_to_dict(cur, row) if row is not None else None
-                if not task_row:
-                    # Nothing to apply; remove scheduled op
-                    delete_scheduled_op(conn, op_id)
-                    continue
-
-                stored_last_ts = parse_rfc3339(task_row.get("last_request_ts"))
-                if not (req_ts > stored_last_ts):
-                    # Conflict at execution time; drop the scheduled op
-                    delete_scheduled_op(conn, op_id)
-                    continue
-
-                if op_type == "update":
-                    new_title = payload.get("title", task_row.get("title"))
-                    new_content = payload.get("content", task_row.get("content"))
-                    new_due_date = payload.get("due_date", task_row.get("due_date"))
-                    new_done = (
-                        int(payload.get("done"))
-                        if payload.get("done") is not None
-                        else int(task_row.get("done", 0))
-                    )
-                    now_iso_local = iso_utc_now()
-                    cur.execute(
-                        """
-                        UPDATE tasks
-                        SET title = %s, content = %s, due_date = %s, done = %s, updated_at = %s, last_request_ts = %s
-                        WHERE id = %s
-                        """,
-                        (
-                            new_title,
-                            new_content,
-                            new_due_date,
-                            new_done,
-                            now_iso_local,
-                            op.get("request_ts"),
-                            task_id,
-                        ),
-                    )
-                    conn.commit()
-                    delete_scheduled_op(conn, op_id)
-                    processed += 1
-                elif op_type == "delete":
-                    cur.execute("DELETE FROM tasks WHERE id = %s", (task_id,))
-                    conn.commit()
-                    delete_scheduled_op(conn, op_id)
-                    processed += 1
-                else:
-                    delete_scheduled_op(conn, op_id)
-            except Exception:
-                # On any exception while processing an op, remove it to avoid retries/leaks
-                try:
-                    delete_scheduled_op(conn, op.get("id"))
-                except Exception:
-                    pass
-                continue
-    return processed
+    rows = [{"task_id": tid, "deleted_at": deleted_at} for tid in task_ids]
+    if not rows:
+        return
+    await conn.execute(
+        text(
+            "INSERT INTO task_tombstones (task_id, deleted_at) VALUES (:task_id, :deleted_at) "
+            + backend.upsert_clause(["task_id"], ["deleted_at"])
+        ),
+        rows,
+    )
+
+
+async def purge_task_tombstones(conn: AsyncConnection, before: datetime) -> int:
+    """
+    Delete tombstones older than `before` and commit. Returns the number removed.
+    """
+    result = await conn.execute(
+        text("DELETE FROM task_tombstones WHERE deleted_at < :before"), {"before": before}
+    )
+    await commit(conn)
+    return result.rowcount
 
 
 __all__ = [
+    "backend",
     "get_db",
-    "init_db",
+    "get_replica_db",
+    "served_by_replica",
+    "ReadConsistency",
+    "read_consistency_var",
+    "write_token",
+    "parse_write_token",
+    "REPLICA_ENABLED",
+    "REPLICA_MAX_LAG_SECONDS",
+    "close_db",
+    "commit",
+    "warm_pool",
+    "pool_stats",
+    "pool_metrics",
+    "POOL_OPTIONS",
     "row_to_task",
+    "fetch_task_row",
+    "fetch_task_rows",
+    "fetch_taken_task_keys",
+    "task_unique_key",
     "iso_utc_now",
     "to_utc",
     "parse_rfc3339",
     "normalize_rfc3339",
+    "utc_now",
+    "to_db_datetime",
+    "as_db_datetime",
+    "format_rfc3339",
+    "format_api_timestamp",
+    "add_enqueue_listener",
+    "insert_scheduled_op",
     "enqueue_scheduled_op",
+    "notify_enqueue_listeners",
+    "fetch_next_execute_ats",
+    "count_scheduled_ops",
     "fetch_due_scheduled_ops",
     "delete_scheduled_op",
-    "process_due_scheduled_ops_once",
+    "delete_scheduled_ops",
+    "TOMBSTONE_RETENTION_DAYS",
+    "insert_task_tombstones",
+    "purge_task_tombstones",
 ]
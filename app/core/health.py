@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from prometheus_client import Histogram
+from sqlalchemy import text
+
+from core.db import REPLICA_ENABLED, get_db, get_replica_db, pool_stats
+from core.leader import leader
+from core.scheduler import due_timer
+from core.scheduler import metrics as scheduler_metrics
+
+# Startup / readiness state and the cached health report of this replica.
+# Liveness (/livez) only says the event loop answers; readiness (/readyz) flips once the
+# schema is migrated and the connection pool is warm. Cold-start timings are measured from
+# the import of this module (by main.py), so interpreter and library import time is not
+# included.
+# /health never runs more than one DB ping per HEALTH_DB_TTL, whatever the probe rate.
+# A configured read replica is pinged the same way; when it fails, reads fall back to the
+# primary, so /health reports "degraded" (replica_unavailable), not "unhealthy".
+# Env vars:
+#   HEALTH_DB_TTL (default 5) — seconds a DB check result is reused
+#   HEALTH_DB_TIMEOUT (default 2) — seconds before a DB check counts as failed
+#   HEALTH_LOOP_LAG_INTERVAL (default 0.5) — sampling period of the event-loop lag monitor
+#   HEALTH_POOL_SATURATION_WARN (default 0.9), HEALTH_SCHEDULER_LAG_WARN (default 60 s),
+#   HEALTH_LOOP_LAG_WARN_MS (default 200) — thresholds above which /health says "degraded"
+
+DB_TTL_SECONDS = float(os.getenv("HEALTH_DB_TTL", "5"))
+DB_TIMEOUT_SECONDS = float(os.getenv("HEALTH_DB_TIMEOUT", "2"))
+LOOP_LAG_INTERVAL_SECONDS = float(os.getenv("HEALTH_LOOP_LAG_INTERVAL", "0.5"))
+POOL_SATURATION_WARN = float(os.getenv("HEALTH_POOL_SATURATION_WARN", "0.9"))
+SCHEDULER_LAG_WARN_SECONDS = float(os.getenv("HEALTH_SCHEDULER_LAG_WARN", "60"))
+LOOP_LAG_WARN_MS = float(os.getenv("HEALTH_LOOP_LAG_WARN_MS", "200"))
+
+logger = logging.getLogger("tasks.health")
+
+
+class StartupState:
+    """
+    Readiness flag plus the timings and failures of the background startup sequence.
+    """
+
+    def __init__(self) -> None:
+        self.started_at = time.monotonic()
+        self.ready = False
+        self.attempts = 0
+        self.last_error: Optional[str] = None
+        self.ready_after_s: Optional[float] = None
+        self.first_request_after_s: Optional[float] = None
+
+    def _elapsed(self) -> float:
+        return round(time.monotonic() - self.started_at, 3)
+
+    def record_failure(self, error: BaseException) -> None:
+        self.attempts += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+
+    def mark_ready(self) -> None:
+        self.attempts += 1
+        self.ready = True
+        self.last_error = None
+        self.ready_after_s = self._elapsed()
+        logger.info("Ready after %ss (%d attempt(s))", self.ready_after_s, self.attempts)
+
+    def record_request(self) -> None:
+        """
+        Record the first request served once ready (probes excluded by the caller).
+        """
+        if self.first_request_after_s is None and self.ready:
+            self.first_request_after_s = self._elapsed()
+            logger.info("Cold start: first request served after %ss", self.first_request_after_s)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "uptime_s": self._elapsed(),
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "ready_after_s": self.ready_after_s,
+            "first_request_after_s": self.first_request_after_s,
+        }
+
+
+LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop ran a sampler scheduled every HEALTH_LOOP_LAG_INTERVAL",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag as the overshoot of a periodic asyncio.sleep: a loop blocked
+    by synchronous work wakes the sampler late by that much.
+    """
+
+    def __init__(self, interval_seconds: float, window: int = 120) -> None:
+        self.interval_seconds = interval_seconds
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.last_lag_ms = 0.0
+
+    async def run(self) -> None:
+        try:
+            while True:
+                start = time.monotonic()
+                await asyncio.sleep(self.interval_seconds)
+                lag_ms = max(0.0, time.monotonic() - start - self.interval_seconds) * 1000.0
+                self.last_lag_ms = lag_ms
+                self._samples.append(lag_ms)
+                LOOP_LAG_SECONDS.observe(lag_ms / 1000.0)
+        except asyncio.CancelledError:
+            return
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "lag_ms": round(self.last_lag_ms, 2),
+            "max_lag_ms": round(max(self._samples, default=0.0), 2),
+            "window_seconds": round(self.interval_seconds * (self._samples.maxlen or 0), 1),
+        }
+
+
+class DBHealthCheck:
+    """
+    `SELECT 1` result cached for ttl_seconds. Concurrent probes share one in-flight check,
+    and a check is skipped (previous result kept) while the pool is saturated so probes
+    never queue behind real traffic for a connection. `pool` is "primary" or "replica".
+    """
+
+    def __init__(self, ttl_seconds: float, timeout_seconds: float, pool: str = "primary") -> None:
+        self.pool = pool
+        self.ttl_seconds = ttl_seconds
+        self.timeout_seconds = timeout_seconds
+        self._lock = asyncio.Lock()
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+        self.checks_total = 0
+        self.skipped_total = 0
+
+    def _fresh(self) -> bool:
+        return self._result is not None and time.monotonic() - self._checked_at < self.ttl_seconds
+
+    async def _ping(self) -> None:
+        async with (get_replica_db() if self.pool == "replica" else get_db()) as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def _check(self) -> None:
+        if self._result is not None and pool_stats(self.pool)["saturation"] >= 1.0:
+            self.skipped_total += 1
+            self._checked_at = time.monotonic()
+            return
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._ping(), timeout=self.timeout_seconds)
+            result: Dict[str, Any] = {"ok": True, "error": None}
+        except Exception as e:
+            result = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000.0, 2)
+        self.checks_total += 1
+        self._result = result
+        self._checked_at = time.monotonic()
+
+    async def status(self) -> Dict[str, Any]:
+        if not self._fresh():
+            async with self._lock:
+                if not self._fresh():
+                    await self._check()
+        assert self._result is not None
+        return {
+            **self._result,
+            "age_s": round(time.monotonic() - self._checked_at, 3),
+            "ttl_s": self.ttl_seconds,
+            "checks_total": self.checks_total,
+            "skipped_total": self.skipped_total,
+        }
+
+
+def scheduler_health() -> Dict[str, Any]:
+    return {
+        "overdue_seconds": round(due_timer.overdue_seconds(), 3),
+        "last_lag_seconds": round(scheduler_metrics.last_lag_s, 3),
+        "ops_per_second": round(scheduler_metrics.ops_per_second(), 3),
+        "last_run_at": scheduler_metrics.last_run_at,
+    }
+
+
+async def health_report() -> Dict[str, Any]:
+    """
+    Structured health of this replica. The only DB access is the TTL-cached ping.
+    """
+    db = await db_health.status()
+    pool = pool_stats()
+    scheduler = scheduler_health()
+    event_loop = loop_lag.snapshot()
+    warnings: List[str] = []
+    if pool["saturation"] >= POOL_SATURATION_WARN:
+        warnings.append("pool_saturated")
+    if scheduler["overdue_seconds"] >= SCHEDULER_LAG_WARN_SECONDS:
+        warnings.append("scheduler_lagging")
+    if event_loop["lag_ms"] >= LOOP_LAG_WARN_MS:
+        warnings.append("event_loop_lagging")
+    checks: Dict[str, Any] = {"database": db, "pool": pool}
+    if replica_health is not None:
+        replica = await replica_health.status()
+        checks["replica"] = {**replica, "pool": pool_stats("replica")}
+        if not replica["ok"]:
+            warnings.append("replica_unavailable")
+    if not db["ok"]:
+        status = "unhealthy"
+    else:
+        status = "degraded" if warnings else "healthy"
+    return {
+        "status": status,
+        "service": "tasks-api",
+        "database": "connected" if db["ok"] else "disconnected",
+        "warnings": warnings,
+        "checks": {
+            **checks,
+            "scheduler": scheduler,
+            "event_loop": event_loop,
+            "worker": leader.snapshot(),
+        },
+    }
+
+
+# Module-level state
+startup = StartupState()
+loop_lag = LoopLagMonitor(LOOP_LAG_INTERVAL_SECONDS)
+db_health = DBHealthCheck(DB_TTL_SECONDS, DB_TIMEOUT_SECONDS)
+replica_health: Optional[DBHealthCheck] = (
+    DBHealthCheck(DB_TTL_SECONDS, DB_TIMEOUT_SECONDS, pool="replica") if REPLICA_ENABLED else None
+)
+
+
+__all__ = [
+    "StartupState",
+    "LoopLagMonitor",
+    "DBHealthCheck",
+    "scheduler_health",
+    "health_report",
+    "startup",
+    "loop_lag",
+    "db_health",
+    "replica_health",
+]
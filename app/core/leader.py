@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import os
+import signal
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Leadership between the worker processes of one pod (server.py or `uvicorn --workers N`).
+# Migrations, the scheduled-ops executor and the tombstone purge run in the leader only;
+# the other workers serve requests. The leader holds an exclusive flock on
+# LEADER_LOCK_FILE, which the kernel drops when the process exits, so a surviving or
+# restarted worker takes over on its next try. Pods do not share the file: every pod has
+# its own leader, and the executors of different pods still coordinate through the DB.
+# The leader writes its PID into the file so the other workers can wake it up (SIGUSR1)
+# when they enqueue an op it has to run soon.
+# Env vars:
+#   LEADER_LOCK_FILE (default /tmp/tasks-api-leader.lock) — must be on a pod-local,
+#       writable volume
+#   LEADER_RETRY_INTERVAL (default 5) — seconds between two takeover attempts of a worker
+
+LOCK_FILE = os.getenv("LEADER_LOCK_FILE", "/tmp/tasks-api-leader.lock")
+RETRY_INTERVAL_SECONDS = float(os.getenv("LEADER_RETRY_INTERVAL", "5"))
+
+WAKEUP_SIGNAL = signal.SIGUSR1
+
+
+class LeaderLock:
+    """
+    Non-blocking, process-lifetime flock on `path`.
+    """
+
+    def __init__(self, path: str, retry_interval_seconds: float) -> None:
+        self.path = path
+        self.retry_interval_seconds = retry_interval_seconds
+        self.is_leader = False
+        self.leader_since: Optional[float] = None
+        self.wakeups_sent = 0
+        self.lock_error: Optional[str] = None
+        # Only advertise the PID once a WAKEUP_SIGNAL handler is installed: the default
+        # action of SIGUSR1 terminates the process
+        self.accept_wakeups = False
+        self._fd: Optional[int] = None
+        self._leader_pid: Optional[int] = None
+
+    def try_acquire(self) -> bool:
+        if self.is_leader:
+            return True
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError as e:
+            # No lock file, no election: this worker does everything, as every process did
+            # before (executors still coordinate through the DB, migrations take GET_LOCK)
+            self.lock_error = f"{type(e).__name__}: {e}"
+            self.is_leader = True
+            self.leader_since = time.time()
+            return True
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        if self.accept_wakeups:
+            os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        self.is_leader = True
+        self.leader_since = time.time()
+        return True
+
+    async def wait(self) -> None:
+        """
+        Return once this process is the leader.
+        """
+        while not self.try_acquire():
+            await asyncio.sleep(self.retry_interval_seconds)
+
+    def release(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)  # closing the descriptor drops the flock
+            self._fd = None
+        self.is_leader = False
+
+    def leader_pid(self) -> Optional[int]:
+        if self.is_leader:
+            return os.getpid()
+        try:
+            with open(self.path) as f:
+                self._leader_pid = int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            self._leader_pid = None
+        return self._leader_pid
+
+    def wake_leader(self) -> bool:
+        """
+        Signal the leader (from another worker) that it should re-read the op queue.
+        """
+        pid = self._leader_pid or self.leader_pid()
+        if pid is None or self.is_leader:
+            return False
+        try:
+            os.kill(pid, WAKEUP_SIGNAL)
+        except OSError:
+            # Stale PID (leader restarted): re-read the file once
+            pid = self.leader_pid()
+            if pid is None:
+                return False
+            try:
+                os.kill(pid, WAKEUP_SIGNAL)
+            except OSError:
+                return False
+        self.wakeups_sent += 1
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "is_leader": self.is_leader,
+            "leader_pid": self.leader_pid(),
+            "leader_since": self.leader_since,
+            "wakeups_sent": self.wakeups_sent,
+            "lock_error": self.lock_error,
+        }
+
+
+def install_wakeup_handler(callback: Callable[[], None]) -> bool:
+    """
+    Run `callback` on the event loop when another worker sends WAKEUP_SIGNAL, and let
+    `leader` advertise this process's PID. Call it before leader.try_acquire(). Returns
+    False where signal handlers cannot be installed (not the main thread, e.g. under a
+    test client); the leader then only picks up other workers' ops on its periodic refresh.
+    """
+    try:
+        asyncio.get_running_loop().add_signal_handler(WAKEUP_SIGNAL, callback)
+    except (RuntimeError, ValueError, NotImplementedError):
+        return False
+    leader.accept_wakeups = True
+    return True
+
+
+# Module-level lock of this process
+leader = LeaderLock(LOCK_FILE, RETRY_INTERVAL_SECONDS)
+
+
+__all__ = [
+    "LeaderLock",
+    "WAKEUP_SIGNAL",
+    "install_wakeup_handler",
+    "leader",
+]
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Iterator, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    disable_created_metrics,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from prometheus_client.metrics import MetricWrapperBase
+from prometheus_client.samples import Sample
+
+# Prometheus metrics (GET /metrics), recorded with prometheus_client: modules declare their
+# Counter / Gauge / Histogram objects next to the code they measure, in the default registry.
+# METRICS_ENABLED (default true) — set to false to skip the per-request and per-query hooks
+# (pool gauges and GET /metrics keep working).
+# PROMETHEUS_MULTIPROC_DIR (default unset; server.py sets it when it runs several workers) —
+# prometheus_client's multiprocess mode: every worker writes its samples to memory-mapped
+# files in this directory and GET /metrics, answered by any worker, aggregates all of them
+# (counters and histograms summed, gauges per their multiprocess_mode). It must be set
+# before prometheus_client is imported.
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or None
+
+# Default latency buckets, in seconds
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# No <name>_created series next to every counter and histogram
+disable_created_metrics()
+
+
+def render() -> Tuple[bytes, str]:
+    """
+    Prometheus text exposition of this process, or of every worker of the pod in
+    multiprocess mode, with its content type.
+    """
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, MULTIPROC_DIR)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    """
+    Drop the live gauges of a worker that exited (multiprocess mode); its counters and
+    histograms stay in the totals.
+    """
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid, MULTIPROC_DIR)
+
+
+def mark_dead_workers() -> None:
+    """
+    mark_process_dead() every worker whose files are left in PROMETHEUS_MULTIPROC_DIR but
+    that is no longer running (it crashed and was replaced).
+    """
+    if not MULTIPROC_DIR:
+        return
+    pids = set()
+    for entry in os.listdir(MULTIPROC_DIR):
+        # gauge_livesum_<pid>.db, counter_<pid>.db, ...
+        pid = entry.rsplit("_", 1)[-1].split(".", 1)[0]
+        if entry.startswith("gauge_live") and pid.isdigit():
+            pids.add(int(pid))
+    for pid in pids:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            mark_process_dead(pid)
+        except OSError:
+            pass  # alive, owned by another user
+
+
+def _samples(metric: MetricWrapperBase, labels: Dict[str, str]) -> Iterator[Sample]:
+    for family in metric.collect():
+        for sample in family.samples:
+            if all(sample.labels.get(k) == v for k, v in labels.items()):
+                yield sample
+
+
+def sample_value(metric: MetricWrapperBase, **labels: str) -> float:
+    """
+    Current value of a counter or gauge series in this process (0 when never recorded).
+    """
+    for sample in _samples(metric, labels):
+        if not sample.name.endswith("_created"):
+            return sample.value
+    return 0.0
+
+
+def histogram_summary(histogram: MetricWrapperBase, **labels: str) -> Dict[str, Any]:
+    """
+    count / sum / avg of a histogram series in this process, with the upper bounds of the
+    buckets holding its median and 99th percentile (inf when past the last bucket).
+    """
+    buckets = []
+    count = total = 0.0
+    for sample in _samples(histogram, labels):
+        if sample.name.endswith("_bucket"):
+            buckets.append((float(sample.labels["le"]), sample.value))
+        elif sample.name.endswith("_count"):
+            count = sample.value
+        elif sample.name.endswith("_sum"):
+            total = sample.value
+
+    def quantile(q: float) -> float:
+        if not count:
+            return 0.0
+        # Bucket counts are cumulative
+        for bound, cumulative in sorted(buckets):
+            if cumulative >= q * count:
+                return bound
+        return float("inf")
+
+    return {
+        "count": int(count),
+        "sum": round(total, 6),
+        "avg": round(total / count, 6) if count else 0.0,
+        "p50_le": quantile(0.5),
+        "p99_le": quantile(0.99),
+    }
+
+
+__all__ = [
+    "METRICS_ENABLED",
+    "MULTIPROC_DIR",
+    "LATENCY_BUCKETS",
+    "render",
+    "mark_process_dead",
+    "mark_dead_workers",
+    "sample_value",
+    "histogram_summary",
+]
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, MutableMapping, Optional
+
+from prometheus_client import Counter, Histogram
+
+from core import metrics
+from core.correlation import correlation_id_var, sanitize_correlation_id
+from core.db import REPLICA_ENABLED, ReadConsistency, parse_write_token, read_consistency_var, write_token
+from core.health import startup
+from core.tracing import NOOP_SPAN, SPAN_KIND_SERVER, activate, deactivate, set_error, tracer
+
+# Correlation-ID / request-metrics middleware, written as plain ASGI: the response is
+# forwarded message by message (no extra task, no body copy, streaming untouched) and the
+# x-correlation-id header is added to the http.response.start message.
+# Read-your-writes (core.db.ReadConsistency): a request that committed a write gets an
+# x-write-token response header; a client that sends it back as x-write-token on its next
+# reads is served by the primary until the read replica has caught up (DB_REPLICA_MAX_LAG).
+# Without a replica every read goes to the primary and the header is not sent.
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+logger = logging.getLogger("tasks.http")
+
+# Accepted request headers, in order of precedence
+REQUEST_HEADERS = (b"x-correlation-id", b"correlation-id", b"correlation_id")
+TRACEPARENT_HEADER = (b"traceparent",)
+RESPONSE_HEADER = b"x-correlation-id"
+WRITE_TOKEN_HEADER = b"x-write-token"
+
+# Probe traffic does not count as the first served request
+PROBE_PATHS = frozenset({"/livez", "/readyz", "/health"})
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests served", ["method", "route", "status"]
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time until the response body is fully sent",
+    ["method", "route", "status"],
+    buckets=metrics.LATENCY_BUCKETS,
+)
+
+_INTERNAL_ERROR_BODY = json.dumps({"detail": "Internal Server Error"}, separators=(",", ":")).encode()
+
+
+def _header(scope: Scope, names: tuple) -> Optional[str]:
+    found: Dict[bytes, bytes] = {}
+    for key, value in scope.get("headers", ()):
+        if key in names:
+            found.setdefault(key, value)
+    for name in names:
+        if name in found:
+            return found[name].decode("latin-1")
+    return None
+
+
+class CorrelationIdMiddleware:
+    """
+    Reads (or generates) the request's correlation ID, exposes it through
+    `correlation_id_var` and `request.state.correlation_id`, returns it as
+    `x-correlation-id`, turns unhandled errors into a 500 JSON response, records the
+    per-route request metrics and opens the request's root span when tracing samples it.
+    """
+
+    def __init__(self, app: Callable[..., Awaitable[None]]) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        correlation_id = sanitize_correlation_id(_header(scope, REQUEST_HEADERS))
+        scope.setdefault("state", {})["correlation_id"] = correlation_id
+        token = correlation_id_var.set(correlation_id)
+        consistency = ReadConsistency(
+            correlation_id, parse_write_token(_header(scope, (WRITE_TOKEN_HEADER,)))
+        )
+        consistency_token = read_consistency_var.set(consistency)
+        header = (RESPONSE_HEADER, correlation_id.encode("latin-1"))
+        if scope["path"] not in PROBE_PATHS:
+            startup.record_request()
+
+        started = time.perf_counter()
+        status_code = 500
+        response_started = False
+
+        async def send_with_header(message: Message) -> None:
+            nonlocal status_code, response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", ()), header]
+                if REPLICA_ENABLED and consistency.wrote_at is not None:
+                    message["headers"].append(
+                        (WRITE_TOKEN_HEADER, write_token(consistency.wrote_at).encode("latin-1"))
+                    )
+            await send(message)
+
+        span = NOOP_SPAN
+        if tracer.enabled:
+            span = tracer.start_trace(
+                f'{scope["method"]} {scope["path"]}',
+                correlation_id=correlation_id,
+                traceparent=_header(scope, TRACEPARENT_HEADER),
+                kind=SPAN_KIND_SERVER,
+                attributes={"http.method": scope["method"], "http.target": scope["path"]},
+            )
+        span_token = activate(span)
+        try:
+            await self.app(scope, receive, send_with_header)
+        except Exception as e:
+            logger.exception("Unhandled error on %s %s", scope["method"], scope["path"])
+            set_error(span, e)
+            if response_started:
+                raise
+            status_code = 500
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 500,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(_INTERNAL_ERROR_BODY)).encode()),
+                        header,
+                    ],
+                }
+            )
+            await send({"type": "http.response.body", "body": _INTERNAL_ERROR_BODY})
+        finally:
+            # Label by route template (/tasks/{task_id}), never by raw path, to bound cardinality
+            route_path = getattr(scope.get("route"), "path", "<unmatched>")
+            if span is not NOOP_SPAN:
+                span.update_name(f'{scope["method"]} {route_path}')
+                span.set_attribute("http.route", route_path)
+                span.set_attribute("http.status_code", status_code)
+                if status_code >= 500 and span.status.is_unset:
+                    set_error(span, f"HTTP {status_code}")
+                span.end()
+            deactivate(span_token)
+            correlation_id_var.reset(token)
+            read_consistency_var.reset(consistency_token)
+            if metrics.METRICS_ENABLED:
+                labels = (scope["method"], route_path, str(status_code))
+                HTTP_REQUESTS.labels(*labels).inc()
+                HTTP_REQUEST_SECONDS.labels(*labels).observe(time.perf_counter() - started)
+
+
+__all__ = [
+    "CorrelationIdMiddleware",
+    "HTTP_REQUESTS",
+    "HTTP_REQUEST_SECONDS",
+    "PROBE_PATHS",
+    "WRITE_TOKEN_HEADER",
+]
@@ -0,0 +1,496 @@
+"""
+Versioned schema migrations.
+
+Each migration has an integer version and runs once per database; applied versions are
+recorded in `schema_version`. At startup every replica does a single
+`SELECT MAX(version)`: when it matches the latest migration (the common case) no DDL is
+issued and no metadata lock is taken on `tasks`. Otherwise the replica takes a MySQL
+advisory lock (GET_LOCK), re-checks the version and applies what is still pending, so
+exactly one pod migrates while the others wait for it and then find nothing left to do.
+On the SQLite backend (core/storage.py) each migration is one write transaction instead,
+using its `apply_sqlite` step.
+
+New schema changes (indexes, columns) are added by appending to MIGRATIONS — never by
+editing a migration that has already shipped — with the SQLite equivalent as apply_sqlite.
+
+Run out of band (e.g. from a deploy job) with:
+    python -m core.migrations
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from core.db import backend, close_db, get_db, utc_now
+from core.stats import NO_DUE_DATE
+
+# Env vars:
+#   SCHEMA_MIGRATION_LOCK_TIMEOUT (default 600) — seconds a replica waits for another one
+#       to finish migrating before giving up (startup then retries)
+
+LOCK_TIMEOUT_SECONDS = int(os.getenv("SCHEMA_MIGRATION_LOCK_TIMEOUT", "600"))
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[AsyncConnection], Awaitable[None]]
+    # The same change on the SQLite backend (None: nothing to do there)
+    apply_sqlite: Optional[Callable[[AsyncConnection], Awaitable[None]]] = None
+
+
+async def _index_exists(conn: AsyncConnection, table: str, index: str) -> bool:
+    result = await conn.execute(
+        text(
+            """
+            SELECT 1 FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND INDEX_NAME = :index
+            LIMIT 1
+            """
+        ),
+        {"table": table, "index": index},
+    )
+    return result.first() is not None
+
+
+async def _create_index(conn: AsyncConnection, table: str, index: str, columns: str) -> None:
+    if not await _index_exists(conn, table, index):
+        await conn.execute(text(f"CREATE INDEX {index} ON {table}({columns})"))
+
+
+# 1 — base schema
+# Also adopts databases created by the former ad-hoc init_db: tables that already exist are
+# left alone and only missing indexes are created.
+
+
+async def _m0001_base_schema(conn: AsyncConnection) -> None:
+    # Timestamps are DATETIME(6) in UTC, due dates DATE (migration 2 converts databases
+    # created with the former VARCHAR columns)
+    await conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                title VARCHAR(255) NOT NULL,
+                content TEXT,
+                due_date DATE,
+                done TINYINT NOT NULL DEFAULT 0,
+                created_at DATETIME(6) NOT NULL,
+                updated_at DATETIME(6) NOT NULL,
+                last_request_ts DATETIME(6) NOT NULL,
+                UNIQUE KEY ux_tasks_title_due (title, due_date)
+            )
+            """
+        )
+    )
+    await _create_index(conn, "tasks", "idx_tasks_due_date", "due_date")
+    await _create_index(conn, "tasks", "idx_tasks_updated_at", "updated_at")
+
+    await conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                username VARCHAR(255) NOT NULL UNIQUE,
+                email VARCHAR(255),
+                password_hash VARCHAR(255) NOT NULL,
+                is_active TINYINT NOT NULL DEFAULT 1,
+                created_at VARCHAR(32) NOT NULL,
+                updated_at VARCHAR(32) NOT NULL
+            )
+            """
+        )
+    )
+    await _create_index(conn, "users", "idx_users_username", "username")
+    await _create_index(conn, "users", "idx_users_email", "email")
+
+    await conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS scheduled_ops (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                task_id INT,
+                op_type VARCHAR(32) NOT NULL,
+                payload TEXT NOT NULL,
+                execute_at DATETIME(6) NOT NULL,
+                request_ts DATETIME(6) NOT NULL,
+                created_at DATETIME(6) NOT NULL
+            )
+            """
+        )
+    )
+    await _create_index(conn, "scheduled_ops", "idx_schedops_execute_at", "execute_at")
+
+    # One row per deleted task, so GET /tasks/changes can report deletes
+    await conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS task_tombstones (
+                task_id INT PRIMARY KEY,
+                deleted_at DATETIME(6) NOT NULL
+            )
+            """
+        )
+    )
+    await _create_index(conn, "task_tombstones", "idx_tombstones_deleted_at", "deleted_at")
+
+
+# SQLite: the same tables, created directly with the native temporal columns (DATETIME /
+# DATE declared types, see core/storage.py). Titles compare case-insensitively, like under
+# MySQL's default collation, so ux_tasks_title_due rejects the same pairs.
+_SQLITE_BASE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title VARCHAR(255) NOT NULL COLLATE NOCASE,
+        content TEXT,
+        due_date DATE,
+        done TINYINT NOT NULL DEFAULT 0,
+        created_at DATETIME NOT NULL,
+        updated_at DATETIME NOT NULL,
+        last_request_ts DATETIME NOT NULL,
+        CONSTRAINT ux_tasks_title_due UNIQUE (title, due_date)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks(due_date)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_updated_at ON tasks(updated_at)",
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username VARCHAR(255) NOT NULL UNIQUE,
+        email VARCHAR(255),
+        password_hash VARCHAR(255) NOT NULL,
+        is_active TINYINT NOT NULL DEFAULT 1,
+        created_at VARCHAR(32) NOT NULL,
+        updated_at VARCHAR(32) NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)",
+    "CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)",
+    """
+    CREATE TABLE IF NOT EXISTS scheduled_ops (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id INT,
+        op_type VARCHAR(32) NOT NULL,
+        payload TEXT NOT NULL,
+        execute_at DATETIME NOT NULL,
+        request_ts DATETIME NOT NULL,
+        created_at DATETIME NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_schedops_execute_at ON scheduled_ops(execute_at)",
+    """
+    CREATE TABLE IF NOT EXISTS task_tombstones (
+        task_id INT PRIMARY KEY,
+        deleted_at DATETIME NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_tombstones_deleted_at ON task_tombstones(deleted_at)",
+]
+
+
+async def _m0001_base_schema_sqlite(conn: AsyncConnection) -> None:
+    for statement in _SQLITE_BASE_SCHEMA:
+        await conn.execute(text(statement))
+
+
+# 2 — VARCHAR -> native temporal columns
+# Tables created before the switch to native types are converted online: a shadow column is
+# added per legacy column, backfilled in primary-key chunks (each chunk its own short
+# transaction), re-checked in a catch-up pass for rows rewritten meanwhile by replicas
+# still on the previous version, then swapped in with a single in-place ALTER that keeps
+# the table readable and writable. Re-running after an interruption resumes the backfill.
+
+# table -> (primary key, [(column, native type, nullable)])
+_TEMPORAL_COLUMNS: Dict[str, Tuple[str, List[Tuple[str, str, bool]]]] = {
+    "tasks": (
+        "id",
+        [
+            ("due_date", "DATE", True),
+            ("created_at", "DATETIME(6)", False),
+            ("updated_at", "DATETIME(6)", False),
+            ("last_request_ts", "DATETIME(6)", False),
+        ],
+    ),
+    "scheduled_ops": (
+        "id",
+        [
+            ("execute_at", "DATETIME(6)", False),
+            ("request_ts", "DATETIME(6)", False),
+            ("created_at", "DATETIME(6)", False),
+        ],
+    ),
+    "task_tombstones": ("task_id", [("deleted_at", "DATETIME(6)", False)]),
+}
+# Index definitions re-created on the native columns during the swap
+_TEMPORAL_INDEXES: Dict[str, Dict[str, str]] = {
+    "tasks": {
+        "ux_tasks_title_due": "UNIQUE KEY ux_tasks_title_due (title, due_date)",
+        "idx_tasks_due_date": "KEY idx_tasks_due_date (due_date)",
+        "idx_tasks_updated_at": "KEY idx_tasks_updated_at (updated_at)",
+    },
+    "scheduled_ops": {"idx_schedops_execute_at": "KEY idx_schedops_execute_at (execute_at)"},
+    "task_tombstones": {"idx_tombstones_deleted_at": "KEY idx_tombstones_deleted_at (deleted_at)"},
+}
+# Rows per backfill transaction
+BACKFILL_CHUNK_SIZE = 5000
+_SHADOW_SUFFIX = "__native"
+
+
+def _native_value_sql(column: str, native_type: str) -> str:
+    # '2025-09-25T20:00:00Z' -> '2025-09-25 20:00:00' -> DATETIME(6); 'YYYY-MM-DD' -> DATE
+    if native_type == "DATE":
+        return f"CAST({column} AS DATE)"
+    return f"CAST(REPLACE(REPLACE({column}, 'T', ' '), 'Z', '') AS {native_type})"
+
+
+async def _column_types(conn: AsyncConnection, table: str) -> Dict[str, str]:
+    result = await conn.execute(
+        text(
+            """
+            SELECT COLUMN_NAME, DATA_TYPE FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table
+            """
+        ),
+        {"table": table},
+    )
+    return {r[0]: r[1].lower() for r in result.all()}
+
+
+async def _backfill_chunks(
+    conn: AsyncConnection, table: str, pk: str, assignments: str, condition: str
+) -> None:
+    bounds = (await conn.execute(text(f"SELECT MIN({pk}), MAX({pk}) FROM {table}"))).first()
+    await conn.commit()
+    if bounds is None or bounds[0] is None:
+        return
+    low, high = bounds[0] - 1, bounds[1]
+    while low < high:
+        await conn.execute(
+            text(
+                f"UPDATE {table} SET {assignments} "
+                f"WHERE {pk} > :low AND {pk} <= :high AND ({condition})"
+            ),
+            {"low": low, "high": low + BACKFILL_CHUNK_SIZE},
+        )
+        await conn.commit()
+        low += BACKFILL_CHUNK_SIZE
+
+
+async def _migrate_table_temporal(conn: AsyncConnection, table: str) -> bool:
+    pk, columns = _TEMPORAL_COLUMNS[table]
+    types = await _column_types(conn, table)
+    legacy = [c for c in columns if types.get(c[0]) in ("varchar", "char")]
+    if not legacy:
+        return False
+
+    for column, native_type, _ in legacy:
+        if f"{column}{_SHADOW_SUFFIX}" not in types:
+            await conn.execute(
+                text(
+                    f"ALTER TABLE {table} ADD COLUMN {column}{_SHADOW_SUFFIX} {native_type} NULL"
+                )
+            )
+    converted = [
+        (f"{column}{_SHADOW_SUFFIX}", _native_value_sql(column, native_type))
+        for column, native_type, _ in legacy
+    ]
+    assignments = ", ".join(f"{shadow} = {expr}" for shadow, expr in converted)
+    # Backfill rows not converted yet, then catch up rows rewritten since their chunk ran
+    await _backfill_chunks(
+        conn, table, pk, assignments, " OR ".join(f"{shadow} IS NULL" for shadow, _ in converted)
+    )
+    await _backfill_chunks(
+        conn,
+        table,
+        pk,
+        assignments,
+        " OR ".join(f"NOT ({shadow} <=> {expr})" for shadow, expr in converted),
+    )
+
+    legacy_names = {column for column, _, _ in legacy}
+    result = await conn.execute(
+        text(
+            """
+            SELECT DISTINCT INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table
+            """
+        ),
+        {"table": table},
+    )
+    index_columns = result.all()
+    existing_indexes = {name for name, _ in index_columns}
+    dropped = {name for name, column in index_columns if column in legacy_names}
+    clauses = [f"DROP INDEX {name}" for name in sorted(dropped)]
+    for column, native_type, nullable in legacy:
+        clauses.append(f"DROP COLUMN {column}")
+        clauses.append(
+            f"CHANGE COLUMN {column}{_SHADOW_SUFFIX} {column} {native_type} "
+            f"{'NULL' if nullable else 'NOT NULL'}"
+        )
+    for name, definition in _TEMPORAL_INDEXES.get(table, {}).items():
+        if name in dropped or name not in existing_indexes:
+            clauses.append(f"ADD {definition}")
+    await conn.execute(
+        text(f"ALTER TABLE {table} {', '.join(clauses)}, ALGORITHM=INPLACE, LOCK=NONE")
+    )
+    await conn.commit()
+    return True
+
+
+async def _m0002_temporal_columns(conn: AsyncConnection) -> None:
+    for table in _TEMPORAL_COLUMNS:
+        await _migrate_table_temporal(conn, table)
+
+
+# 3 — full-text index for GET /tasks/search (core/search.py)
+# The first FULLTEXT index of a table rebuilds it (hidden FTS_DOC_ID column) and blocks
+# writes to `tasks` meanwhile; run it from a deploy job on large tables.
+# SQLite: nothing to create, searches use the in-process inverted index.
+
+
+async def _m0003_tasks_fulltext(conn: AsyncConnection) -> None:
+    if not await _index_exists(conn, "tasks", "ftx_tasks_title_content"):
+        await conn.execute(
+            text("ALTER TABLE tasks ADD FULLTEXT INDEX ftx_tasks_title_content (title, content)")
+        )
+
+
+# 4 — task_stats summary counters for GET /tasks/stats (core/stats.py), backfilled from
+# `tasks`. Same DDL on both backends. Writes made meanwhile by pods on the previous version
+# are corrected by the first stats reconcile.
+
+
+async def _m0004_task_stats(conn: AsyncConnection) -> None:
+    await conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS task_stats (
+                due_date DATE NOT NULL,
+                done TINYINT NOT NULL,
+                slot SMALLINT NOT NULL,
+                n INT NOT NULL,
+                PRIMARY KEY (due_date, done, slot)
+            )
+            """
+        )
+    )
+    # Re-run after an interruption: the backfill is only done once
+    if (await conn.execute(text("SELECT 1 FROM task_stats LIMIT 1"))).first() is not None:
+        return
+    await conn.execute(
+        text(
+            """
+            INSERT INTO task_stats (due_date, done, slot, n)
+            SELECT COALESCE(due_date, :none), CASE WHEN done <> 0 THEN 1 ELSE 0 END, 0, COUNT(*)
+            FROM tasks
+            GROUP BY 1, 2
+            """
+        ),
+        {"none": NO_DUE_DATE},
+    )
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "base_schema", _m0001_base_schema, _m0001_base_schema_sqlite),
+    # SQLite databases are created with the native columns already
+    Migration(2, "temporal_columns", _m0002_temporal_columns),
+    Migration(3, "tasks_fulltext", _m0003_tasks_fulltext),
+    Migration(4, "task_stats", _m0004_task_stats, _m0004_task_stats),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+async def _ensure_version_table(conn: AsyncConnection) -> None:
+    await conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INT PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                applied_at DATETIME(6) NOT NULL
+            )
+            """
+        )
+    )
+
+
+async def current_version(conn: AsyncConnection) -> int:
+    """
+    Highest applied migration version (0 for a database without `schema_version`).
+    """
+    try:
+        result = await conn.execute(text("SELECT MAX(version) FROM schema_version"))
+    except Exception:
+        await conn.rollback()
+        return 0
+    version = result.scalar()
+    await conn.commit()
+    return int(version or 0)
+
+
+async def _max_version(conn: AsyncConnection) -> int:
+    return int((await conn.execute(text("SELECT MAX(version) FROM schema_version"))).scalar() or 0)
+
+
+async def _apply_pending(conn: AsyncConnection) -> List[int]:
+    await _ensure_version_table(conn)
+    await conn.commit()
+    applied: List[int] = []
+    for migration in MIGRATIONS:
+        # On SQLite this opens the write transaction holding the migration and its
+        # version row; the re-check skips what another process applied meanwhile
+        await backend.begin_write(conn)
+        if migration.version <= await _max_version(conn):
+            await conn.commit()
+            continue
+        # MySQL DDL commits implicitly, so a migration is not atomic: each one is written
+        # to be re-runnable, and its version is only recorded once it has completed.
+        apply = migration.apply if backend.name == "mysql" else migration.apply_sqlite
+        if apply is not None:
+            await apply(conn)
+        await conn.execute(
+            text("INSERT INTO schema_version (version, name, applied_at) VALUES (:v, :n, :at)"),
+            {"v": migration.version, "n": migration.name, "at": utc_now()},
+        )
+        await conn.commit()
+        applied.append(migration.version)
+    return applied
+
+
+async def run_migrations() -> List[int]:
+    """
+    Bring the schema to LATEST_VERSION. Returns the versions applied by this call
+    (empty when another replica, or an earlier start, already did it).
+    """
+    async with get_db() as conn:
+        if await current_version(conn) >= LATEST_VERSION:
+            return []
+        async with backend.migration_lock(conn, LOCK_TIMEOUT_SECONDS):
+            return await _apply_pending(conn)
+
+
+async def _main() -> None:
+    try:
+        applied = await run_migrations()
+        print(f"schema at version {LATEST_VERSION}; applied: {applied or 'none'}")
+    finally:
+        await close_db()
+
+
+__all__ = [
+    "LATEST_VERSION",
+    "MIGRATIONS",
+    "Migration",
+    "current_version",
+    "run_migrations",
+]
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
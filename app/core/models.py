@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import date, datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -126,9 +126,103 @@ class TaskOut(BaseModel):
     )
 
 
+# Upper bound on items accepted by the /tasks:batch endpoints
+BATCH_MAX_ITEMS = 500
+
+
+class TaskBatchUpdateItem(TaskUpdate):
+    """
+    One element of a batch update: a TaskUpdate plus the id of the task to modify.
+    """
+
+    id: int = Field(..., description="Identifier of the task to update")
+
+
+class TaskBatchDeleteItem(TaskDelete):
+    """
+    One element of a batch delete: a TaskDelete plus the id of the task to remove.
+    """
+
+    id: int = Field(..., description="Identifier of the task to delete")
+
+
+class BatchItemResult(BaseModel):
+    """
+    Per-item outcome of a batch request.
+
+    Notes:
+    - status and body are exactly what the single-item endpoint would have returned
+      (e.g. 201 + task, 200 + scheduled op, 404/409 + {"detail": ...}).
+    """
+
+    index: int = Field(..., description="Position of the item in the request array")
+    status: int = Field(..., description="HTTP status the single-item endpoint would return")
+    body: Dict[str, Any] = Field(..., description="Response body for this item")
+
+
+class BatchResult(BaseModel):
+    """
+    Response model of the /tasks:batch endpoints.
+    """
+
+    results: List[BatchItemResult]
+
+
+class TaskChange(BaseModel):
+    """
+    One entry of the delta-sync feed (GET /tasks/changes).
+
+    Notes:
+    - deleted=False: `task` holds the current state of the task (created or updated).
+    - deleted=True: the task was deleted at `changed_at`; `task` is null.
+    """
+
+    id: int = Field(..., description="Identifier of the changed task")
+    deleted: bool = Field(..., description="True if this entry is a tombstone")
+    changed_at: datetime = Field(..., description="updated_at, or deletion time for tombstones")
+    task: Optional[TaskOut] = Field(default=None, description="Current task state (null when deleted)")
+
+
+class TaskChangesPage(BaseModel):
+    """
+    Response model of GET /tasks/changes.
+
+    Notes:
+    - Pass next_cursor back as ?cursor= to resume; it is returned even when the page is
+      empty so clients can keep polling from the same position.
+    """
+
+    changes: List[TaskChange]
+    next_cursor: str = Field(..., description="Opaque position after the last returned change")
+    has_more: bool = Field(..., description="More changes are available right away")
+
+
+class TaskStats(BaseModel):
+    """
+    Response model of GET /tasks/stats. Dates are UTC; the week ends on Sunday.
+    """
+
+    total: int
+    open: int
+    done: int
+    overdue: int = Field(..., description="Open tasks due before today")
+    due_this_week: int = Field(..., description="Open tasks due from today through week_end")
+    no_due_date: int
+    today: date
+    week_end: date
+
+
 __all__ = [
     "TaskCreate",
     "TaskUpdate",
     "TaskDelete",
     "TaskOut",
+    "BATCH_MAX_ITEMS",
+    "TaskBatchUpdateItem",
+    "TaskBatchDeleteItem",
+    "BatchItemResult",
+    "BatchResult",
+    "TaskChange",
+    "TaskChangesPage",
+    "TaskStats",
 ]
@@ -0,0 +1,570 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError as DBIntegrityError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from core.cache import task_cache
+from core.db import (
+    add_enqueue_listener,
+    commit,
+    count_scheduled_ops,
+    delete_scheduled_ops,
+    fetch_due_scheduled_ops,
+    fetch_next_execute_ats,
+    fetch_taken_task_keys,
+    fetch_task_rows,
+    get_db,
+    insert_task_tombstones,
+    as_db_datetime,
+    format_rfc3339,
+    iso_utc_now,
+    utc_now,
+    task_unique_key,
+)
+from core.metrics import LATENCY_BUCKETS
+from core.stats import record_task_stats, stats_key
+from core.tracing import tracer
+
+# Scheduled-ops executor.
+# Every replica runs the same loop, so due ops are *claimed* in bounded batches with
+# SELECT ... FOR UPDATE SKIP LOCKED: a replica never waits on, nor re-applies, ops another
+# replica is already working on (on SQLite the batch takes the database write lock instead,
+# see core/storage.py). Each batch prefetches all of its target tasks in one query
+# and applies every change (task updates/deletes + removal of the consumed ops) in a single
+# transaction, together with the task stats delta (core/stats.py). Scheduled creates
+# (task_id NULL) are inserted with multi-row INSERTs; one that loses a (title, due_date)
+# race to a concurrent create is dropped, not counted as applied.
+# The runner does not poll on a fixed tick: DueTimer keeps an in-process heap of upcoming
+# execute_at values and sleeps exactly until the earliest one. enqueue_scheduled_op wakes it
+# immediately when an earlier op is inserted on this replica; a slow periodic refresh from
+# the DB picks up ops enqueued by other replicas and acts as a safety net.
+# Env vars:
+#   SCHEDULER_BATCH_SIZE (default 200) — max ops claimed per transaction
+#   SCHEDULER_POLL_INTERVAL (default 30) — seconds between safety-net refreshes of the heap
+#   SCHEDULER_TIMER_CAPACITY (default 1000) — max distinct execute_at values kept in memory
+#   SCHEDULER_QUEUE_DEPTH_TTL (default 10) — seconds a scheduled_ops COUNT is reused by
+#       GET /metrics
+
+BATCH_SIZE = max(1, int(os.getenv("SCHEDULER_BATCH_SIZE", "200")))
+POLL_INTERVAL_SECONDS = float(os.getenv("SCHEDULER_POLL_INTERVAL", "30"))
+TIMER_CAPACITY = max(1, int(os.getenv("SCHEDULER_TIMER_CAPACITY", "1000")))
+QUEUE_DEPTH_TTL_SECONDS = float(os.getenv("SCHEDULER_QUEUE_DEPTH_TTL", "10"))
+# Window used to compute the ops/s throughput gauge
+THROUGHPUT_WINDOW_SECONDS = 60.0
+
+OPS_CLAIMED = Counter("scheduler_ops_claimed_total", "Scheduled ops claimed by this replica")
+OPS_APPLIED = Counter("scheduler_ops_applied_total", "Scheduled ops applied by this replica")
+OPS_DROPPED = Counter(
+    "scheduler_ops_dropped_total", "Scheduled ops dropped (stale, malformed or failing)"
+)
+OP_LAG_SECONDS = Histogram(
+    "scheduler_op_lag_seconds",
+    "Delay between an op's execute_at and its application",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+RUN_SECONDS = Histogram(
+    "scheduler_run_duration_seconds", "Duration of one drain of all due ops", buckets=LATENCY_BUCKETS
+)
+# A COUNT over the shared table: the most recent value wins across workers
+QUEUE_DEPTH = Gauge(
+    "scheduled_ops_queue_depth",
+    "Scheduled ops waiting in scheduled_ops (all replicas)",
+    ["state"],
+    multiprocess_mode="mostrecent",
+)
+
+
+class SchedulerMetrics:
+    """
+    In-process counters for the scheduled-ops executor (per replica).
+    """
+
+    def __init__(self) -> None:
+        self.batches_total = 0
+        self.ops_claimed_total = 0
+        self.ops_applied_total = 0
+        self.ops_dropped_total = 0
+        self.batch_failures_total = 0
+        self.last_batch_size = 0
+        self.last_run_at: Optional[str] = None
+        self.last_run_duration_s = 0.0
+        # Lag = how late an op was applied relative to its execute_at
+        self.last_lag_s = 0.0
+        self.max_lag_s = 0.0
+        self._window: Deque[Tuple[float, int]] = deque()
+
+    def record_batch(self, claimed: int, applied: int, lags: List[float]) -> None:
+        self.batches_total += 1
+        self.ops_claimed_total += claimed
+        self.ops_applied_total += applied
+        self.ops_dropped_total += claimed - applied
+        self.last_batch_size = claimed
+        if lags:
+            self.last_lag_s = max(lags)
+            self.max_lag_s = max(self.max_lag_s, self.last_lag_s)
+        self._window.append((time.monotonic(), claimed))
+        OPS_CLAIMED.inc(claimed)
+        OPS_APPLIED.inc(applied)
+        OPS_DROPPED.inc(claimed - applied)
+        for lag in lags:
+            OP_LAG_SECONDS.observe(lag)
+
+    def record_run(self, duration_s: float) -> None:
+        self.last_run_at = iso_utc_now()
+        self.last_run_duration_s = duration_s
+        RUN_SECONDS.observe(duration_s)
+
+    def ops_per_second(self) -> float:
+        cutoff = time.monotonic() - THROUGHPUT_WINDOW_SECONDS
+        while self._window and self._window[0][0] < cutoff:
+            self._window.popleft()
+        return sum(n for _, n in self._window) / THROUGHPUT_WINDOW_SECONDS
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "batch_size": BATCH_SIZE,
+            "batches_total": self.batches_total,
+            "ops_claimed_total": self.ops_claimed_total,
+            "ops_applied_total": self.ops_applied_total,
+            "ops_dropped_total": self.ops_dropped_total,
+            "batch_failures_total": self.batch_failures_total,
+            "last_batch_size": self.last_batch_size,
+            "ops_per_second": round(self.ops_per_second(), 3),
+            "last_lag_seconds": round(self.last_lag_s, 3),
+            "max_lag_seconds": round(self.max_lag_s, 3),
+            "last_run_at": self.last_run_at,
+            "last_run_duration_seconds": round(self.last_run_duration_s, 4),
+        }
+
+
+metrics = SchedulerMetrics()
+
+
+def _epoch(value: Any) -> float:
+    # execute_at values are naive UTC datetimes
+    return as_db_datetime(value).replace(tzinfo=timezone.utc).timestamp()
+
+
+class DueTimer:
+    """
+    Min-heap of upcoming execute_at instants (epoch seconds) driving the executor wakeups.
+    """
+
+    def __init__(self) -> None:
+        self._heap: List[float] = []
+        self._members: Set[float] = set()
+        self._wakeup = asyncio.Event()
+        self._next_refresh = 0.0
+        # Set by the first wait_for_due(): only the process running the executor keeps a heap
+        self.active = False
+        self.wakeups_total = 0
+        self.refreshes_total = 0
+
+    def _push(self, when: float) -> None:
+        if when in self._members:
+            return
+        heapq.heappush(self._heap, when)
+        self._members.add(when)
+        if len(self._heap) > TIMER_CAPACITY:
+            # Keep the earliest half; later instants come back through refresh()
+            self._heap = heapq.nsmallest(TIMER_CAPACITY // 2 or 1, self._heap)
+            self._members = set(self._heap)
+
+    def notify(self, execute_at: datetime) -> None:
+        """
+        Enqueue hook: record a new execute_at and wake the runner if it is now the earliest.
+        """
+        if not self.active:
+            return
+        try:
+            when = _epoch(execute_at)
+        except Exception:
+            return
+        earliest = self._heap[0] if self._heap else None
+        self._push(when)
+        if earliest is None or when < earliest:
+            self._wakeup.set()
+
+    def request_refresh(self) -> None:
+        """
+        Re-read the queue from the DB now (an op was enqueued by another worker process).
+        """
+        self._next_refresh = 0.0
+        self._wakeup.set()
+
+    async def refresh(self) -> None:
+        """
+        Reload the heap from the earliest queued execute_at values (all replicas' ops).
+        """
+        async with get_db() as conn:
+            upcoming = await fetch_next_execute_ats(conn, TIMER_CAPACITY)
+        self._heap = sorted({_epoch(v) for v in upcoming})
+        self._members = set(self._heap)
+        self._next_refresh = time.time() + POLL_INTERVAL_SECONDS
+        self.refreshes_total += 1
+
+    async def wait_for_due(self) -> None:
+        """
+        Sleep until the earliest known op is due, an earlier op is enqueued, or the
+        safety-net refresh deadline passes (which may itself reveal due ops).
+        """
+        self.active = True
+        while True:
+            if time.time() >= self._next_refresh:
+                await self.refresh()
+            if self._heap and self._heap[0] <= time.time():
+                self.wakeups_total += 1
+                return
+            deadline = self._next_refresh
+            if self._heap:
+                deadline = min(deadline, self._heap[0])
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, deadline - time.time()))
+            except asyncio.TimeoutError:
+                pass
+
+    def overdue_seconds(self) -> float:
+        """
+        How long the earliest known op has been due (0 when nothing is waiting).
+        """
+        if not self._heap:
+            return 0.0
+        return max(0.0, time.time() - self._heap[0])
+
+    def mark_processed(self, upto: float) -> None:
+        """
+        Drop instants <= upto once the executor has drained everything due at that time.
+        """
+        while self._heap and self._heap[0] <= upto:
+            self._members.discard(heapq.heappop(self._heap))
+
+    def snapshot(self) -> Dict[str, Any]:
+        next_due = (
+            format_rfc3339(datetime.fromtimestamp(self._heap[0], timezone.utc).replace(tzinfo=None))
+            if self._heap
+            else None
+        )
+        return {
+            "timer_pending": len(self._heap),
+            "timer_next_execute_at": next_due,
+            "timer_wakeups_total": self.wakeups_total,
+            "timer_refreshes_total": self.refreshes_total,
+            "poll_interval_seconds": POLL_INTERVAL_SECONDS,
+        }
+
+
+due_timer = DueTimer()
+add_enqueue_listener(due_timer.notify)
+
+
+_INSERT_TASK_SQL = text(
+    """
+    INSERT INTO tasks (title, content, due_date, done, created_at, updated_at, last_request_ts)
+    VALUES (:title, :content, :due_date, :done, :created_at, :updated_at, :last_request_ts)
+    """
+)
+
+
+async def _insert_tasks(conn: AsyncConnection, rows: List[Dict[str, Any]]) -> List[bool]:
+    """
+    Insert the batch's scheduled creates; returns whether each row was inserted.
+    executemany on a single-VALUES INSERT is rewritten by the driver into multi-row INSERTs
+    (chunked by max statement length), so thousands of creates due in the same second land
+    in a handful of round trips. When a concurrent immediate create won a (title, due_date)
+    race after the in-memory check, the duplicate key fails the bulk insert: it is rolled
+    back to its savepoint and the rows are inserted one at a time, so exactly the losing
+    creates are dropped (a failing INSERT only rolls back itself).
+    """
+    try:
+        async with conn.begin_nested():
+            await conn.execute(_INSERT_TASK_SQL, rows)
+        return [True] * len(rows)
+    except DBIntegrityError:
+        pass
+    inserted: List[bool] = []
+    for row in rows:
+        try:
+            await conn.execute(_INSERT_TASK_SQL, row)
+        except DBIntegrityError:
+            inserted.append(False)
+        else:
+            inserted.append(True)
+    return inserted
+
+
+async def _apply_ops(
+    conn: AsyncConnection, ops: List[Dict[str, Any]]
+) -> Tuple[int, List[float], Dict[int, Optional[Dict[str, Any]]]]:
+    """
+    Apply a claimed batch inside the caller's transaction.
+    Ops are replayed in execute_at order against an in-memory copy of their target tasks,
+    so several ops on the same task in one batch behave exactly like sequential execution;
+    only the final state of each touched task is written. Scheduled creates are checked
+    against ux_tasks_title_due in memory (existing rows, renames/deletes earlier in the
+    batch, earlier creates) and inserted with one multi-row INSERT.
+    Returns (applied_count, lag_seconds_of_applied_ops, written) where `written` maps each
+    updated task id to its final row and each deleted id to None.
+    """
+    parsed: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+    for op in ops:
+        try:
+            payload = json.loads(op.get("payload") or "{}")
+            op["request_ts"] = as_db_datetime(op["request_ts"])
+            op["execute_at"] = as_db_datetime(op["execute_at"])
+        except Exception:
+            continue  # malformed op: dropped with the rest of the batch
+        parsed.append((op, payload))
+
+    target_ids = sorted({op["task_id"] for op, _ in parsed if op.get("task_id") is not None})
+    # Lock the targets so immediate writes on the same tasks serialize behind this batch
+    state: Dict[int, Optional[Dict[str, Any]]] = dict(
+        await fetch_task_rows(conn, target_ids, for_update=True)
+    )
+    taken = await fetch_taken_task_keys(
+        conn, [(p.get("title"), p.get("due_date")) for op, p in parsed if op["op_type"] == "create"]
+    )
+    for tid, row in state.items():
+        key = task_unique_key(row["title"], row["due_date"])
+        if key:
+            taken[key] = tid
+    stats_before = {tid: stats_key(row["due_date"], row["done"]) for tid, row in state.items()}
+
+    dirty: set = set()
+    deleted: set = set()
+    inserts: List[Dict[str, Any]] = []
+    insert_lags: List[float] = []
+    applied = 0
+    lags: List[float] = []
+    now = utc_now()
+
+    for op, payload in parsed:
+        req_ts = op["request_ts"]
+        if op["op_type"] == "create":
+            key = task_unique_key(payload.get("title"), payload.get("due_date"))
+            if key in taken or not payload.get("title"):
+                # Same (title, due_date) as an existing task: dropped like a 409 create
+                continue
+            if key:
+                taken[key] = 0
+            inserts.append(
+                {
+                    "title": payload["title"],
+                    "content": payload.get("content"),
+                    "due_date": payload.get("due_date"),
+                    "done": int(payload.get("done") or 0),
+                    "created_at": now,
+                    "updated_at": now,
+                    "last_request_ts": op["request_ts"],
+                }
+            )
+            # Counted as applied once the INSERT succeeds (see _insert_tasks)
+            insert_lags.append((now - op["execute_at"]).total_seconds())
+            continue
+
+        task_id = op.get("task_id")
+        task_row = state.get(task_id)
+        if not task_row:
+            # Nothing to apply (missing, deleted earlier in this batch, or no target)
+            continue
+        if not (req_ts > as_db_datetime(task_row["last_request_ts"])):
+            # Conflict at execution time; drop the scheduled op
+            continue
+
+        old_key = task_unique_key(task_row["title"], task_row["due_date"])
+        if op["op_type"] == "update":
+            new_key = task_unique_key(
+                payload.get("title", task_row["title"]),
+                payload.get("due_date", task_row["due_date"]),
+            )
+            if new_key and new_key != old_key and new_key in taken:
+                # Would violate ux_tasks_title_due; drop like the failing UPDATE would
+                continue
+            task_row["title"] = payload.get("title", task_row["title"])
+            task_row["content"] = payload.get("content", task_row["content"])
+            task_row["due_date"] = payload.get("due_date", task_row["due_date"])
+            if payload.get("done") is not None:
+                task_row["done"] = int(payload["done"])
+            task_row["last_request_ts"] = op["request_ts"]
+            task_row["updated_at"] = now
+            dirty.add(task_id)
+            if old_key != new_key:
+                taken.pop(old_key, None)
+                if new_key:
+                    taken[new_key] = task_id
+        elif op["op_type"] == "delete":
+            state[task_id] = None
+            deleted.add(task_id)
+            dirty.discard(task_id)
+            taken.pop(old_key, None)
+        else:
+            continue
+        applied += 1
+        lags.append((now - op["execute_at"]).total_seconds())
+
+    if dirty:
+        await conn.execute(
+            text(
+                """
+                UPDATE tasks
+                SET title = :title, content = :content, due_date = :due_date, done = :done,
+                    updated_at = :updated_at, last_request_ts = :last_request_ts
+                WHERE id = :id
+                """
+            ),
+            [
+                {
+                    "title": state[tid]["title"],
+                    "content": state[tid]["content"],
+                    "due_date": state[tid]["due_date"],
+                    "done": int(state[tid]["done"]),
+                    "updated_at": now,
+                    "last_request_ts": state[tid]["last_request_ts"],
+                    "id": tid,
+                }
+                for tid in sorted(dirty)
+            ],
+        )
+    if deleted:
+        await conn.execute(
+            text("DELETE FROM tasks WHERE id = :id"), [{"id": tid} for tid in sorted(deleted)]
+        )
+        await insert_task_tombstones(conn, sorted(deleted), now)
+    created: List[Dict[str, Any]] = []
+    if inserts:
+        for row, lag, inserted in zip(inserts, insert_lags, await _insert_tasks(conn, inserts)):
+            if inserted:
+                created.append(row)
+                applied += 1
+                lags.append(lag)
+    await record_task_stats(
+        conn,
+        removed=[stats_before[tid] for tid in sorted(dirty | deleted)],
+        added=[stats_key(state[tid]["due_date"], state[tid]["done"]) for tid in sorted(dirty)]
+        + [stats_key(row["due_date"], row["done"]) for row in created],
+    )
+    await delete_scheduled_ops(conn, [op["id"] for op in ops])
+    written: Dict[int, Optional[Dict[str, Any]]] = {tid: state[tid] for tid in dirty}
+    written.update({tid: None for tid in deleted})
+    return applied, lags, written
+
+
+async def _refresh_cache(written: Dict[int, Optional[Dict[str, Any]]]) -> None:
+    for tid, row in written.items():
+        if row is None:
+            await task_cache.invalidate(tid)
+        else:
+            await task_cache.store(tid, row)
+
+
+async def _run_batch(conn: AsyncConnection, now: datetime, limit: int) -> Tuple[int, int]:
+    """
+    Claim up to `limit` due ops, apply them and commit. Returns (claimed, applied).
+    On failure the transaction is rolled back and the claimed ops fall back to one-op
+    transactions, so a single poisonous op (e.g. an update hitting ux_tasks_title_due)
+    is dropped without blocking the rest of the batch.
+    """
+    with tracer.span("scheduler.batch", attributes={"scheduler.limit": limit}) as span:
+        claimed, applied = await _claim_and_apply(conn, now, limit)
+        span.set_attribute("scheduler.claimed", claimed)
+        span.set_attribute("scheduler.applied", applied)
+    return claimed, applied
+
+
+async def _claim_and_apply(conn: AsyncConnection, now: datetime, limit: int) -> Tuple[int, int]:
+    ops = await fetch_due_scheduled_ops(conn, now, limit=limit, skip_locked=True)
+    if not ops:
+        await conn.rollback()
+        return 0, 0
+    try:
+        applied, lags, written = await _apply_ops(conn, ops)
+        await commit(conn)
+    except Exception:
+        await conn.rollback()
+        metrics.batch_failures_total += 1
+        if limit == 1:
+            # Poisonous op: remove it to avoid retries/leaks
+            await delete_scheduled_ops(conn, [ops[0]["id"]])
+            await commit(conn)
+            metrics.record_batch(1, 0, [])
+            return 1, 0
+        claimed = applied = 0
+        for _ in ops:
+            c, a = await _run_batch(conn, now, 1)
+            claimed += c
+            applied += a
+        return claimed, applied
+    await _refresh_cache(written)
+    metrics.record_batch(len(ops), applied, lags)
+    return len(ops), applied
+
+
+async def process_due_scheduled_ops_once() -> int:
+    """
+    Process all scheduled operations that are due right now, BATCH_SIZE at a time.
+    Returns the number of applied operations.
+    Each operation is applied only if its request_ts is still greater than the current stored last_request_ts.
+    """
+    started = time.perf_counter()
+    processed = 0
+    with tracer.trace("scheduler.run") as span:
+        async with get_db() as conn:
+            now = utc_now()
+            drained_upto = _epoch(now)
+            while True:
+                claimed, applied = await _run_batch(conn, now, BATCH_SIZE)
+                processed += applied
+                if claimed < BATCH_SIZE:
+                    break
+        span.set_attribute("scheduler.applied", processed)
+    due_timer.mark_processed(drained_upto)
+    metrics.record_run(time.perf_counter() - started)
+    return processed
+
+
+_queue_depth_checked_at = 0.0
+
+
+async def refresh_queue_depth() -> None:
+    """
+    Update the scheduled_ops_queue_depth gauge, at most once per SCHEDULER_QUEUE_DEPTH_TTL.
+    """
+    global _queue_depth_checked_at
+    if time.monotonic() - _queue_depth_checked_at < QUEUE_DEPTH_TTL_SECONDS:
+        return
+    _queue_depth_checked_at = time.monotonic()
+    async with get_db() as conn:
+        queued, due = await count_scheduled_ops(conn, utc_now())
+    QUEUE_DEPTH.labels("queued").set(queued)
+    QUEUE_DEPTH.labels("due").set(due)
+
+
+def snapshot() -> Dict[str, Any]:
+    """
+    Executor counters plus the state of the wakeup timer.
+    """
+    return {**metrics.snapshot(), **due_timer.snapshot()}
+
+
+__all__ = [
+    "BATCH_SIZE",
+    "POLL_INTERVAL_SECONDS",
+    "DueTimer",
+    "SchedulerMetrics",
+    "due_timer",
+    "metrics",
+    "process_due_scheduled_ops_once",
+    "refresh_queue_depth",
+    "snapshot",
+]
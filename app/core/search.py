@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import math
+import os
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Mapping, Optional
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from core.db import TOMBSTONE_RETENTION_DAYS, backend, utc_now
+
+# Full-text search over task title and content (GET /tasks/search).
+# A query matches the tasks containing every one of its words; results are ranked by
+# relevance, ties broken by id.
+#   MySQL backend: FULLTEXT index ftx_tasks_title_content (migration 3), queried with
+#       MATCH ... AGAINST in boolean mode (+word +word) and ranked by InnoDB's relevance.
+#   SQLite backend: an in-process inverted index (word -> task id -> occurrences), ranked
+#       with BM25. Each process builds it from `tasks` on its first search, then catches up
+#       before every search from updated_at / task_tombstones (the /tasks/changes sources),
+#       so writes made by other workers and by the scheduled-ops executor are seen too.
+# Words are split and filtered the way InnoDB's default full-text parser does: runs of
+# letters, digits and '_', case-insensitive, at least MIN_TOKEN_LENGTH characters
+# (innodb_ft_min_token_size), InnoDB's default stopwords left out. Both backends therefore
+# match the same tasks; only the scores differ.
+# Env vars:
+#   SEARCH_MAX_RESULTS (default 1000) — deepest ranked result reachable through offset
+#       pagination; bounds the work of one search on both backends
+
+MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "1000"))
+MIN_TOKEN_LENGTH = 3
+# INNODB_FT_DEFAULT_STOPWORD
+STOPWORDS = frozenset(
+    "a about an are as at be by com de en for from how i in is it la of on or that the this "
+    "to was what when where who will with und www".split()
+)
+_WORD_RE = re.compile(r"\w+")
+# Rows whose updated_at / deleted_at fall this close behind the last catch-up are read
+# again: the timestamps are taken before commit (see CHANGES_SETTLE_SECONDS)
+SYNC_OVERLAP_SECONDS = 2
+# Rows tokenized between two awaits while building: bounds the event-loop stall per chunk
+_SCAN_FETCH_SIZE = 200
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    if not value:
+        return []
+    return [
+        word
+        for word in _WORD_RE.findall(value.lower())
+        if len(word) >= MIN_TOKEN_LENGTH and word not in STOPWORDS
+    ]
+
+
+def query_terms(query: str) -> List[str]:
+    """
+    Distinct searchable words of a query, in order ([] when nothing is searchable).
+    """
+    return list(dict.fromkeys(tokenize(query)))
+
+
+class FullTextSearch:
+    """
+    MySQL FULLTEXT search. Read-only, so it can run on the read replica.
+    """
+
+    backend = "mysql-fulltext"
+    replica_safe = True
+
+    def __init__(self) -> None:
+        self.searches = 0
+
+    async def search(
+        self, conn: AsyncConnection, terms: List[str], limit: int, offset: int = 0
+    ) -> List[Mapping[str, Any]]:
+        self.searches += 1
+        result = await conn.execute(
+            text(
+                """
+                SELECT *, MATCH(title, content) AGAINST (:q IN BOOLEAN MODE) AS score
+                FROM tasks
+                WHERE MATCH(title, content) AGAINST (:q IN BOOLEAN MODE)
+                ORDER BY score DESC, id ASC
+                LIMIT :limit OFFSET :offset
+                """
+            ),
+            {"q": " ".join(f"+{term}" for term in terms), "limit": limit, "offset": offset},
+        )
+        return result.mappings().all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "searches": self.searches, "max_results": MAX_RESULTS}
+
+
+class InvertedIndexSearch:
+    """
+    In-process inverted index over title + content. Not thread-safe; it is only used from
+    the event loop. Catching up reads the primary, so it never runs on the read replica.
+    """
+
+    backend = "inverted-index"
+    replica_safe = False
+    # BM25 parameters
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self) -> None:
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_terms: Dict[int, Counter] = {}
+        self._doc_lengths: Dict[int, int] = {}
+        self._total_length = 0
+        # Time of the last catch-up: later writes are not indexed yet (None: not built)
+        self._position: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+        self.searches = 0
+        self.rebuilds = 0
+        self.syncs = 0
+        self.rows_indexed = 0
+
+    def _remove(self, task_id: int) -> None:
+        terms = self._doc_terms.pop(task_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            del postings[task_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(task_id)
+
+    def _index(self, task_id: int, title: Optional[str], content: Optional[str]) -> None:
+        self._remove(task_id)
+        terms = Counter(tokenize(title) + tokenize(content))
+        if not terms:
+            return
+        for term, count in terms.items():
+            self._postings.setdefault(term, {})[task_id] = count
+        self._doc_terms[task_id] = terms
+        length = sum(terms.values())
+        self._doc_lengths[task_id] = length
+        self._total_length += length
+        self.rows_indexed += 1
+
+    async def _rebuild(self, conn: AsyncConnection, now: datetime) -> None:
+        self._postings.clear()
+        self._doc_terms.clear()
+        self._doc_lengths.clear()
+        self._total_length = 0
+        result = await conn.stream(
+            text("SELECT id, title, content FROM tasks").execution_options(
+                yield_per=_SCAN_FETCH_SIZE
+            )
+        )
+        async for row in result:
+            self._index(row.id, row.title, row.content)
+        self._position = now
+        self.rebuilds += 1
+
+    async def _catch_up(self, conn: AsyncConnection) -> None:
+        now = utc_now()
+        if self._position is None or self._position < now - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+            # First search, or deletes since the last one may have been purged already
+            await self._rebuild(conn, now)
+            return
+        since = self._position - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+        deleted = await conn.execute(
+            text("SELECT task_id FROM task_tombstones WHERE deleted_at >= :since"), {"since": since}
+        )
+        for (task_id,) in deleted:
+            self._remove(task_id)
+        changed = await conn.execute(
+            text("SELECT id, title, content FROM tasks WHERE updated_at >= :since"), {"since": since}
+        )
+        for row in changed:
+            self._index(row.id, row.title, row.content)
+        self._position = now
+        self.syncs += 1
+
+    def _ranked_ids(self, terms: List[str], count: int) -> List[int]:
+        postings = [self._postings.get(term) for term in terms]
+        if not postings or any(p is None for p in postings):
+            return []
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for p in postings[1:]:
+            candidates.intersection_update(p)
+            if not candidates:
+                return []
+        docs = len(self._doc_lengths)
+        avg_length = self._total_length / docs
+        idfs = [math.log(1.0 + (docs - len(p) + 0.5) / (len(p) + 0.5)) for p in postings]
+
+        def score(task_id: int) -> float:
+            norm = self.K1 * (1.0 - self.B + self.B * self._doc_lengths[task_id] / avg_length)
+            total = 0.0
+            for idf, p in zip(idfs, postings):
+                tf = p[task_id]
+                total += idf * tf * (self.K1 + 1.0) / (tf + norm)
+            return total
+
+        return [
+            task_id
+            for _, task_id in heapq.nsmallest(count, ((-score(t), t) for t in candidates))
+        ]
+
+    async def search(
+        self, conn: AsyncConnection, terms: List[str], limit: int, offset: int = 0
+    ) -> List[Mapping[str, Any]]:
+        self.searches += 1
+        async with self._lock:
+            await self._catch_up(conn)
+            ids = self._ranked_ids(terms, offset + limit)[offset:]
+        if not ids:
+            return []
+        result = await conn.execute(
+            text("SELECT * FROM tasks WHERE id IN :ids").bindparams(
+                bindparam("ids", expanding=True)
+            ),
+            {"ids": ids},
+        )
+        rows = {row["id"]: row for row in result.mappings()}
+        # Rows deleted since the catch-up are left out
+        return [rows[task_id] for task_id in ids if task_id in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "searches": self.searches,
+            "max_results": MAX_RESULTS,
+            "documents": len(self._doc_lengths),
+            "terms": len(self._postings),
+            "rebuilds": self.rebuilds,
+            "syncs": self.syncs,
+            "rows_indexed": self.rows_indexed,
+            "indexed_until": self._position.isoformat() if self._position else None,
+        }
+
+
+def build_task_search() -> Any:
+    if backend.name == "mysql":
+        return FullTextSearch()
+    return InvertedIndexSearch()
+
+
+# Module-level instance (one per process)
+task_search = build_task_search()
+
+
+__all__ = [
+    "MAX_RESULTS",
+    "MIN_TOKEN_LENGTH",
+    "STOPWORDS",
+    "tokenize",
+    "query_terms",
+    "FullTextSearch",
+    "InvertedIndexSearch",
+    "build_task_search",
+    "task_search",
+]
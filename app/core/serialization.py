@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from fastapi import Response
+
+from core.db import row_to_task
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the deployment
+    orjson = None
+
+# Fast path for task responses: DB rows are turned into JSON bytes here and handed to a
+# plain Response, so FastAPI skips re-validating the payload against the response_model
+# (which stays on the route for the OpenAPI schema) and the JSONResponse re-encode.
+# The bytes are identical to what the pydantic path produced: same key order, compact
+# separators, non-ASCII kept as UTF-8, control characters escaped the same way
+# (benchmarks/serialization.py checks this on generated rows before timing anything).
+# orjson is used when installed, else the stdlib encoder with JSONResponse's settings.
+# With orjson, DATETIME/DATE columns are handed over as-is and rendered natively
+# (OPT_NAIVE_UTC | OPT_UTC_Z | OPT_OMIT_MICROSECONDS gives format_api_timestamp's
+# output), which skips the per-row isoformat() calls that dominate the cost of row_to_task.
+
+JSON_MEDIA_TYPE = "application/json"
+ENCODER = "orjson" if orjson is not None else "json"
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_OMIT_MICROSECONDS
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=_OPTIONS)
+
+    def dumps_line(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+
+    def _task_fields(row: Mapping[str, Any]) -> Dict[str, Any]:
+        created_at, updated_at, due_date = row["created_at"], row["updated_at"], row["due_date"]
+        # Only naive DATETIME / DATE values render like row_to_task; anything else
+        # (strings from SQLite, aware datetimes) takes the generic conversion
+        if (
+            type(created_at) is not datetime
+            or type(updated_at) is not datetime
+            or created_at.tzinfo is not None
+            or updated_at.tzinfo is not None
+            or (due_date is not None and type(due_date) is not date)
+        ):
+            return row_to_task(row)
+        done = row["done"]
+        return {
+            "id": row["id"],
+            "title": row["title"],
+            "content": row["content"],
+            "due_date": due_date,
+            "done": bool(int(done)) if done is not None else False,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+else:
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+    def dumps_line(obj: Any) -> bytes:
+        return dumps(obj) + b"\n"
+
+    _task_fields = row_to_task
+
+
+def task_json(row: Mapping[str, Any]) -> bytes:
+    """
+    One task row as the JSON body of GET/PUT/POST /tasks.
+    """
+    return dumps(_task_fields(row))
+
+
+def tasks_json(rows: Iterable[Mapping[str, Any]]) -> bytes:
+    """
+    A page of task rows as a JSON array.
+    """
+    return dumps([_task_fields(r) for r in rows])
+
+
+def task_ndjson_line(row: Mapping[str, Any]) -> bytes:
+    """
+    One task row as an NDJSON line (newline included).
+    """
+    return dumps_line(_task_fields(row))
+
+
+def json_response(
+    body: bytes, status_code: int = 200, headers: Optional[Dict[str, str]] = None
+) -> Response:
+    return Response(content=body, status_code=status_code, headers=headers, media_type=JSON_MEDIA_TYPE)
+
+
+__all__ = [
+    "ENCODER",
+    "JSON_MEDIA_TYPE",
+    "dumps",
+    "dumps_line",
+    "task_json",
+    "tasks_json",
+    "task_ndjson_line",
+    "json_response",
+]
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import os
+import random
+from collections import Counter
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+import prometheus_client
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from core.db import backend, commit
+
+# Task summary counters (GET /tasks/stats).
+# task_stats holds the number of tasks per (due_date, done). Every write that creates or
+# deletes tasks, or changes their due_date / done, adds its delta in the same transaction
+# (record_task_stats), so the stats are summed over a few rows per due date instead of
+# scanning `tasks`. Each (due_date, done) pair is split over TASK_STATS_SLOTS rows and a
+# transaction increments one of them at random: concurrent writers rarely wait on the same
+# row lock, and the read sums the slots.
+# reconcile_task_stats() recounts `tasks` and corrects any drift (e.g. writes made by pods
+# still on the previous version during a rollout); the leader worker runs it every
+# TASK_STATS_RECONCILE_INTERVAL seconds, one pod at a time.
+# Env vars:
+#   TASK_STATS_SLOTS (default 8) — rows per (due_date, done) pair
+#   TASK_STATS_RECONCILE_INTERVAL (default 600) — seconds between reconcile runs
+
+SLOTS = max(1, int(os.getenv("TASK_STATS_SLOTS", "8")))
+RECONCILE_INTERVAL_SECONDS = float(os.getenv("TASK_STATS_RECONCILE_INTERVAL", "600"))
+# due_date of tasks without one (the key columns are NOT NULL); MySQL's lowest DATE
+NO_DUE_DATE = date(1000, 1, 1)
+
+RECONCILE_CORRECTIONS = prometheus_client.Counter(
+    "task_stats_reconcile_corrections_total",
+    "Task counts the stats reconcile had to correct (non-zero means a write path missed its delta)",
+)
+
+StatsKey = Tuple[date, int]
+
+
+def stats_key(due_date: Any, done: Any) -> StatsKey:
+    """
+    task_stats key of a task, from a row or a payload (due_date as date, ISO string or None).
+    """
+    if due_date is None:
+        due = NO_DUE_DATE
+    elif isinstance(due_date, str):
+        due = date.fromisoformat(due_date[:10])
+    else:
+        due = due_date
+    return due, 1 if done and int(done) else 0
+
+
+_ADD_STATS_SQL = (
+    "INSERT INTO task_stats (due_date, done, slot, n) VALUES (:due_date, :done, :slot, :n) "
+)
+
+
+async def _add_stats(conn: AsyncConnection, delta: Mapping[StatsKey, int], slot: int) -> None:
+    # Sorted keys: concurrent transactions lock the rows they share in the same order
+    rows = [
+        {"due_date": due, "done": done, "slot": slot, "n": n}
+        for (due, done), n in sorted(delta.items())
+        if n
+    ]
+    if rows:
+        await conn.execute(
+            text(_ADD_STATS_SQL + backend.upsert_add_clause(["due_date", "done", "slot"], ["n"])),
+            rows,
+        )
+
+
+async def record_task_stats(
+    conn: AsyncConnection, removed: Iterable[StatsKey] = (), added: Iterable[StatsKey] = ()
+) -> None:
+    """
+    Add the stats delta of a write to the current transaction: one count off each key of
+    `removed` (deleted tasks, and the previous key of updated ones), one onto each key of
+    `added`. Call it before commit, with keys from stats_key().
+    """
+    delta: Counter = Counter()
+    for key in removed:
+        delta[key] -= 1
+    for key in added:
+        delta[key] += 1
+    await _add_stats(conn, delta, random.randrange(SLOTS))
+
+
+async def read_task_stats(conn: AsyncConnection, today: date) -> Dict[str, Any]:
+    """
+    Summary counts as of `today` (UTC). Overdue: open tasks due before today. Due this
+    week: open tasks due from today through Sunday.
+    """
+    week_end = today + timedelta(days=6 - today.weekday())
+    result = await conn.execute(
+        text(
+            """
+            SELECT
+                COALESCE(SUM(n), 0) AS total,
+                COALESCE(SUM(CASE WHEN done = 1 THEN n ELSE 0 END), 0) AS done,
+                COALESCE(SUM(CASE WHEN done = 0 AND due_date > :none AND due_date < :today
+                                  THEN n ELSE 0 END), 0) AS overdue,
+                COALESCE(SUM(CASE WHEN done = 0 AND due_date >= :today AND due_date <= :week_end
+                                  THEN n ELSE 0 END), 0) AS due_this_week,
+                COALESCE(SUM(CASE WHEN due_date = :none THEN n ELSE 0 END), 0) AS no_due_date
+            FROM task_stats
+            """
+        ),
+        {"none": NO_DUE_DATE, "today": today, "week_end": week_end},
+    )
+    counts = {key: int(value) for key, value in result.mappings().first().items()}
+    return {
+        "total": counts["total"],
+        "open": counts["total"] - counts["done"],
+        "done": counts["done"],
+        "overdue": counts["overdue"],
+        "due_this_week": counts["due_this_week"],
+        "no_due_date": counts["no_due_date"],
+        "today": today.isoformat(),
+        "week_end": week_end.isoformat(),
+    }
+
+
+async def reconcile_task_stats(conn: AsyncConnection) -> Optional[int]:
+    """
+    Recount `tasks` per (due_date, done), add the difference with task_stats and drop the
+    rows left at zero. Returns the number of corrected counts, or None when another pod
+    holds the reconcile lock.
+    Both counts are read from one snapshot (a MySQL REPEATABLE READ transaction, a SQLite
+    write transaction), in which every committed write has its delta: the difference is
+    the drift. Concurrent writes keep adding their deltas on top of the correction.
+    """
+    async with backend.named_lock(conn, "task_stats_reconcile", 0) as acquired:
+        if not acquired:
+            return None
+        # The snapshot must start after the lock is held, i.e. after the previous
+        # reconcile committed
+        await conn.commit()
+        await backend.begin_write(conn)
+        actual: Counter = Counter()
+        result = await conn.execute(
+            text("SELECT due_date, done, COUNT(*) AS n FROM tasks GROUP BY due_date, done")
+        )
+        for row in result.mappings():
+            actual[stats_key(row["due_date"], row["done"])] += int(row["n"])
+        stored = await conn.execute(
+            text("SELECT due_date, done, SUM(n) AS n FROM task_stats GROUP BY due_date, done")
+        )
+        for row in stored.mappings():
+            actual[stats_key(row["due_date"], row["done"])] -= int(row["n"])
+        drift = {key: n for key, n in actual.items() if n}
+        await _add_stats(conn, drift, 0)
+        await conn.execute(text("DELETE FROM task_stats WHERE n = 0"))
+        await commit(conn)
+    corrections = sum(abs(n) for n in drift.values())
+    RECONCILE_CORRECTIONS.inc(corrections)
+    return corrections
+
+
+__all__ = [
+    "SLOTS",
+    "RECONCILE_INTERVAL_SECONDS",
+    "NO_DUE_DATE",
+    "RECONCILE_CORRECTIONS",
+    "stats_key",
+    "record_task_stats",
+    "read_task_stats",
+    "reconcile_task_stats",
+]
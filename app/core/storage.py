@@ -0,0 +1,262 @@
+"""
+Storage backends: the database-specific parts of data access.
+
+Queries are written once, as SQLAlchemy text() statements with named parameters, in
+core/db.py, routes/tasks.py and core/scheduler.py. What differs between databases is
+gathered here:
+- engine and connection setup
+- row locking for read-check-write transactions, read snapshots
+- upsert syntax
+- named locks (schema migrations, the task stats reconcile)
+
+The backend is chosen from the URL scheme:
+
+  MySQLBackend   mysql:// (default; DATABASE_URL or DB_USER/DB_PASSWORD/DB_HOST/...).
+                 Production: several replicas share one server, rows are locked with
+                 SELECT ... FOR UPDATE [SKIP LOCKED], and migrations take GET_LOCK.
+  SQLiteBackend  sqlite:///relative/path.db or sqlite:////absolute/path.db. An embedded
+                 file in WAL mode for single-node deployments, tests and benchmarks.
+                 Readers never block the writer or each other. Writes are serialized by
+                 SQLite's database-level write lock, which a transaction that reads
+                 before writing takes up front (BEGIN IMMEDIATE) in place of row locks.
+                 All processes must run on the same host (one pod, replicas: 1);
+                 WEB_CONCURRENCY workers are fine.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, Sequence
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+
+# Env vars (SQLite backend):
+#   SQLITE_BUSY_TIMEOUT (default 10) — seconds a writer waits for the write lock before
+#       failing with "database is locked"
+#   SQLITE_SYNCHRONOUS (default NORMAL) — NORMAL: a commit survives a process crash, and
+#       WAL keeps the file consistent on power loss, but the last commits may be lost;
+#       FULL: also durable on power loss, at one fsync per commit
+#   SQLITE_CACHE_SIZE_KB (default 65536) — page cache per connection
+#   SQLITE_MMAP_SIZE_MB (default 256) — memory-mapped reads (0 disables)
+
+
+class StorageBackend:
+    """
+    Database-specific SQL and setup; one instance per process (`backend` in core/db.py).
+    """
+
+    name = ""
+
+    def __init__(self, url: URL) -> None:
+        self.url = url
+
+    def create_engine(self, pool_options: Dict[str, Any]) -> AsyncEngine:
+        return create_async_engine(self.url, **pool_options)
+
+    def lock_clause(self, skip_locked: bool = False) -> str:
+        """
+        Suffix of a SELECT whose rows the transaction is about to write ("" when the
+        backend locks some other way, see begin_write).
+        """
+        raise NotImplementedError
+
+    async def begin_write(self, conn: AsyncConnection) -> None:
+        """
+        Called before a locking read (a SELECT ending in lock_clause()): start the
+        transaction so that it holds what the read needs until commit.
+        """
+
+    async def begin_read(self, conn: AsyncConnection) -> None:
+        """
+        Called before several SELECTs that must see the same snapshot (e.g. an ETag and
+        the rows it is sent with). The default is a no-op: the transaction SQLAlchemy
+        begins at the first statement is REPEATABLE READ on MySQL, so its consistent
+        snapshot covers every later read.
+        """
+
+    def upsert_clause(self, conflict_columns: Sequence[str], update_columns: Sequence[str]) -> str:
+        """
+        Suffix of an INSERT ... VALUES that turns a duplicate key into an update of
+        `update_columns` (set to the inserted values), or into a no-op when empty.
+        """
+        raise NotImplementedError
+
+    def upsert_add_clause(self, conflict_columns: Sequence[str], add_columns: Sequence[str]) -> str:
+        """
+        Suffix of an INSERT ... VALUES that adds the inserted `add_columns` values to the
+        existing row on a duplicate key (counters).
+        """
+        raise NotImplementedError
+
+    @asynccontextmanager
+    async def named_lock(self, conn: AsyncConnection, name: str, timeout: int) -> AsyncIterator[bool]:
+        """
+        Cluster-wide lock held by one process at a time; yields whether it was acquired
+        within `timeout` seconds (0: don't wait). The default (single-host backends) has
+        nothing to take: their write transactions already serialize.
+        """
+        yield True
+
+    @asynccontextmanager
+    async def migration_lock(self, conn: AsyncConnection, timeout: int) -> AsyncIterator[None]:
+        """
+        Held while pending migrations are applied, so only one process migrates.
+        """
+        async with self.named_lock(conn, "schema_migration", timeout) as acquired:
+            if not acquired:
+                raise RuntimeError(f"Timed out after {timeout}s waiting for the schema migration lock")
+            yield
+
+
+class MySQLBackend(StorageBackend):
+    name = "mysql"
+
+    def lock_clause(self, skip_locked: bool = False) -> str:
+        return " FOR UPDATE SKIP LOCKED" if skip_locked else " FOR UPDATE"
+
+    def upsert_clause(self, conflict_columns: Sequence[str], update_columns: Sequence[str]) -> str:
+        if not update_columns:
+            return f"ON DUPLICATE KEY UPDATE {conflict_columns[0]} = {conflict_columns[0]}"
+        return "ON DUPLICATE KEY UPDATE " + ", ".join(f"{c} = VALUES({c})" for c in update_columns)
+
+    def upsert_add_clause(self, conflict_columns: Sequence[str], add_columns: Sequence[str]) -> str:
+        return "ON DUPLICATE KEY UPDATE " + ", ".join(f"{c} = {c} + VALUES({c})" for c in add_columns)
+
+    @asynccontextmanager
+    async def named_lock(self, conn: AsyncConnection, name: str, timeout: int) -> AsyncIterator[bool]:
+        # Advisory locks are per server, so the name is scoped to the database
+        result = await conn.execute(
+            text("SELECT GET_LOCK(CONCAT(DATABASE(), '.', :name), :timeout)"),
+            {"name": name, "timeout": timeout},
+        )
+        if result.scalar() != 1:
+            await conn.commit()
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            await conn.execute(
+                text("SELECT RELEASE_LOCK(CONCAT(DATABASE(), '.', :name))"), {"name": name}
+            )
+            await conn.commit()
+
+
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "10"))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+
+
+# Temporal values are stored as fixed-width ISO-8601 text ('YYYY-MM-DD HH:MM:SS.ffffff',
+# 'YYYY-MM-DD'), so SQL comparisons and ORDER BY on them are chronological. Columns are
+# declared DATETIME / DATE and read back as naive UTC datetime / date objects, the
+# values the MySQL driver returns for DATETIME(6) / DATE.
+def _adapt_datetime(value: datetime) -> str:
+    return value.isoformat(" ", timespec="microseconds")
+
+
+def _convert_datetime(value: bytes) -> datetime:
+    return datetime.fromisoformat(value.decode())
+
+
+def _convert_date(value: bytes) -> date:
+    return date.fromisoformat(value.decode())
+
+
+class SQLiteBackend(StorageBackend):
+    name = "sqlite"
+
+    def __init__(self, url: URL) -> None:
+        super().__init__(url)
+        sqlite3.register_adapter(datetime, _adapt_datetime)
+        sqlite3.register_adapter(date, date.isoformat)
+        sqlite3.register_converter("DATETIME", _convert_datetime)
+        sqlite3.register_converter("DATE", _convert_date)
+
+    def create_engine(self, pool_options: Dict[str, Any]) -> AsyncEngine:
+        engine = create_async_engine(
+            self.url,
+            connect_args={"timeout": SQLITE_BUSY_TIMEOUT, "detect_types": sqlite3.PARSE_DECLTYPES},
+            **pool_options,
+        )
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def _configure(dbapi_conn: Any, record: Any) -> None:
+            cursor = dbapi_conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+            cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+            cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.close()
+
+        return engine
+
+    def lock_clause(self, skip_locked: bool = False) -> str:
+        return ""
+
+    async def begin_write(self, conn: AsyncConnection) -> None:
+        # The driver opens a deferred transaction at the first INSERT/UPDATE/DELETE only,
+        # so a SELECT before it would read outside any transaction. BEGIN IMMEDIATE takes
+        # the write lock now (waiting up to SQLITE_BUSY_TIMEOUT): what the SELECT reads
+        # cannot change before commit. A single writer at a time also means nothing is
+        # left to skip, so SKIP LOCKED claims need no equivalent.
+        raw = await conn.get_raw_connection()
+        if not raw.driver_connection.in_transaction:
+            await conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    async def begin_read(self, conn: AsyncConnection) -> None:
+        # Outside a transaction every SELECT reads its own snapshot. A deferred BEGIN takes
+        # no lock; the first SELECT pins the WAL snapshot until the transaction ends.
+        raw = await conn.get_raw_connection()
+        if not raw.driver_connection.in_transaction:
+            await conn.exec_driver_sql("BEGIN")
+
+    def upsert_clause(self, conflict_columns: Sequence[str], update_columns: Sequence[str]) -> str:
+        if not update_columns:
+            return "ON CONFLICT DO NOTHING"
+        return f"ON CONFLICT ({', '.join(conflict_columns)}) DO UPDATE SET " + ", ".join(
+            f"{c} = excluded.{c}" for c in update_columns
+        )
+
+    def upsert_add_clause(self, conflict_columns: Sequence[str], add_columns: Sequence[str]) -> str:
+        return f"ON CONFLICT ({', '.join(conflict_columns)}) DO UPDATE SET " + ", ".join(
+            f"{c} = {c} + excluded.{c}" for c in add_columns
+        )
+
+    # named_lock / migration_lock: none needed, DDL is transactional in SQLite. Each migration and its
+    # schema_version row are applied in one write transaction (begin_write), which
+    # re-checks the version first.
+
+
+BACKENDS = {"mysql": MySQLBackend, "sqlite": SQLiteBackend}
+
+
+def backend_for_url(url: str | URL) -> StorageBackend:
+    """
+    Backend for a database URL, its driver mapped onto the asyncio one (mysql://,
+    mysql+pymysql:// -> mysql+aiomysql://, sqlite:// -> sqlite+aiosqlite://).
+    """
+    parsed = make_url(url)
+    name = parsed.get_backend_name()
+    if name not in BACKENDS:
+        raise ValueError(f"Unsupported database backend {name!r} (expected one of {sorted(BACKENDS)})")
+    driver = {"mysql": "aiomysql", "sqlite": "aiosqlite"}[name]
+    if parsed.get_driver_name() != driver:
+        parsed = parsed.set(drivername=f"{name}+{driver}")
+    return BACKENDS[name](parsed)
+
+
+__all__ = [
+    "StorageBackend",
+    "MySQLBackend",
+    "SQLiteBackend",
+    "BACKENDS",
+    "backend_for_url",
+]
@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Sequence
+
+from opentelemetry import context as otel_context
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SimpleSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.sdk.trace.id_generator import RandomIdGenerator
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+
+# Opt-in request tracing with the OpenTelemetry SDK.
+# A request (or a scheduler run) opens a root span; pool checkouts, every cursor execution,
+# commits and scheduler batches open child spans under it. Finished spans go through a
+# BatchSpanProcessor, whose worker thread does the export, so the event loop never waits on
+# the exporter. The file exporter writes the OTLP/JSON format (one ExportTraceServiceRequest
+# per batch and line), which the OpenTelemetry Collector `otlpjsonfile` receiver can ship
+# to any backend.
+# The trace ID is taken from an incoming W3C `traceparent` header, else derived from the
+# correlation ID (a UUID correlation ID *is* the trace ID), so traces and logs line up.
+# Env vars:
+#   TRACING_ENABLED (default false)
+#   TRACING_SAMPLE_RATIO (default 0.1) — fraction of traces recorded, decided on the trace ID
+#       (so every replica keeps or drops the same trace); a sampled/unsampled `traceparent`
+#       flag from the caller wins
+#   TRACING_EXPORTER (default "file") — "file" or "memory" (the SDK's InMemorySpanExporter,
+#       exported synchronously, for tests)
+#   TRACING_FILE (default /tmp/tasks-api-traces.jsonl)
+#   TRACING_SERVICE_NAME (default tasks-api)
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").strip().lower() in ("1", "true", "yes", "on")
+SAMPLE_RATIO = min(1.0, max(0.0, float(os.getenv("TRACING_SAMPLE_RATIO", "0.1"))))
+EXPORTER = os.getenv("TRACING_EXPORTER", "file").lower()
+TRACE_FILE = os.getenv("TRACING_FILE", "/tmp/tasks-api-traces.jsonl")
+SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "tasks-api")
+
+SPAN_KIND_INTERNAL = SpanKind.INTERNAL
+SPAN_KIND_SERVER = SpanKind.SERVER
+SPAN_KIND_CLIENT = SpanKind.CLIENT
+
+# Returned when tracing is off, the trace is not sampled or there is no current span; a
+# non-recording span whose methods are no-ops (also usable as a context manager)
+NOOP_SPAN = trace.INVALID_SPAN
+
+_HEX32 = re.compile(r"[0-9a-f]{32}")
+_LOW_56_BITS = (1 << 56) - 1
+_propagator = TraceContextTextMapPropagator()
+
+# Trace ID of the next root span, set by Tracer.start_trace around the SDK call
+_next_trace_id: ContextVar[Optional[int]] = ContextVar("next_trace_id", default=None)
+
+
+class _CorrelationIdGenerator(RandomIdGenerator):
+    """
+    Random span IDs; the trace ID of a root span comes from the correlation ID when
+    start_trace provides one.
+    """
+
+    def generate_trace_id(self) -> int:
+        trace_id = _next_trace_id.get()
+        return trace_id if trace_id is not None else super().generate_trace_id()
+
+
+class _TraceIdRatioSampler(TraceIdRatioBased):
+    """
+    TraceIdRatioBased on the low 56 bits of the trace ID (the W3C "random" part). The SDK
+    sampler reads the low 64 bits, which in a UUID4-derived ID start with the fixed variant
+    bits and would keep either all traces or none.
+    """
+
+    def should_sample(self, parent_context, trace_id, *args: Any, **kwargs: Any):
+        return super().should_sample(parent_context, (trace_id & _LOW_56_BITS) << 8, *args, **kwargs)
+
+    def get_description(self) -> str:
+        return f"TraceIdRatioBased56{{{self.rate}}}"
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Any) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in (attributes or {}).items()]
+
+
+def _otlp_span(span: ReadableSpan) -> Dict[str, Any]:
+    context = span.context
+    otlp: Dict[str, Any] = {
+        "traceId": trace.format_trace_id(context.trace_id),
+        "spanId": trace.format_span_id(context.span_id),
+        "name": span.name,
+        # OTLP numbers kinds from 1 (INTERNAL), the Python enum from 0
+        "kind": span.kind.value + 1,
+        "startTimeUnixNano": str(span.start_time),
+        "endTimeUnixNano": str(span.end_time or span.start_time),
+        "attributes": _otlp_attributes(span.attributes),
+        "status": {"code": span.status.status_code.value, "message": span.status.description or ""},
+    }
+    if span.parent is not None:
+        otlp["parentSpanId"] = trace.format_span_id(span.parent.span_id)
+    if span.events:
+        otlp["events"] = [
+            {"timeUnixNano": str(e.timestamp), "name": e.name, "attributes": _otlp_attributes(e.attributes)}
+            for e in span.events
+        ]
+    return otlp
+
+
+def otlp_request(spans: Sequence[ReadableSpan]) -> Dict[str, Any]:
+    """
+    OTLP/JSON ExportTraceServiceRequest holding `spans` (all from this process's provider,
+    so one resource and one scope).
+    """
+    resource = spans[0].resource.attributes if spans else {}
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": _otlp_attributes(resource)},
+                "scopeSpans": [
+                    {"scope": {"name": "tasks-api.tracing"}, "spans": [_otlp_span(s) for s in spans]}
+                ],
+            }
+        ]
+    }
+
+
+class FileSpanExporter(SpanExporter):
+    """
+    Appends one OTLP/JSON ExportTraceServiceRequest per batch of finished spans to a file.
+    Called from the BatchSpanProcessor's worker thread, never from the event loop.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        line = json.dumps(otlp_request(spans), separators=(",", ":")) + "\n"
+        try:
+            with self._lock:
+                if self._file is None:
+                    self._file = open(self.path, "a", buffering=1, encoding="utf-8")
+                self._file.write(line)
+        except OSError:
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def trace_id_from_correlation_id(correlation_id: str) -> str:
+    hex_id = correlation_id.replace("-", "").lower()
+    if _HEX32.fullmatch(hex_id) and hex_id != "0" * 32:
+        return hex_id
+    return hashlib.blake2b(correlation_id.encode(), digest_size=16).hexdigest()
+
+
+def set_error(span: trace.Span, error: Any) -> None:
+    """
+    Error status on `span` from an exception (also recorded as a span event) or a message.
+    """
+    if isinstance(error, BaseException):
+        span.record_exception(error)
+        error = f"{type(error).__name__}: {error}"
+    span.set_status(Status(StatusCode.ERROR, error))
+
+
+def activate(span: trace.Span) -> Optional[object]:
+    """
+    Make a root span from start_trace() the current span; pass the returned token to
+    deactivate() in the same context.
+    """
+    if not span.is_recording():
+        return None
+    return otel_context.attach(trace.set_span_in_context(span))
+
+
+def deactivate(token: Optional[object]) -> None:
+    if token is not None:
+        otel_context.detach(token)
+
+
+class Tracer:
+    """
+    Starts sampled traces and their child spans on an SDK TracerProvider.
+    """
+
+    def __init__(self, enabled: bool, provider: TracerProvider, exporter: SpanExporter) -> None:
+        self.enabled = enabled
+        self.provider = provider
+        self.exporter = exporter
+        self._tracer = provider.get_tracer("tasks-api.tracing")
+
+    def start_trace(
+        self,
+        name: str,
+        *,
+        correlation_id: Optional[str] = None,
+        traceparent: Optional[str] = None,
+        kind: SpanKind = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> trace.Span:
+        """
+        Root span of a new trace (a request, a scheduler run), not made current (see
+        activate()), or NOOP_SPAN when tracing is off or the trace is not sampled.
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        attributes = dict(attributes) if attributes else {}
+        if correlation_id:
+            attributes["correlation_id"] = correlation_id
+        parent = _propagator.extract({"traceparent": traceparent}) if traceparent else None
+        if parent is not None and trace.get_current_span(parent).get_span_context().is_valid:
+            span = self._tracer.start_span(name, parent, kind, attributes)
+        else:
+            # An empty context, so the span is a root even inside another trace
+            trace_id = int(trace_id_from_correlation_id(correlation_id), 16) if correlation_id else None
+            token = _next_trace_id.set(trace_id)
+            try:
+                span = self._tracer.start_span(name, otel_context.Context(), kind, attributes)
+            finally:
+                _next_trace_id.reset(token)
+        return span if span.is_recording() else NOOP_SPAN
+
+    def trace(self, name: str, **kwargs: Any) -> Any:
+        """
+        Context manager for start_trace(): the root span is current inside and ends on exit.
+        """
+        span = self.start_trace(name, **kwargs)
+        if span is NOOP_SPAN:
+            return NOOP_SPAN
+        return trace.use_span(span, end_on_exit=True)
+
+    def start_span(
+        self, name: str, kind: SpanKind = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None
+    ) -> Optional[trace.Span]:
+        """
+        Child of the current span, not made current (for begin/end hooks such as cursor
+        events). None outside a sampled trace.
+        """
+        if not trace.get_current_span().is_recording():
+            return None
+        return self._tracer.start_span(name, kind=kind, attributes=attributes)
+
+    def span(
+        self, name: str, kind: SpanKind = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """
+        Context manager for a child of the current span (NOOP_SPAN outside a sampled trace).
+        """
+        if not trace.get_current_span().is_recording():
+            return NOOP_SPAN
+        return self._tracer.start_as_current_span(name, kind=kind, attributes=attributes)
+
+    def shutdown(self) -> None:
+        """
+        Flush the spans still queued in the batch processor and close the exporter. Blocks:
+        call it off the event loop.
+        """
+        self.provider.shutdown()
+
+
+def build_tracer() -> Tracer:
+    exporter: SpanExporter
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": SERVICE_NAME}),
+        sampler=ParentBased(root=_TraceIdRatioSampler(SAMPLE_RATIO)),
+        id_generator=_CorrelationIdGenerator(),
+    )
+    if EXPORTER == "memory":
+        exporter = InMemorySpanExporter()
+        processor: Any = SimpleSpanProcessor(exporter)
+    else:
+        exporter = FileSpanExporter(TRACE_FILE)
+        processor = BatchSpanProcessor(exporter)
+    if TRACING_ENABLED:
+        # Not when disabled: the batch processor starts its worker thread right away
+        provider.add_span_processor(processor)
+    return Tracer(TRACING_ENABLED, provider, exporter)
+
+
+# Module-level tracer
+tracer = build_tracer()
+
+
+__all__ = [
+    "SPAN_KIND_INTERNAL",
+    "SPAN_KIND_SERVER",
+    "SPAN_KIND_CLIENT",
+    "NOOP_SPAN",
+    "InMemorySpanExporter",
+    "FileSpanExporter",
+    "otlp_request",
+    "trace_id_from_correlation_id",
+    "set_error",
+    "activate",
+    "deactivate",
+    "Tracer",
+    "build_tracer",
+    "tracer",
+]
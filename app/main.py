@@ -1,172 +1,296 @@
 from __future__ import annotations
 
-import uuid
+import os
 import asyncio
+import logging
+from datetime import timedelta
 from typing import Any, Dict
 from sqlalchemy.exc import IntegrityError as DBIntegrityError
 
-from fastapi import FastAPI, HTTPException, Request, status
+from fastapi import FastAPI, Request, status
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
 
-from core.db import init_db, process_due_scheduled_ops_once
+from core.health import health_report, loop_lag, startup
+from core.cache import task_cache
+from core.correlation import configure_logging
+from core.db import TOMBSTONE_RETENTION_DAYS, add_enqueue_listener, as_db_datetime, close_db, get_db
+from core.db import pool_metrics, purge_task_tombstones, utc_now, warm_pool
+from core.leader import install_wakeup_handler, leader
+from core import metrics
+from core.middleware import CorrelationIdMiddleware
+from core.migrations import LATEST_VERSION, current_version, run_migrations
+from core.scheduler import POLL_INTERVAL_SECONDS, due_timer, process_due_scheduled_ops_once
+from core.scheduler import refresh_queue_depth
+from core.scheduler import snapshot as scheduler_snapshot
+from core.search import task_search
+from core.stats import RECONCILE_INTERVAL_SECONDS as STATS_RECONCILE_INTERVAL
+from core.stats import reconcile_task_stats
+from core.tracing import tracer
 
 from routes.tasks import router as tasks_router
 
 
+configure_logging()
+
+logger = logging.getLogger("tasks.app")
+
 app = FastAPI(title="Task Manager API", version="1.0.0")
 
 app.include_router(tasks_router)
+# Pure ASGI middleware: x-correlation-id header, correlation contextvar, request metrics
+app.add_middleware(CorrelationIdMiddleware)
 
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint for Docker healthcheck"""
-    from core.db import get_db
-    try:
-        # Vérifier la connexion à la DB
-        with get_db() as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT 1")
-            cur.fetchone()
-        return {"status": "healthy", "service": "tasks-api", "database": "connected"}
-    except Exception as e:
-        return JSONResponse(
-            status_code=503,
-            content={
-                "status": "unhealthy",
-                "service": "tasks-api",
-                "database": "disconnected",
-                "error": str(e)
-            }
-        )
-
-
-@app.middleware("http")
-async def correlation_id_middleware(request: Request, call_next):
-    correlation_id = (
-        request.headers.get("correlation-id")
-        or request.headers.get("correlation_id")
-        or str(uuid.uuid4())
-    )
-    request.state.correlation_id = correlation_id
+    """
+    Health check endpoint for Docker healthcheck and external monitors: DB status (cached
+    for HEALTH_DB_TTL), pool saturation, scheduler lag and event-loop lag
+    """
+    report = await health_report()
+    if report["database"] != "connected":
+        return JSONResponse(status_code=503, content=report)
+    return report
+
+
+@app.get("/livez")
+async def liveness_check():
+    """Liveness probe: the process is up and the event loop answers. Never touches the DB."""
+    return {"status": "alive"}
+
+
+@app.get("/readyz")
+async def readiness_check():
+    """Readiness probe: 200 once migrations ran and the connection pool is warm, 503 before"""
+    body = {"status": "ready" if startup.ready else "starting", **startup.snapshot()}
+    if not startup.ready:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+
+@app.get("/scheduler/metrics")
+async def scheduler_metrics_endpoint():
+    """Throughput and lag of this replica's scheduled-ops executor"""
+    return scheduler_snapshot()
+
+
+@app.get("/cache/stats")
+async def cache_stats_endpoint():
+    """Hit ratio, size and evictions of this replica's task cache"""
+    return task_cache.stats()
+
+
+@app.get("/search/stats")
+async def search_stats_endpoint():
+    """Search backend and, for the in-process index, its size and catch-up counters"""
+    return task_search.stats()
+
+
+@app.get("/db/pool")
+async def db_pool_endpoint():
+    """Pool configuration, in-use/idle connections, checkout waits and timeouts of this process"""
+    return pool_metrics()
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (text exposition format) for this process, or every worker of the pod"""
     try:
-        response = await call_next(request)
-    except HTTPException as e:
-        resp = JSONResponse(status_code=e.status_code, content={"detail": e.detail})
-        resp.headers["x-correlation-id"] = correlation_id
-        resp.headers["correlation_id"] = correlation_id
-        if hasattr(e, "headers") and e.headers:
-            for k, v in e.headers.items():
-                resp.headers[k] = v
-        return resp
+        await refresh_queue_depth()
     except Exception:
-        response = JSONResponse(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            content={"detail": "Internal Server Error"},
-        )
-        response.headers["x-correlation-id"] = correlation_id
-        response.headers["correlation_id"] = correlation_id
-        return response
-
-    response.headers["x-correlation-id"] = correlation_id
-    response.headers["correlation_id"] = correlation_id
-    return response
+        pass  # DB unavailable: keep the last known queue depth
+    # Several workers in this pod (server.py): the samples of all of them, aggregated
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
 
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     # Map validation errors to 400 Bad Request instead of FastAPI's default 422
-    headers = {
-        "x-correlation-id": getattr(request.state, "correlation_id", ""),
-        "correlation_id": getattr(request.state, "correlation_id", ""),
-    }
     return JSONResponse(
         status_code=status.HTTP_400_BAD_REQUEST,
         content={"detail": exc.errors()},
-        headers=headers,
     )
 
 
 @app.exception_handler(DBIntegrityError)
 async def db_integrity_handler(request: Request, exc: DBIntegrityError):
-    headers = {
-        "x-correlation-id": getattr(request.state, "correlation_id", ""),
-        "correlation_id": getattr(request.state, "correlation_id", ""),
-    }
     return JSONResponse(
         status_code=status.HTTP_409_CONFLICT,
         content={"detail": "Conflict"},
-        headers=headers,
     )
 
 
-@app.exception_handler(Exception)
-async def unhandled_exception_handler(request: Request, exc: Exception):
-    headers = {
-        "x-correlation-id": getattr(request.state, "correlation_id", ""),
-        "correlation_id": getattr(request.state, "correlation_id", ""),
-    }
-    return JSONResponse(
-        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        content={"detail": "Internal Server Error"},
-        headers=headers,
-    )
+# Exponential backoff between two startup attempts: STARTUP_BACKOFF_INITIAL seconds,
+# doubling up to STARTUP_BACKOFF_MAX
+STARTUP_BACKOFF_INITIAL = float(os.getenv("STARTUP_BACKOFF_INITIAL", "0.5"))
+STARTUP_BACKOFF_MAX = float(os.getenv("STARTUP_BACKOFF_MAX", "30"))
 
 
 @app.on_event("startup")
-def on_startup():
-    import time
-    max_retries = 5
-    retry_delay = 5  # secondes
-    
-    for attempt in range(max_retries):
-        try:
-            print(f"Tentative de connexion à la base de données ({attempt + 1}/{max_retries})...")
-            init_db()
-            print("✅ Connexion à la base de données réussie !")
-            break
-        except Exception as e:
-            print(f"❌ Erreur de connexion à la base de données: {e}")
-            if attempt < max_retries - 1:
-                print(f"⏳ Nouvelle tentative dans {retry_delay} secondes...")
-                time.sleep(retry_delay)
-            else:
-                print("⚠️ Impossible de se connecter à la base de données après plusieurs tentatives.")
-                print("⚠️ L'application démarre mais sera en mode dégradé.")
-    
-    # start background scheduler
-    loop = asyncio.get_event_loop()
-    # store task on app.state to allow cancellation
-    app.state._sched_task = loop.create_task(_scheduled_ops_runner())
+async def on_startup():
+    # Don't block the server on the DB: migrations and pool warm-up run in the background
+    # and /readyz reports when they are done
+    install_wakeup_handler(due_timer.request_refresh)
+    app.state._startup_task = asyncio.create_task(_startup_runner())
+    app.state._loop_lag_task = asyncio.create_task(loop_lag.run())
+    metrics.mark_dead_workers()
 
 
 @app.on_event("shutdown")
 async def on_shutdown():
-    # cancel scheduler if running
-    sched = getattr(app.state, "_sched_task", None)
-    if sched:
-        sched.cancel()
+    # cancel background tasks if running
+    for name in (
+        "_startup_task", "_loop_lag_task", "_leader_task", "_sched_task", "_purge_task",
+        "_stats_task",
+    ):
+        task = getattr(app.state, name, None)
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    await close_db()
+    # Flushes the spans still queued for export (blocking file I/O)
+    await asyncio.to_thread(tracer.shutdown)
+    leader.release()
+    metrics.mark_process_dead(os.getpid())
+
+
+async def _wait_for_schema():
+    """
+    Startup step of the non-leader workers: the leader runs the migrations, the others
+    only check they are done (and retry with the startup backoff until then).
+    """
+    async with get_db() as conn:
+        version = await current_version(conn)
+    if version < LATEST_VERSION:
+        raise RuntimeError(f"schema at version {version}, waiting for the leader to reach {LATEST_VERSION}")
+
+
+async def _startup_runner():
+    """
+    Run migrations (leader worker) or wait for them (other workers) and warm the
+    connection pool, retrying with exponential backoff until the DB answers; then mark the
+    replica ready and start the background runners.
+    """
+    delay = STARTUP_BACKOFF_INITIAL
+    while True:
         try:
-            await sched
+            logger.info("Tentative de connexion à la base de données (%d)...", startup.attempts + 1)
+            if leader.try_acquire():
+                await run_migrations()
+            else:
+                await _wait_for_schema()
+            warmed = await warm_pool()
+            logger.info("Connexion à la base de données réussie ! (%d connexion(s) ouvertes)", warmed)
+            break
         except asyncio.CancelledError:
-            pass
+            raise
+        except Exception as e:
+            startup.record_failure(e)
+            logger.warning(
+                "Erreur de connexion à la base de données: %s. Nouvelle tentative dans %g secondes...", e, delay
+            )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, STARTUP_BACKOFF_MAX)
+
+    startup.mark_ready()
+    app.state._leader_task = asyncio.create_task(_leader_runner())
+
+
+async def _leader_runner():
+    """
+    Start the background scheduler, the tombstone purge and the stats reconcile once this
+    worker is the leader of its pod (right away, or when the current leader exits).
+    """
+    await leader.wait()
+    # store tasks on app.state to allow cancellation
+    app.state._sched_task = asyncio.create_task(_scheduled_ops_runner())
+    app.state._purge_task = asyncio.create_task(_tombstone_purge_runner())
+    app.state._stats_task = asyncio.create_task(_stats_reconcile_runner())
+
+
+def _wake_leader(execute_at):
+    # Enqueue listener: an op enqueued by a non-leader worker only reaches the leader's
+    # DueTimer on its next refresh; signal the leader when the op is due before that
+    if leader.is_leader:
+        return
+    if as_db_datetime(execute_at) <= utc_now() + timedelta(seconds=POLL_INTERVAL_SECONDS):
+        leader.wake_leader()
+
+
+add_enqueue_listener(_wake_leader)
 
 
 async def _scheduled_ops_runner():
     """
-    Background runner that periodically processes due scheduled operations.
+    Background runner that processes due scheduled operations.
+    Sleeps on the scheduler's DueTimer (next execute_at, early wakeup on enqueue, slow
+    safety-net refresh) instead of polling the DB on a fixed tick.
     Runs until application shutdown.
     """
     try:
         while True:
             try:
-                processed = await asyncio.to_thread(process_due_scheduled_ops_once)
+                await due_timer.wait_for_due()
+                processed = await process_due_scheduled_ops_once()
+            except asyncio.CancelledError:
+                raise
             except Exception:
                 processed = 0
-            # sleep a short time; tuned to 1 second for prompt execution
-            await asyncio.sleep(1)
+                # DB unavailable: back off briefly before retrying
+                await asyncio.sleep(1)
+    except asyncio.CancelledError:
+        return
+
+
+# Seconds between two purges of expired delete tombstones
+TOMBSTONE_PURGE_INTERVAL = 3600
+
+
+async def _tombstone_purge_runner():
+    """
+    Background runner that drops tombstones older than TASK_TOMBSTONE_RETENTION_DAYS.
+    The leader worker of every replica runs it; the DELETE is idempotent.
+    """
+    try:
+        while True:
+            try:
+                cutoff = utc_now() - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+                async with get_db() as conn:
+                    await purge_task_tombstones(conn, cutoff)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass  # DB unavailable: retry on the next tick
+            await asyncio.sleep(TOMBSTONE_PURGE_INTERVAL)
+    except asyncio.CancelledError:
+        return
+
+
+async def _stats_reconcile_runner():
+    """
+    Background runner that recounts tasks and corrects the task_stats counters, right
+    away (catching up with writes from the previous version during a rollout) and then
+    every TASK_STATS_RECONCILE_INTERVAL. The pods' leaders skip a run while another holds
+    the reconcile lock.
+    """
+    try:
+        while True:
+            try:
+                async with get_db() as conn:
+                    corrected = await reconcile_task_stats(conn)
+                if corrected:
+                    logger.warning("task_stats: %d count(s) corrected by the reconcile", corrected)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass  # DB unavailable: retry on the next tick
+            await asyncio.sleep(STATS_RECONCILE_INTERVAL)
     except asyncio.CancelledError:
         return
 
@@ -1,22 +1,64 @@
 from __future__ import annotations
 
-from typing import List, Dict, Any, Tuple
+import base64
+import hashlib
+import heapq
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Body, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import IntegrityError as DBIntegrityError
+from sqlalchemy.ext.asyncio import AsyncConnection
 
+from core.cache import task_cache
 from core.db import (
+    backend,
+    commit,
     get_db,
-    iso_utc_now,
-    normalize_rfc3339,
-    parse_rfc3339,
+    served_by_replica,
+    REPLICA_MAX_LAG_SECONDS,
+    TOMBSTONE_RETENTION_DAYS,
+    fetch_task_row,
+    fetch_task_rows,
+    fetch_taken_task_keys,
+    as_db_datetime,
+    format_api_timestamp,
+    format_rfc3339,
+    insert_task_tombstones,
     row_to_task,
-    to_utc,
+    task_unique_key,
+    to_db_datetime,
+    utc_now,
     enqueue_scheduled_op,
+    insert_scheduled_op,
+    notify_enqueue_listeners,
 )
-from core.models import TaskCreate, TaskDelete, TaskOut, TaskUpdate
+from core.models import (
+    BATCH_MAX_ITEMS,
+    BatchResult,
+    TaskBatchDeleteItem,
+    TaskBatchUpdateItem,
+    TaskChangesPage,
+    TaskCreate,
+    TaskDelete,
+    TaskOut,
+    TaskStats,
+    TaskUpdate,
+)
+from core.search import MAX_RESULTS as SEARCH_MAX_RESULTS
+from core.search import query_terms, task_search
+from core.serialization import json_response, task_json, task_ndjson_line, tasks_json
+from core.stats import read_task_stats, record_task_stats, stats_key
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Rows buffered per server-side cursor fetch when streaming NDJSON
+STREAM_FETCH_SIZE = 500
+
 
 @router.post(
     "",
@@ -25,74 +67,373 @@ router = APIRouter(prefix="/tasks", tags=["tasks"])
     summary="Create a new task",
 )
 async def create_task(payload: TaskCreate):
-    req_ts = to_utc(payload.request_timestamp)
-    req_ts_norm = normalize_rfc3339(req_ts)
-    now_iso = iso_utc_now()
-    due_date_str = payload.due_date.isoformat() if payload.due_date else None
+    req_ts = to_db_datetime(payload.request_timestamp)
+    now = utc_now()
 
-    with get_db() as conn:
-        if req_ts_norm > now_iso:
+    async with get_db() as conn:
+        if req_ts > now:
             sched_payload = {
                 "title": payload.title,
                 "content": payload.content,
-                "due_date": due_date_str,
+                "due_date": payload.due_date.isoformat() if payload.due_date else None,
                 "done": 0,
-                "request_timestamp": req_ts_norm,
+                "request_timestamp": format_rfc3339(req_ts),
             }
-            op_id = enqueue_scheduled_op(
-                conn, None, "create", sched_payload, req_ts_norm, req_ts_norm
+            op_id = await enqueue_scheduled_op(
+                conn, None, "create", sched_payload, req_ts, req_ts
             )
-            return {"scheduled": True, "execute_at": req_ts_norm, "op_id": op_id}
-
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO tasks (title, content, due_date, done, created_at, updated_at, last_request_ts)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """,
-            (
-                payload.title,
-                payload.content,
-                due_date_str,
-                0,
-                now_iso,
-                now_iso,
-                req_ts_norm,
+            return {"scheduled": True, "execute_at": format_api_timestamp(req_ts), "op_id": op_id}
+
+        result = await conn.execute(
+            text(
+                """
+                INSERT INTO tasks (title, content, due_date, done, created_at, updated_at, last_request_ts)
+                VALUES (:title, :content, :due_date, :done, :created_at, :updated_at, :last_request_ts)
+                """
             ),
+            {
+                "title": payload.title,
+                "content": payload.content,
+                "due_date": payload.due_date,
+                "done": 0,
+                "created_at": now,
+                "updated_at": now,
+                "last_request_ts": req_ts,
+            },
         )
-        task_id = cur.lastrowid
-        conn.commit()
+        task_id = result.lastrowid
+        await record_task_stats(conn, added=[stats_key(payload.due_date, 0)])
+        await commit(conn)
 
-        cur.execute("SELECT * FROM tasks WHERE id = %s", (task_id,))
-        row = cur.fetchone()
+        row = await fetch_task_row(conn, task_id)
         if not row:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to retrieve created task",
             )
-        # convert tuple rows to dict for compatibility with row_to_task
-        if not hasattr(row, "keys"):
-            row = {desc[0]: row[i] for i, desc in enumerate(cur.description)}
-        return row_to_task(row)
+    await task_cache.store(task_id, row)
+    return json_response(task_json(row), status.HTTP_201_CREATED)
+
+
+# Conditional GET
+# ETags are strong validators computed from the stored row (or, for lists, from an
+# aggregate over the filtered set), so a matching If-None-Match is answered with 304
+# before any response body is built or serialized.
+
+
+def _etag(*parts: Any) -> str:
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode(), digest_size=12)
+    return f'"{digest.hexdigest()}"'
+
+
+def _task_etag(row: Dict[str, Any]) -> str:
+    # Every accepted write stores a strictly greater last_request_ts (DATETIME(6)), so
+    # (id, last_request_ts, updated_at) versions the row without looking at its content.
+    return _etag(
+        row.get("id"),
+        format_rfc3339(row.get("last_request_ts")),
+        format_rfc3339(row.get("updated_at")),
+    )
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison function: W/ prefixes are ignored
+    candidates = (c.strip() for c in if_none_match.split(","))
+    return etag in (c[2:] if c.startswith("W/") else c for c in candidates)
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def _list_filters(
+    after_id: Optional[int],
+    done: Optional[bool],
+    due_from: Optional[date],
+    due_to: Optional[date],
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build the WHERE clause shared by the paginated and streaming list modes.
+    due_date range predicates are served by idx_tasks_due_date; the keyset
+    predicate (id > after_id) walks the primary key.
+    """
+    clauses: List[str] = []
+    params: Dict[str, Any] = {}
+    if after_id is not None:
+        clauses.append("id > :after_id")
+        params["after_id"] = after_id
+    if done is not None:
+        clauses.append("done = :done")
+        params["done"] = int(done)
+    if due_from is not None:
+        clauses.append("due_date >= :due_from")
+        params["due_from"] = due_from
+    if due_to is not None:
+        clauses.append("due_date <= :due_to")
+        params["due_to"] = due_to
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+async def _stream_tasks_ndjson(
+    version_sql: str, sql: str, params: Dict[str, Any], scope: Tuple[Any, ...]
+) -> AsyncIterator[Any]:
+    # Yields the list's ETag first, then the NDJSON lines. Both come from one connection
+    # and one read snapshot, so the ETag describes the streamed body. The connection is
+    # held for the lifetime of the response; rows are pulled from a server-side cursor in
+    # STREAM_FETCH_SIZE chunks so memory stays flat.
+    async with get_db(read_only=True) as conn:
+        await backend.begin_read(conn)
+        version = (await conn.execute(text(version_sql), params)).mappings().first()
+        yield _etag(*scope, *version.values())
+        result = await conn.stream(
+            text(sql).execution_options(yield_per=STREAM_FETCH_SIZE), params
+        )
+        async for row in result.mappings():
+            yield task_ndjson_line(row)
 
 
 @router.get(
     "",
     response_model=List[TaskOut],
     status_code=status.HTTP_200_OK,
-    summary="List all tasks",
+    summary="List tasks (keyset-paginated, filterable, optional NDJSON stream)",
+)
+async def list_tasks(
+    if_none_match: Optional[str] = Header(default=None),
+    after_id: Optional[int] = Query(
+        default=None, ge=0, description="Return tasks with id strictly greater than this cursor"
+    ),
+    limit: Optional[int] = Query(
+        default=None,
+        ge=1,
+        le=MAX_PAGE_SIZE,
+        description=f"Page size (default {DEFAULT_PAGE_SIZE}; unbounded when streaming)",
+    ),
+    done: Optional[bool] = Query(default=None, description="Filter on completion status"),
+    due_from: Optional[date] = Query(default=None, description="Inclusive lower bound on due_date"),
+    due_to: Optional[date] = Query(default=None, description="Inclusive upper bound on due_date"),
+    stream: bool = Query(
+        default=False, description="Stream all matching tasks as NDJSON (application/x-ndjson)"
+    ),
+):
+    where, params = _list_filters(after_id, done, due_from, due_to)
+    sql = f"SELECT * FROM tasks {where} ORDER BY id ASC"
+    # Collection version: COUNT(*) catches deletes, MAX(id) creates and MAX(updated_at)
+    # (idx_tasks_updated_at) updates. Both statements read one snapshot
+    # (backend.begin_read), so the ETag describes the page or stream it is sent with.
+    version_sql = (
+        f"SELECT COUNT(*) AS n, MAX(updated_at) AS max_updated_at, MAX(id) AS max_id FROM tasks {where}"
+    )
+    scope = (after_id, limit, done, due_from, due_to, stream)
+
+    # Reads go to the read replica when one is configured (core.db.get_db)
+    if stream:
+        if limit is not None:
+            sql += " LIMIT :limit"
+            params["limit"] = limit
+        body = _stream_tasks_ndjson(version_sql, sql, params, scope)
+        etag = await body.__anext__()
+        if _etag_matches(if_none_match, etag):
+            await body.aclose()
+            return _not_modified(etag)
+        return StreamingResponse(
+            body, media_type="application/x-ndjson", headers={"ETag": etag}
+        )
+
+    page_size = limit or DEFAULT_PAGE_SIZE
+    async with get_db(read_only=True) as conn:
+        await backend.begin_read(conn)
+        version = (await conn.execute(text(version_sql), params)).mappings().first()
+        etag = _etag(*scope, *version.values())
+        if _etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+        params["limit"] = page_size
+        result = await conn.execute(text(sql + " LIMIT :limit"), params)
+        rows = result.mappings().all()
+    headers = {"ETag": etag}
+    if len(rows) == page_size:
+        # Full page: clients pass this back as ?after_id= to fetch the next one
+        headers["x-next-after-id"] = str(rows[-1]["id"])
+    return json_response(tasks_json(rows), headers=headers)
+
+
+# Delta sync
+# Changes are ordered by (changed_at, id): live rows come from a range scan on
+# idx_tasks_updated_at, deletes from idx_tombstones_deleted_at, and the two are merged here.
+# Timestamps are taken before commit, so the most recent CHANGES_SETTLE_SECONDS are held
+# back: a write committing "behind" a cursor already handed out would otherwise be skipped.
+# Read from the primary only: a lagging replica would hand out cursors past rows it has not
+# received yet, and the settle window does not cover replication lag.
+CHANGES_SETTLE_SECONDS = 2
+
+
+def _encode_cursor(changed_at: Any, task_id: Optional[int]) -> str:
+    raw = f"{as_db_datetime(changed_at).isoformat()}|{'' if task_id is None else task_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, Optional[int]]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        changed_at, _, task_id = raw.partition("|")
+        return as_db_datetime(changed_at), int(task_id) if task_id else None
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def _after_position_sql(ts_col: str, id_col: str, after_id: Optional[int]) -> str:
+    # after_id None: strictly after the instant (the `since` form)
+    if after_id is None:
+        return f"{ts_col} > :pos_ts"
+    return f"({ts_col} > :pos_ts OR ({ts_col} = :pos_ts AND {id_col} > :pos_id))"
+
+
+@router.get(
+    "/changes",
+    response_model=TaskChangesPage,
+    status_code=status.HTTP_200_OK,
+    summary="Tasks created, updated or deleted since a point in time (resumable)",
+)
+async def list_task_changes(
+    since: Optional[datetime] = Query(
+        default=None, description="Only changes with changed_at > since (RFC3339)"
+    ),
+    cursor: Optional[str] = Query(
+        default=None, description="next_cursor of a previous page (takes precedence over since)"
+    ),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    now = utc_now()
+    upper = now - timedelta(seconds=CHANGES_SETTLE_SECONDS)
+    if cursor is not None:
+        pos_ts, pos_id = _decode_cursor(cursor)
+    elif since is not None:
+        pos_ts, pos_id = to_db_datetime(since), None
+    else:
+        pos_ts = pos_id = None
+    horizon = now - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    if pos_ts is not None and pos_ts < horizon:
+        # Deletes older than the retention window may have been purged
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Sync position expired, re-fetch GET /tasks and sync from now",
+        )
+
+    params: Dict[str, Any] = {"upper": upper, "limit": limit + 1}
+    live_where = ["updated_at < :upper"]
+    dead_where = ["deleted_at < :upper"]
+    if pos_ts is not None:
+        params["pos_ts"] = pos_ts
+        params["pos_id"] = pos_id
+        live_where.append(_after_position_sql("updated_at", "id", pos_id))
+        dead_where.append(_after_position_sql("deleted_at", "task_id", pos_id))
+
+    async with get_db() as conn:
+        live = await conn.execute(
+            text(
+                f"SELECT * FROM tasks WHERE {' AND '.join(live_where)} "
+                "ORDER BY updated_at ASC, id ASC LIMIT :limit"
+            ),
+            params,
+        )
+        dead = await conn.execute(
+            text(
+                f"SELECT task_id, deleted_at FROM task_tombstones WHERE {' AND '.join(dead_where)} "
+                "ORDER BY deleted_at ASC, task_id ASC LIMIT :limit"
+            ),
+            params,
+        )
+        merged = list(
+            heapq.merge(
+                ((r["updated_at"], r["id"], False, r) for r in live.mappings().all()),
+                ((r["deleted_at"], r["task_id"], True, None) for r in dead.mappings().all()),
+                key=lambda change: change[:2],
+            )
+        )
+
+    has_more = len(merged) > limit
+    page = merged[:limit]
+    if has_more:
+        next_cursor = _encode_cursor(page[-1][0], page[-1][1])
+    else:
+        # Everything before `upper` has been returned
+        last_instant = upper - timedelta(microseconds=1)
+        if pos_ts is not None and pos_ts > last_instant:
+            next_cursor = _encode_cursor(pos_ts, pos_id)
+        else:
+            next_cursor = _encode_cursor(last_instant, None)
+    return {
+        "changes": [
+            {
+                "id": task_id,
+                "deleted": deleted,
+                "changed_at": format_api_timestamp(changed_at),
+                "task": None if deleted else row_to_task(row),
+            }
+            for changed_at, task_id, deleted, row in page
+        ],
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+    }
+
+
+@router.get(
+    "/stats",
+    response_model=TaskStats,
+    status_code=status.HTTP_200_OK,
+    summary="Open / done / overdue / due-this-week task counts",
+)
+async def get_task_stats():
+    # Summed from the task_stats counters (core/stats.py), not from `tasks`
+    async with get_db(read_only=True) as conn:
+        return await read_task_stats(conn, utc_now().date())
+
+
+# Search
+# Ranked full-text search (core/search.py): a FULLTEXT index on MySQL, an in-process
+# inverted index on SQLite. Pages are addressed by offset, bounded by SEARCH_MAX_RESULTS.
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+
+@router.get(
+    "/search",
+    response_model=List[TaskOut],
+    status_code=status.HTTP_200_OK,
+    summary="Search tasks by title and content (ranked, paginated)",
 )
-async def list_tasks():
-    with get_db() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM tasks ORDER BY id ASC")
-        rows = cur.fetchall()
-        results: List[Dict[str, Any]] = []
-        for r in rows:
-            if not hasattr(r, "keys"):
-                r = {desc[0]: r[i] for i, desc in enumerate(cur.description)}
-            results.append(row_to_task(r))
-        return results
+async def search_tasks(
+    q: str = Query(
+        ..., min_length=1, max_length=256, description="Words that must all appear in the task"
+    ),
+    limit: int = Query(default=SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+    offset: int = Query(
+        default=0, ge=0, description="Rank of the first result (x-next-offset of the previous page)"
+    ),
+):
+    terms = query_terms(q)
+    if not terms:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="q must contain a word of 3 or more characters that is not a stopword",
+        )
+    end = min(offset + limit, SEARCH_MAX_RESULTS)
+    rows: List[Any] = []
+    if offset < end:
+        # One extra row tells whether a next page exists
+        fetch = end - offset + (1 if end < SEARCH_MAX_RESULTS else 0)
+        async with get_db(read_only=task_search.replica_safe) as conn:
+            rows = await task_search.search(conn, terms, fetch, offset)
+    headers = {}
+    if len(rows) > end - offset:
+        rows = rows[: end - offset]
+        headers["x-next-offset"] = str(end)
+    return json_response(tasks_json(rows), headers=headers)
 
 
 @router.get(
@@ -101,18 +442,117 @@ async def list_tasks():
     status_code=status.HTTP_200_OK,
     summary="Get a specific task",
 )
-async def get_task(task_id: int):
-    with get_db() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM tasks WHERE id = %s", (task_id,))
-        row = cur.fetchone()
+async def get_task(
+    task_id: int,
+    if_none_match: Optional[str] = Header(default=None),
+):
+    row = await task_cache.get(task_id)
+    if row is None:
+        # Taken before the read: a write committed meanwhile makes the fill a no-op
+        token = task_cache.fill_token(task_id)
+        async with get_db(read_only=True) as conn:
+            row = await fetch_task_row(conn, task_id)
+            # A replica row may predate a write committed on the primary: cache it only
+            # for as long as the replica is allowed to lag
+            fill_ttl = REPLICA_MAX_LAG_SECONDS if served_by_replica(conn) else None
         if not row:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Resource not found"
             )
-        if not hasattr(row, "keys"):
-            row = {desc[0]: row[i] for i, desc in enumerate(cur.description)}
-        return row_to_task(row)
+        await task_cache.fill(task_id, row, token, fill_ttl)
+    etag = _task_etag(row)
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    return json_response(task_json(row), headers={"ETag": etag})
+
+
+def _check_writable(row: Optional[Dict[str, Any]], req_ts: datetime) -> Dict[str, Any]:
+    """
+    Apply the request_timestamp rule to the stored row: 404 if the task is gone, 409 unless
+    req_ts is strictly newer than its last_request_ts.
+    """
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Resource not found"
+        )
+    if not (req_ts > as_db_datetime(row["last_request_ts"])):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Timestamp conflict"
+        )
+    return row
+
+
+async def _lock_for_write(conn: AsyncConnection, task_id: int, req_ts: datetime) -> Dict[str, Any]:
+    """
+    Lock and read the row an immediate update or delete is about to write, then check the
+    request_timestamp rule against it. The lock holds until commit, so no concurrent older
+    request can slip in between the check and the write.
+    """
+    row = (await fetch_task_rows(conn, [task_id], for_update=True)).get(task_id)
+    return _check_writable(row, req_ts)
+
+
+def _date_str(value: Any) -> Optional[str]:
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def _merge_update(row: Dict[str, Any], payload: TaskUpdate) -> Dict[str, Any]:
+    """
+    Column values of `row` after applying the fields set in `payload`
+    (JSON-serializable: they are also stored as scheduled-op payloads).
+    """
+    return {
+        "title": payload.title if payload.title is not None else row["title"],
+        "content": payload.content if payload.content is not None else row["content"],
+        "due_date": payload.due_date.isoformat()
+        if payload.due_date is not None
+        else _date_str(row["due_date"]),
+        "done": int(payload.done) if payload.done is not None else int(row["done"]),
+    }
+
+
+async def _enqueue_future_write(
+    conn: AsyncConnection,
+    task_id: int,
+    op_type: str,
+    payload: TaskUpdate | TaskDelete,
+    req_ts: datetime,
+) -> Dict[str, Any]:
+    # Future-dated writes still validate against the current row (and, for updates,
+    # snapshot its merged values) before being queued
+    row = _check_writable(await fetch_task_row(conn, task_id), req_ts)
+    sched_payload: Dict[str, Any] = {"request_timestamp": format_rfc3339(req_ts)}
+    if op_type == "update":
+        sched_payload.update(_merge_update(row, payload))
+    op_id = await enqueue_scheduled_op(conn, task_id, op_type, sched_payload, req_ts, req_ts)
+    return {
+        "id": task_id,
+        "scheduled": True,
+        "execute_at": format_api_timestamp(req_ts),
+        "op_id": op_id,
+    }
+
+
+_UPDATE_TASK_SQL = text(
+    """
+    UPDATE tasks
+    SET title = :title, content = :content, due_date = :due_date, done = :done,
+        updated_at = :updated_at, last_request_ts = :last_request_ts
+    WHERE id = :id
+    """
+)
+
+
+def _update_params(task_id: int, row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "title": row["title"],
+        "content": row["content"],
+        "due_date": row["due_date"],
+        "done": int(row["done"]),
+        "updated_at": row["updated_at"],
+        "last_request_ts": row["last_request_ts"],
+        "id": task_id,
+    }
 
 
 @router.put(
@@ -122,89 +562,26 @@ async def get_task(task_id: int):
     summary="Update a task",
 )
 async def update_task(task_id: int, payload: TaskUpdate):
-    req_ts = to_utc(payload.request_timestamp)
-    req_ts_norm = normalize_rfc3339(req_ts)
-
-    with get_db() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM tasks WHERE id = %s", (task_id,))
-        row = cur.fetchone()
-        if not row:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Resource not found"
-            )
-        if not hasattr(row, "keys"):
-            row = {desc[0]: row[i] for i, desc in enumerate(cur.description)}
+    req_ts = to_db_datetime(payload.request_timestamp)
+    now = utc_now()
 
-        stored_last_ts = parse_rfc3339(row["last_request_ts"])
-        if not (req_ts > stored_last_ts):
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT, detail="Timestamp conflict"
-            )
-
-        now_iso = iso_utc_now()
-        if req_ts_norm > now_iso:
-            sched_payload: Dict[str, Any] = {
-                "title": payload.title if payload.title is not None else row["title"],
-                "content": payload.content
-                if payload.content is not None
-                else row["content"],
-                "due_date": payload.due_date.isoformat()
-                if payload.due_date is not None
-                else row["due_date"],
-                "done": int(payload.done)
-                if payload.done is not None
-                else int(row["done"]),
-                "request_timestamp": req_ts_norm,
-            }
-            op_id = enqueue_scheduled_op(
-                conn, task_id, "update", sched_payload, req_ts_norm, req_ts_norm
-            )
-            return {
-                "id": task_id,
-                "scheduled": True,
-                "execute_at": req_ts_norm,
-                "op_id": op_id,
-            }
+    async with get_db() as conn:
+        if req_ts > now:
+            return await _enqueue_future_write(conn, task_id, "update", payload, req_ts)
 
-        new_title = payload.title if payload.title is not None else row["title"]
-        new_content = payload.content if payload.content is not None else row["content"]
-        new_due_date = (
-            payload.due_date.isoformat()
-            if payload.due_date is not None
-            else row["due_date"]
+        # One locked read gives the columns the payload leaves unset, created_at and the
+        # previous stats key: the response is built from the merged values, not read back
+        row = await _lock_for_write(conn, task_id, req_ts)
+        previous_key = stats_key(row["due_date"], row["done"])
+        row.update(_merge_update(row, payload), updated_at=now, last_request_ts=req_ts)
+        await conn.execute(_UPDATE_TASK_SQL, _update_params(task_id, row))
+        # A no-op unless due_date or done changed
+        await record_task_stats(
+            conn, removed=[previous_key], added=[stats_key(row["due_date"], row["done"])]
         )
-        new_done = int(payload.done) if payload.done is not None else int(row["done"])
-        now_iso = iso_utc_now()
-
-        cur.execute(
-            """
-            UPDATE tasks
-            SET title = %s, content = %s, due_date = %s, done = %s, updated_at = %s, last_request_ts = %s
-            WHERE id = %s
-            """,
-            (
-                new_title,
-                new_content,
-                new_due_date,
-                new_done,
-                now_iso,
-                req_ts_norm,
-                task_id,
-            ),
-        )
-        conn.commit()
-
-        cur.execute("SELECT * FROM tasks WHERE id = %s", (task_id,))
-        updated = cur.fetchone()
-        if not updated:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to retrieve updated task",
-            )
-        if not hasattr(updated, "keys"):
-            updated = {desc[0]: updated[i] for i, desc in enumerate(cur.description)}
-        return row_to_task(updated)
+        await commit(conn)
+    await task_cache.store(task_id, row)
+    return json_response(task_json(row))
 
 
 @router.delete(
@@ -214,41 +591,299 @@ async def update_task(task_id: int, payload: TaskUpdate):
     summary="Delete a task",
 )
 async def delete_task(task_id: int, payload: TaskDelete):
-    req_ts = to_utc(payload.request_timestamp)
-    req_ts_norm = normalize_rfc3339(req_ts)
+    req_ts = to_db_datetime(payload.request_timestamp)
+    now = utc_now()
 
-    with get_db() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM tasks WHERE id = %s", (task_id,))
-        row = cur.fetchone()
-        if not row:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Resource not found"
-            )
-        if not hasattr(row, "keys"):
-            row = {desc[0]: row[i] for i, desc in enumerate(cur.description)}
+    async with get_db() as conn:
+        if req_ts > now:
+            # Schedule delete
+            return await _enqueue_future_write(conn, task_id, "delete", payload, req_ts)
 
-        stored_last_ts = parse_rfc3339(row["last_request_ts"])
-        if not (req_ts > stored_last_ts):
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT, detail="Timestamp conflict"
+        # The locked read checks the rule and gives the stats counter the task leaves
+        row = await _lock_for_write(conn, task_id, req_ts)
+        await conn.execute(text("DELETE FROM tasks WHERE id = :id"), {"id": task_id})
+        await insert_task_tombstones(conn, [task_id], now)
+        await record_task_stats(conn, removed=[stats_key(row["due_date"], row["done"])])
+        await commit(conn)
+    await task_cache.invalidate(task_id)
+    return {"id": task_id, "deleted": True}
+
+
+# Batch endpoints
+# One connection checkout and one transaction per request: the request_timestamp rule is
+# checked for every item against a single SELECT ... WHERE id IN (...), and updates/deletes
+# are written with executemany. Each item's result mirrors the single-item endpoint.
+
+
+def _item_result(index: int, status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
+    return {"index": index, "status": status_code, "body": body}
+
+
+_INSERT_TASK_SQL = text(
+    """
+    INSERT INTO tasks (title, content, due_date, done, created_at, updated_at, last_request_ts)
+    VALUES (:title, :content, :due_date, :done, :created_at, :updated_at, :last_request_ts)
+    """
+)
+
+@router.post(
+    ":batch",
+    response_model=BatchResult,
+    status_code=status.HTTP_200_OK,
+    summary="Create many tasks in one request",
+)
+async def create_tasks_batch(
+    payload: List[TaskCreate] = Body(..., min_length=1, max_length=BATCH_MAX_ITEMS),
+):
+    now = utc_now()
+    results: List[Dict[str, Any]] = []
+    scheduled_at: List[datetime] = []
+    created: Dict[int, Dict[str, Any]] = {}
+
+    async with get_db() as conn:
+        prepared = [to_db_datetime(item.request_timestamp) for item in payload]
+        taken = await fetch_taken_task_keys(
+            conn,
+            [
+                (item.title, item.due_date)
+                for item, req_ts in zip(payload, prepared)
+                if not req_ts > now
+            ],
+        )
+        for index, (item, req_ts) in enumerate(zip(payload, prepared)):
+            if req_ts > now:
+                sched_payload = {
+                    "title": item.title,
+                    "content": item.content,
+                    "due_date": item.due_date.isoformat() if item.due_date else None,
+                    "done": 0,
+                    "request_timestamp": format_rfc3339(req_ts),
+                }
+                op_id = await insert_scheduled_op(
+                    conn, None, "create", sched_payload, req_ts, req_ts
+                )
+                scheduled_at.append(req_ts)
+                results.append(
+                    _item_result(
+                        index,
+                        status.HTTP_201_CREATED,
+                        {"scheduled": True, "execute_at": format_api_timestamp(req_ts), "op_id": op_id},
+                    )
+                )
+                continue
+
+            key = task_unique_key(item.title, item.due_date)
+            if key in taken:
+                results.append(_item_result(index, status.HTTP_409_CONFLICT, {"detail": "Conflict"}))
+                continue
+            values = {
+                "title": item.title,
+                "content": item.content,
+                "due_date": item.due_date,
+                "done": 0,
+                "created_at": now,
+                "updated_at": now,
+                "last_request_ts": req_ts,
+            }
+            # MySQL has no INSERT ... RETURNING, so creates are one statement each (still a
+            # single checkout and commit) to report every new id without a read-back.
+            try:
+                result = await conn.execute(_INSERT_TASK_SQL, values)
+            except DBIntegrityError:
+                # Lost a (title, due_date) race; only this statement is rolled back
+                results.append(_item_result(index, status.HTTP_409_CONFLICT, {"detail": "Conflict"}))
+                continue
+            if key:
+                taken[key] = result.lastrowid
+            created[result.lastrowid] = {"id": result.lastrowid, **values}
+            results.append(
+                _item_result(index, status.HTTP_201_CREATED, row_to_task(created[result.lastrowid]))
             )
+        await record_task_stats(
+            conn, added=[stats_key(row["due_date"], row["done"]) for row in created.values()]
+        )
+        await commit(conn)
+    for tid, row in created.items():
+        await task_cache.store(tid, row)
+    notify_enqueue_listeners(scheduled_at)
+    return {"results": results}
 
-        now_iso = iso_utc_now()
-        if req_ts_norm > now_iso:
-            # Schedule delete
-            sched_payload = {"request_timestamp": req_ts_norm}
-            op_id = enqueue_scheduled_op(
-                conn, task_id, "delete", sched_payload, req_ts_norm, req_ts_norm
+
+@router.put(
+    ":batch",
+    response_model=BatchResult,
+    status_code=status.HTTP_200_OK,
+    summary="Update many tasks in one request",
+)
+async def update_tasks_batch(
+    payload: List[TaskBatchUpdateItem] = Body(..., min_length=1, max_length=BATCH_MAX_ITEMS),
+):
+    results: List[Dict[str, Any]] = []
+    scheduled_at: List[datetime] = []
+    dirty: Dict[int, Dict[str, Any]] = {}
+    # Stats keys each applied item moves a task from / to
+    moved_from: List[Any] = []
+    moved_to: List[Any] = []
+
+    async with get_db() as conn:
+        # Lock the targets so the timestamp checks below stay valid until commit
+        state = await fetch_task_rows(conn, sorted({item.id for item in payload}), for_update=True)
+        taken = await fetch_taken_task_keys(
+            conn,
+            [
+                (
+                    item.title if item.title is not None else state[item.id]["title"],
+                    item.due_date if item.due_date is not None else state[item.id]["due_date"],
+                )
+                for item in payload
+                if item.id in state and (item.title is not None or item.due_date is not None)
+            ],
+        )
+        for tid, row in state.items():
+            key = task_unique_key(row["title"], row["due_date"])
+            if key:
+                taken[key] = tid
+
+        now = utc_now()
+        for index, item in enumerate(payload):
+            row = state.get(item.id)
+            if not row:
+                results.append(
+                    _item_result(index, status.HTTP_404_NOT_FOUND, {"detail": "Resource not found"})
+                )
+                continue
+            req_ts = to_db_datetime(item.request_timestamp)
+            if not (req_ts > as_db_datetime(row["last_request_ts"])):
+                results.append(
+                    _item_result(index, status.HTTP_409_CONFLICT, {"detail": "Timestamp conflict"})
+                )
+                continue
+
+            merged = _merge_update(row, item)
+            if req_ts > now:
+                op_id = await insert_scheduled_op(
+                    conn,
+                    item.id,
+                    "update",
+                    {**merged, "request_timestamp": format_rfc3339(req_ts)},
+                    req_ts,
+                    req_ts,
+                )
+                scheduled_at.append(req_ts)
+                results.append(
+                    _item_result(
+                        index,
+                        status.HTTP_200_OK,
+                        {
+                            "id": item.id,
+                            "scheduled": True,
+                            "execute_at": format_api_timestamp(req_ts),
+                            "op_id": op_id,
+                        },
+                    )
+                )
+                continue
+
+            old_key = task_unique_key(row["title"], row["due_date"])
+            new_key = task_unique_key(merged["title"], merged["due_date"])
+            if new_key and new_key != old_key and new_key in taken:
+                results.append(_item_result(index, status.HTTP_409_CONFLICT, {"detail": "Conflict"}))
+                continue
+            if new_key != old_key:
+                taken.pop(old_key, None)
+                if new_key:
+                    taken[new_key] = item.id
+
+            moved_from.append(stats_key(row["due_date"], row["done"]))
+            row.update(merged, updated_at=now, last_request_ts=req_ts)
+            moved_to.append(stats_key(row["due_date"], row["done"]))
+            dirty[item.id] = row
+            results.append(_item_result(index, status.HTTP_200_OK, row_to_task(row)))
+
+        if dirty:
+            await conn.execute(
+                _UPDATE_TASK_SQL, [_update_params(tid, row) for tid, row in dirty.items()]
             )
-            return {
-                "id": task_id,
-                "scheduled": True,
-                "execute_at": req_ts_norm,
-                "op_id": op_id,
-            }
+            await record_task_stats(conn, removed=moved_from, added=moved_to)
+        await commit(conn)
+    for tid, row in dirty.items():
+        await task_cache.store(tid, row)
+    notify_enqueue_listeners(scheduled_at)
+    return {"results": results}
 
-        # Immediate delete
-        cur.execute("DELETE FROM tasks WHERE id = %s", (task_id,))
-        conn.commit()
-        return {"id": task_id, "deleted": True}
+
+@router.delete(
+    ":batch",
+    response_model=BatchResult,
+    status_code=status.HTTP_200_OK,
+    summary="Delete many tasks in one request",
+)
+async def delete_tasks_batch(
+    payload: List[TaskBatchDeleteItem] = Body(..., min_length=1, max_length=BATCH_MAX_ITEMS),
+):
+    results: List[Dict[str, Any]] = []
+    scheduled_at: List[datetime] = []
+    deleted: List[int] = []
+    removed: List[Any] = []
+
+    async with get_db() as conn:
+        state = await fetch_task_rows(conn, sorted({item.id for item in payload}), for_update=True)
+        now = utc_now()
+        for index, item in enumerate(payload):
+            row = state.get(item.id)
+            if not row:
+                results.append(
+                    _item_result(index, status.HTTP_404_NOT_FOUND, {"detail": "Resource not found"})
+                )
+                continue
+            req_ts = to_db_datetime(item.request_timestamp)
+            if not (req_ts > as_db_datetime(row["last_request_ts"])):
+                results.append(
+                    _item_result(index, status.HTTP_409_CONFLICT, {"detail": "Timestamp conflict"})
+                )
+                continue
+
+            if req_ts > now:
+                op_id = await insert_scheduled_op(
+                    conn,
+                    item.id,
+                    "delete",
+                    {"request_timestamp": format_rfc3339(req_ts)},
+                    req_ts,
+                    req_ts,
+                )
+                scheduled_at.append(req_ts)
+                results.append(
+                    _item_result(
+                        index,
+                        status.HTTP_200_OK,
+                        {
+                            "id": item.id,
+                            "scheduled": True,
+                            "execute_at": format_api_timestamp(req_ts),
+                            "op_id": op_id,
+                        },
+                    )
+                )
+                continue
+
+            # Later items targeting the same id see it as gone
+            removed.append(stats_key(row["due_date"], row["done"]))
+            del state[item.id]
+            deleted.append(item.id)
+            results.append(_item_result(index, status.HTTP_200_OK, {"id": item.id, "deleted": True}))
+
+        if deleted:
+            await conn.execute(
+                text("DELETE FROM tasks WHERE id IN :ids").bindparams(
+                    bindparam("ids", expanding=True)
+                ),
+                {"ids": deleted},
+            )
+            await insert_task_tombstones(conn, deleted, now)
+            await record_task_stats(conn, removed=removed)
+        await commit(conn)
+    for tid in deleted:
+        await task_cache.invalidate(tid)
+    notify_enqueue_listeners(scheduled_at)
+    return {"results": results}
@@ -0,0 +1,119 @@
+"""
+Production entry point: runs main:app under uvicorn with settings taken from the
+environment (the `__main__` block of main.py stays the development entry point).
+
+    python server.py
+
+Several worker processes share the listening socket; inside a pod exactly one of them
+(the leader, see core/leader.py) runs migrations, the scheduled-ops executor and the
+tombstone purge, the others only serve requests. With more than one worker, GET /metrics
+aggregates the samples of all workers (prometheus_client multiprocess mode, core/metrics.py).
+
+Env vars:
+  SERVER_APP (default main:app) — ASGI app import string
+  SERVER_HOST (default 0.0.0.0), SERVER_PORT (default 8000)
+  WEB_CONCURRENCY (default: CPUs available to the container, from the cgroup CPU limit,
+      rounded up) — worker processes; each one has its own DB pool (see DB_POOL_SIZE)
+  SERVER_LOOP (default auto) — auto | uvloop | asyncio; auto uses uvloop when installed
+  SERVER_HTTP (default auto) — auto | httptools | h11; auto uses httptools when installed
+  SERVER_KEEPALIVE (default 75) — seconds an idle keep-alive connection is kept open;
+      longer than the upstream idle timeout of the ingress (nginx: 60 s) so that the
+      proxy, not the app, closes idle connections and never reuses a closed one
+  SERVER_BACKLOG (default 2048) — listen() backlog (capped by net.core.somaxconn)
+  SERVER_LIMIT_CONCURRENCY (default unset) — per worker, answer 503 beyond this many
+      concurrent connections + tasks instead of queueing without bound
+  SERVER_TIMEOUT_GRACEFUL_SHUTDOWN (default 20) — seconds in-flight requests get on
+      SIGTERM; keep below the pod's terminationGracePeriodSeconds (30)
+  SERVER_ACCESS_LOG (default true) — uvicorn's per-request access log line
+  SERVER_PROXY_HEADERS (default true), FORWARDED_ALLOW_IPS (default *) — trust
+      X-Forwarded-For/Proto from the ingress
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import shutil
+from typing import Any, Dict, Optional
+
+import uvicorn
+
+APP = os.getenv("SERVER_APP", "main:app")
+METRICS_DIR = "/tmp/tasks-api-metrics"
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+def _cgroup_cpu_limit() -> Optional[float]:
+    """
+    CPU limit of the container in cores (cgroup v2 cpu.max, else v1 cfs quota), None
+    when unlimited or not in a cgroup.
+    """
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota_us = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period_us = int(f.read())
+        if quota_us > 0:
+            return quota_us / period_us
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus() -> int:
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+
+def server_options() -> Dict[str, Any]:
+    """
+    uvicorn.run() keyword arguments from the environment.
+    """
+    limit_concurrency = os.getenv("SERVER_LIMIT_CONCURRENCY")
+    return {
+        "host": os.getenv("SERVER_HOST", "0.0.0.0"),
+        "port": int(os.getenv("SERVER_PORT", "8000")),
+        "workers": max(1, int(os.getenv("WEB_CONCURRENCY") or available_cpus())),
+        "loop": os.getenv("SERVER_LOOP", "auto"),
+        "http": os.getenv("SERVER_HTTP", "auto"),
+        "timeout_keep_alive": int(os.getenv("SERVER_KEEPALIVE", "75")),
+        "backlog": int(os.getenv("SERVER_BACKLOG", "2048")),
+        "limit_concurrency": int(limit_concurrency) if limit_concurrency else None,
+        "timeout_graceful_shutdown": int(os.getenv("SERVER_TIMEOUT_GRACEFUL_SHUTDOWN", "20")),
+        "access_log": _env_flag("SERVER_ACCESS_LOG", "true"),
+        "proxy_headers": _env_flag("SERVER_PROXY_HEADERS", "true"),
+        "forwarded_allow_ips": os.getenv("FORWARDED_ALLOW_IPS", "*"),
+    }
+
+
+def main() -> None:
+    options = server_options()
+    if options["workers"] > 1:
+        # Read by prometheus_client when the workers import it; emptied so that files of a
+        # previous run (container restart) are not aggregated in
+        metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", METRICS_DIR)
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir, exist_ok=True)
+    print(
+        "Starting {workers} worker(s) on {host}:{port} (loop={loop}, http={http}, "
+        "keep-alive={timeout_keep_alive}s, backlog={backlog})".format(**options)
+    )
+    uvicorn.run(APP, **options)
+
+
+if __name__ == "__main__":
+    main()
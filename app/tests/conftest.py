@@ -0,0 +1,117 @@
+"""
+Shared fixtures. The app runs against a throwaway SQLite database, migrated by its own
+startup sequence, with the read replica pointed at the same file so replica routing is
+exercised by every read. The env vars are set before any app module is imported: they
+are read at import time.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List
+
+_TMP_DIR = tempfile.mkdtemp(prefix="tasks-api-tests-")
+DB_PATH = os.path.join(_TMP_DIR, "tasks.db")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["DATABASE_REPLICA_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["LEADER_LOCK_FILE"] = os.path.join(_TMP_DIR, "leader.lock")
+# Tests wipe the tables between them: no cache that would outlive the rows
+os.environ["TASK_CACHE_BACKEND"] = "none"
+os.environ["TRACING_ENABLED"] = "false"
+os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+import pytest  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from core.db import POOLS  # noqa: E402
+from core.search import task_search  # noqa: E402
+
+_TABLES = ("tasks", "task_tombstones", "task_stats", "scheduled_ops")
+
+
+def request_ts(seconds: float = 0.0) -> str:
+    """
+    RFC3339 request_timestamp `seconds` from now (microseconds kept).
+    """
+    value = datetime.now(timezone.utc) + timedelta(seconds=seconds)
+    return value.isoformat().replace("+00:00", "Z")
+
+
+def sql(statement: str, params: Any = ()) -> list:
+    """
+    Run one statement on the test database outside the app's pools.
+    """
+    conn = sqlite3.connect(DB_PATH, timeout=10)
+    try:
+        rows = conn.execute(statement, params).fetchall()
+        conn.commit()
+        return rows
+    finally:
+        conn.close()
+
+
+def fetch_row(task_id: int) -> Dict[str, Any]:
+    """
+    The tasks row as the SQLite driver returns it.
+    """
+    conn = sqlite3.connect(DB_PATH, timeout=10)
+    conn.row_factory = sqlite3.Row
+    try:
+        return dict(conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone())
+    finally:
+        conn.close()
+
+
+@pytest.fixture(scope="session")
+def app_client() -> Iterator[TestClient]:
+    with TestClient(main.app) as client:
+        deadline = time.monotonic() + 10
+        while client.get("/readyz").status_code != 200:
+            assert time.monotonic() < deadline, "app not ready after 10s"
+            time.sleep(0.05)
+        yield client
+
+
+@pytest.fixture
+def client(app_client: TestClient) -> TestClient:
+    """
+    The app, with empty tables.
+    """
+    for table in _TABLES:
+        sql(f"DELETE FROM {table}")
+    # Rebuild the in-process search index on the next search instead of catching up
+    task_search._position = None
+    return app_client
+
+
+@pytest.fixture
+def create_task(client: TestClient) -> Callable[..., Dict[str, Any]]:
+    def create(title: str, **fields: Any) -> Dict[str, Any]:
+        response = client.post("/tasks", json={"title": title, "request_timestamp": request_ts(), **fields})
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    return create
+
+
+@pytest.fixture
+def statements() -> Iterator[List[str]]:
+    """
+    SQL statements the app sends on the primary pool during the test.
+    """
+    sent: List[str] = []
+    engine = POOLS["primary"].sync_engine
+
+    def record(conn, cursor, statement, parameters, context, executemany) -> None:
+        sent.append(" ".join(statement.split()))
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield sent
+    event.remove(engine, "before_cursor_execute", record)
@@ -0,0 +1,75 @@
+"""
+/tasks:batch endpoints: one transaction per request, one result per item mirroring the
+single-item endpoint (status and body), in request order.
+"""
+
+from __future__ import annotations
+
+from conftest import request_ts, sql
+
+
+def _statuses(response):
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    assert [r["index"] for r in results] == list(range(len(results)))
+    return [r["status"] for r in results]
+
+
+def test_batch_create(client, create_task):
+    create_task("taken", due_date="2026-04-01")
+    items = [
+        {"title": "a", "due_date": "2026-04-01", "request_timestamp": request_ts()},
+        {"title": "taken", "due_date": "2026-04-01", "request_timestamp": request_ts()},
+        {"title": "a", "due_date": "2026-04-01", "request_timestamp": request_ts()},
+        {"title": "later", "request_timestamp": request_ts(3600)},
+    ]
+
+    response = client.post("/tasks:batch", json=items)
+
+    assert _statuses(response) == [201, 409, 409, 201]
+    results = response.json()["results"]
+    assert client.get(f"/tasks/{results[0]['body']['id']}").json() == results[0]["body"]
+    assert results[3]["body"]["scheduled"] is True
+    assert sql("SELECT COUNT(*) FROM tasks") == [(2,)]
+    assert sql("SELECT op_type FROM scheduled_ops") == [("create",)]
+
+
+def test_batch_update(client, create_task):
+    task = create_task("title", content="content")
+    other = create_task("other")
+    items = [
+        {"id": task["id"], "done": True, "request_timestamp": request_ts()},
+        {"id": 12345, "title": "x", "request_timestamp": request_ts()},
+        {"id": other["id"], "title": "x", "request_timestamp": "2000-01-01T00:00:00Z"},
+    ]
+
+    response = client.put("/tasks:batch", json=items)
+
+    assert _statuses(response) == [200, 404, 409]
+    updated = response.json()["results"][0]["body"]
+    assert updated == {**task, "done": True, "updated_at": updated["updated_at"]}
+    assert client.get(f"/tasks/{task['id']}").json() == updated
+    assert client.get(f"/tasks/{other['id']}").json()["title"] == "other"
+
+
+def test_batch_delete(client, create_task):
+    task = create_task("title")
+    other = create_task("other")
+    items = [
+        {"id": task["id"], "request_timestamp": request_ts()},
+        {"id": 12345, "request_timestamp": request_ts()},
+        {"id": other["id"], "request_timestamp": "2000-01-01T00:00:00Z"},
+    ]
+
+    response = client.request("DELETE", "/tasks:batch", json=items)
+
+    assert _statuses(response) == [200, 404, 409]
+    assert response.json()["results"][0]["body"] == {"id": task["id"], "deleted": True}
+    assert client.get(f"/tasks/{task['id']}").status_code == 404
+    assert sql("SELECT task_id FROM task_tombstones") == [(task["id"],)]
+
+
+def test_batch_size_limits(client):
+    item = {"title": "t", "request_timestamp": request_ts()}
+    assert client.post("/tasks:batch", json=[]).status_code == 400
+    assert client.post("/tasks:batch", json=[item] * 501).status_code == 400
@@ -0,0 +1,149 @@
+"""
+Task cache, on the default in-process backend and on the in-memory stand-in for the
+shared one: reads through, refreshed or invalidated by every writer, and never left
+holding a row older than the last write.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from conftest import fetch_row, request_ts, sql
+from core import cache, scheduler
+from routes import tasks as task_routes
+
+
+@pytest.fixture(params=["local", "memory-shared"])
+def task_cache(request, monkeypatch, client):
+    monkeypatch.setenv("TASK_CACHE_BACKEND", request.param)
+    test_cache = cache.build_task_cache()
+    assert test_cache.backend == request.param
+    monkeypatch.setattr(task_routes, "task_cache", test_cache)
+    monkeypatch.setattr(scheduler, "task_cache", test_cache)
+    return test_cache
+
+
+def _cached(client, test_cache, task_id):
+    return client.portal.call(test_cache.get, task_id)
+
+
+def _insert_task(title):
+    # Written behind the app's back: not in the cache
+    sql(
+        "INSERT INTO tasks (title, done, created_at, updated_at, last_request_ts) "
+        "VALUES (?, 0, '2026-01-01 00:00:00', '2026-01-01 00:00:00', '2026-01-01 00:00:00.000000')",
+        (title,),
+    )
+    return sql("SELECT MAX(id) FROM tasks")[0][0]
+
+
+def _row(task_id, title, last_request_ts):
+    return {"id": task_id, "title": title, "last_request_ts": last_request_ts}
+
+
+def test_get_reads_through(client, create_task, task_cache):
+    task = create_task("title")
+    # Creates store the row they wrote
+    assert _cached(client, task_cache, task["id"])["title"] == "title"
+    hits = task_cache.stats()["hits"]
+
+    assert client.get(f"/tasks/{task['id']}").json() == task
+    assert task_cache.stats()["hits"] == hits + 1
+
+
+def test_update_refreshes_the_entry(client, create_task, task_cache):
+    task = create_task("title")
+    first = client.get(f"/tasks/{task['id']}")
+
+    client.put(f"/tasks/{task['id']}", json={"title": "renamed", "request_timestamp": request_ts()})
+    second = client.get(f"/tasks/{task['id']}")
+
+    assert second.json()["title"] == "renamed"
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert client.get(f"/tasks/{task['id']}", headers={"If-None-Match": first.headers["ETag"]}).status_code == 200
+
+
+def test_delete_invalidates_the_entry(client, create_task, task_cache):
+    task = create_task("title")
+    client.get(f"/tasks/{task['id']}")
+
+    client.request("DELETE", f"/tasks/{task['id']}", json={"request_timestamp": request_ts()})
+
+    assert _cached(client, task_cache, task["id"]) is None
+    assert client.get(f"/tasks/{task['id']}").status_code == 404
+
+
+def test_scheduled_writes_reach_the_cache(client, create_task, task_cache):
+    kept = create_task("kept")
+    gone = create_task("gone")
+    client.put(f"/tasks/{kept['id']}", json={"done": True, "request_timestamp": request_ts(3600)})
+    client.request("DELETE", f"/tasks/{gone['id']}", json={"request_timestamp": request_ts(3600)})
+    # Not applied yet: the cached rows stay as they are
+    assert client.get(f"/tasks/{kept['id']}").json()["done"] is False
+
+    sql("UPDATE scheduled_ops SET execute_at = '2000-01-01 00:00:00'")
+    client.portal.call(scheduler.process_due_scheduled_ops_once)
+
+    assert client.get(f"/tasks/{kept['id']}").json()["done"] is True
+    assert client.get(f"/tasks/{gone['id']}").status_code == 404
+
+
+def test_replica_fills_expire_with_the_replica_lag(client, task_cache, monkeypatch):
+    task = {"id": _insert_task("title")}
+    monkeypatch.setattr(task_routes, "REPLICA_MAX_LAG_SECONDS", 0.05)
+
+    client.get(f"/tasks/{task['id']}")
+    assert _cached(client, task_cache, task["id"]) is not None
+    time.sleep(0.1)
+    assert _cached(client, task_cache, task["id"]) is None
+
+
+def test_fill_racing_an_update(client, task_cache, monkeypatch):
+    task = {"id": _insert_task("title")}
+    read_row = task_routes.fetch_task_row
+
+    async def read_then_update(conn, task_id):
+        # The GET has read the row when a PUT commits and stores its own
+        row = await read_row(conn, task_id)
+        sql("UPDATE tasks SET title = 'renamed', last_request_ts = '2999-01-01 00:00:00.000000' WHERE id = ?", (task_id,))
+        await task_cache.store(task_id, fetch_row(task_id))
+        return row
+
+    monkeypatch.setattr(task_routes, "fetch_task_row", read_then_update)
+    assert client.get(f"/tasks/{task['id']}").json()["title"] == "title"
+    monkeypatch.setattr(task_routes, "fetch_task_row", read_row)
+
+    assert client.get(f"/tasks/{task['id']}").json()["title"] == "renamed"
+
+
+def test_fill_racing_a_delete(client, task_cache):
+    async def race():
+        token = task_cache.fill_token(1)
+        await task_cache.invalidate(1)
+        await task_cache.fill(1, _row(1, "deleted", "2026-01-01 00:00:00"), token)
+        return await task_cache.get(1)
+
+    assert client.portal.call(race) is None
+
+
+def test_stores_keep_the_newest_version(client, task_cache):
+    async def out_of_order():
+        await task_cache.store(1, _row(1, "second", "2026-01-01 00:00:02"))
+        await task_cache.store(1, _row(1, "first", "2026-01-01 00:00:01"))
+        return await task_cache.get(1)
+
+    assert client.portal.call(out_of_order)["title"] == "second"
+
+
+def test_shared_store_errors_are_misses():
+    class BrokenStore(cache.InMemorySharedStore):
+        async def get(self, key):
+            raise ConnectionError("down")
+
+    shared = cache.SharedTaskCache(BrokenStore(), 30, "memory-shared")
+
+    assert asyncio.run(shared.get(1)) is None
+    assert shared.stats()["errors"] == 1
@@ -0,0 +1,70 @@
+"""
+GET /tasks/changes: creates, updates and deletes in (changed_at, id) order, resumable
+through next_cursor.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from conftest import request_ts
+from routes import tasks as task_routes
+
+
+@pytest.fixture(autouse=True)
+def no_settle_window(monkeypatch):
+    # Changes are held back for CHANGES_SETTLE_SECONDS; the tests read them right away
+    monkeypatch.setattr(task_routes, "CHANGES_SETTLE_SECONDS", 0)
+
+
+def _all_changes(client, **params):
+    changes, pages = [], 0
+    while True:
+        page = client.get("/tasks/changes", params=params).json()
+        changes += page["changes"]
+        pages += 1
+        params = {**params, "cursor": page["next_cursor"]}
+        params.pop("since", None)
+        if not page["has_more"]:
+            return changes, page["next_cursor"], pages
+
+
+def test_changes_in_order_across_pages(client, create_task):
+    first, second, third = (create_task(f"task {i}") for i in range(3))
+    client.put(f"/tasks/{first['id']}", json={"title": "renamed", "request_timestamp": request_ts()})
+    client.request("DELETE", f"/tasks/{second['id']}", json={"request_timestamp": request_ts()})
+
+    changes, _, pages = _all_changes(client, limit=1)
+
+    assert pages == 3
+    assert [(c["id"], c["deleted"]) for c in changes] == [
+        (third["id"], False),
+        (first["id"], False),
+        (second["id"], True),
+    ]
+    assert changes[1]["task"]["title"] == "renamed"
+    assert changes[2]["task"] is None
+
+
+def test_cursor_resumes_after_the_last_change(client, create_task):
+    create_task("before")
+    _, cursor, _ = _all_changes(client)
+
+    assert client.get("/tasks/changes", params={"cursor": cursor}).json()["changes"] == []
+    after = create_task("after")
+    page = client.get("/tasks/changes", params={"cursor": cursor}).json()
+    assert [c["id"] for c in page["changes"]] == [after["id"]]
+
+
+def test_since(client, create_task):
+    task = create_task("title")
+
+    recent = client.get("/tasks/changes", params={"since": request_ts(-60)}).json()["changes"]
+    assert [c["id"] for c in recent] == [task["id"]]
+    assert client.get("/tasks/changes", params={"since": request_ts(60)}).json()["changes"] == []
+
+
+def test_expired_position_and_bad_cursor(client):
+    # Tombstones older than TASK_TOMBSTONE_RETENTION_DAYS may be purged already
+    assert client.get("/tasks/changes", params={"since": "2000-01-01T00:00:00Z"}).status_code == 410
+    assert client.get("/tasks/changes", params={"cursor": "not a cursor"}).status_code == 400
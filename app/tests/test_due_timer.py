@@ -0,0 +1,84 @@
+"""
+DueTimer: the executor sleeps until the earliest queued execute_at instead of polling, is
+woken early by in-process enqueues, and re-reads the queue on request_refresh().
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import request_ts, sql
+from core import scheduler
+from core.scheduler import DueTimer, due_timer
+
+
+def _at(seconds: float) -> datetime:
+    return (datetime.now(timezone.utc) + timedelta(seconds=seconds)).replace(tzinfo=None)
+
+
+def _wait_until(predicate, timeout: float) -> float:
+    started = time.monotonic()
+    while not predicate():
+        assert time.monotonic() - started < timeout, f"not done after {timeout}s"
+        time.sleep(0.02)
+    return time.monotonic() - started
+
+
+@pytest.fixture
+def timer_client(client):
+    # The app's leader runs the executor on the module timer
+    _wait_until(lambda: due_timer.active, 5)
+    return client
+
+
+def test_notify_keeps_the_earliest_instant():
+    timer = DueTimer()
+    timer.notify(_at(10))
+    assert timer.snapshot()["timer_pending"] == 0  # inactive: not the executor's process
+
+    timer.active = True
+    timer.notify(_at(60))
+    timer.notify(_at(10))
+    timer.notify(_at(30))
+    assert timer.snapshot()["timer_pending"] == 3
+    assert timer._wakeup.is_set()
+
+    timer.mark_processed(time.time() + 20)
+    assert timer.snapshot()["timer_pending"] == 2
+    assert timer.overdue_seconds() == 0.0
+
+
+def test_enqueued_op_applied_at_its_execute_at(timer_client, create_task):
+    task = create_task("title")
+    wakeups = due_timer.wakeups_total
+
+    response = timer_client.put(f"/tasks/{task['id']}", json={"done": True, "request_timestamp": request_ts(0.5)})
+    assert response.json()["scheduled"] is True
+    elapsed = _wait_until(lambda: timer_client.get(f"/tasks/{task['id']}").json()["done"], 5)
+
+    # Well before the next safety-net poll
+    assert 0.3 <= elapsed < min(5, scheduler.POLL_INTERVAL_SECONDS)
+    assert due_timer.wakeups_total > wakeups
+
+
+def test_request_refresh_finds_ops_queued_elsewhere(timer_client, create_task):
+    task = create_task("title")
+    timer_client.put(f"/tasks/{task['id']}", json={"done": True, "request_timestamp": request_ts(3600)})
+    # Starts the test from a fresh safety-net deadline
+    refreshes = due_timer.refreshes_total
+    timer_client.portal.call(due_timer.request_refresh)
+    _wait_until(lambda: due_timer.refreshes_total > refreshes, 5)
+
+    # Moved behind the timer's back, as another worker's enqueue would be
+    due_at = _at(0.2).isoformat(sep=" ", timespec="microseconds")
+    sql("UPDATE scheduled_ops SET execute_at = ?", (due_at,))
+    time.sleep(0.6)
+    assert timer_client.get(f"/tasks/{task['id']}").json()["done"] is False
+
+    refreshes = due_timer.refreshes_total
+    timer_client.portal.call(due_timer.request_refresh)
+    _wait_until(lambda: timer_client.get(f"/tasks/{task['id']}").json()["done"], 5)
+    assert due_timer.refreshes_total > refreshes
@@ -0,0 +1,78 @@
+"""
+Conditional GET: strong ETags on GET /tasks/{id} and GET /tasks (page and stream),
+answered with 304 on a matching If-None-Match.
+"""
+
+from __future__ import annotations
+
+from conftest import request_ts, sql
+from routes import tasks as task_routes
+
+
+def test_task_etag(client, create_task):
+    task = create_task("title")
+    url = f"/tasks/{task['id']}"
+    etag = client.get(url).headers["etag"]
+
+    for header in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get(url, headers={"If-None-Match": header})
+        assert response.status_code == 304, header
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+
+    client.put(url, json={"title": "renamed", "request_timestamp": request_ts()})
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_list_etag_follows_creates_updates_and_deletes(client, create_task):
+    task = create_task("first")
+    etags = [client.get("/tasks").headers["etag"]]
+
+    create_task("second")
+    etags.append(client.get("/tasks").headers["etag"])
+    client.put(f"/tasks/{task['id']}", json={"done": True, "request_timestamp": request_ts()})
+    etags.append(client.get("/tasks").headers["etag"])
+    client.request("DELETE", f"/tasks/{task['id']}", json={"request_timestamp": request_ts()})
+    etags.append(client.get("/tasks").headers["etag"])
+
+    assert len(set(etags)) == 4
+    assert client.get("/tasks", headers={"If-None-Match": etags[-1]}).status_code == 304
+    # The query is part of the version
+    assert client.get("/tasks", params={"limit": 1}).headers["etag"] != etags[-1]
+
+
+def test_stream_etag(client, create_task):
+    create_task("title")
+    response = client.get("/tasks", params={"stream": "true"})
+    etag = response.headers["etag"]
+
+    not_modified = client.get("/tasks", params={"stream": "true"}, headers={"If-None-Match": etag})
+
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert etag != client.get("/tasks").headers["etag"]
+
+
+def test_stream_etag_and_body_share_a_snapshot(client, create_task):
+    for i in range(3):
+        create_task(f"task {i}")
+    where, params = task_routes._list_filters(None, None, None, None)
+    version_sql = f"SELECT COUNT(*) AS n, MAX(updated_at) AS max_updated_at, MAX(id) AS max_id FROM tasks {where}"
+
+    async def stream_with_a_write_in_between():
+        body = task_routes._stream_tasks_ndjson(version_sql, "SELECT * FROM tasks ORDER BY id", params, ())
+        etag = await body.__anext__()
+        sql(
+            "INSERT INTO tasks (title, done, created_at, updated_at, last_request_ts) "
+            "VALUES ('late', 0, '2026-01-01 00:00:00', '2026-01-01 00:00:00', '2026-01-01 00:00:00')"
+        )
+        return etag, [line async for line in body]
+
+    etag, lines = client.portal.call(stream_with_a_write_in_between)
+
+    # The row committed after the ETag was computed is not streamed under it
+    assert len(lines) == 3
+    assert etag.startswith('"')
@@ -0,0 +1,91 @@
+"""
+Per-pod leader election on a flock: one leader among the workers sharing the lock file,
+taken over when the holder releases it or exits, and woken by the others with SIGUSR1.
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from core.leader import LeaderLock
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A leader worker in another process: holds the lock, advertises its PID and reports
+# the wakeup signal
+_LEADER_PROCESS = textwrap.dedent(
+    """
+    import signal, sys
+    from core.leader import WAKEUP_SIGNAL, LeaderLock
+
+    signal.signal(WAKEUP_SIGNAL, lambda *_: print("woken", flush=True))
+    lock = LeaderLock(sys.argv[1], 0.1)
+    lock.accept_wakeups = True
+    print("leader" if lock.try_acquire() else "follower", flush=True)
+    sys.stdin.read()
+    """
+)
+
+
+@pytest.fixture
+def lock_path(tmp_path):
+    return str(tmp_path / "leader.lock")
+
+
+@pytest.fixture
+def leader_process(lock_path):
+    proc = subprocess.Popen(
+        [sys.executable, "-c", _LEADER_PROCESS, lock_path],
+        cwd=APP_DIR, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+    )
+    assert proc.stdout.readline().strip() == "leader"
+    yield proc
+    proc.kill()
+    proc.wait()
+
+
+def test_one_leader_per_lock_file(lock_path):
+    first = LeaderLock(lock_path, 0.1)
+    second = LeaderLock(lock_path, 0.1)
+
+    assert first.try_acquire() is True
+    assert second.try_acquire() is False
+    assert (first.is_leader, second.is_leader) == (True, False)
+
+    first.release()
+    assert second.try_acquire() is True
+    assert first.try_acquire() is False
+    second.release()
+
+
+def test_takeover_when_the_leader_exits(lock_path, leader_process):
+    follower = LeaderLock(lock_path, 0.1)
+    assert follower.try_acquire() is False
+
+    leader_process.kill()
+    leader_process.wait()
+
+    assert follower.try_acquire() is True
+    follower.release()
+
+
+def test_wake_leader(lock_path, leader_process):
+    follower = LeaderLock(lock_path, 0.1)
+    follower.try_acquire()
+
+    assert follower.leader_pid() == leader_process.pid
+    assert follower.wake_leader() is True
+    assert leader_process.stdout.readline().strip() == "woken"
+    assert follower.wakeups_sent == 1
+
+
+def test_no_lock_file_means_leader(tmp_path):
+    lock = LeaderLock(str(tmp_path / "missing" / "leader.lock"), 0.1)
+
+    assert lock.try_acquire() is True
+    assert lock.lock_error.startswith("FileNotFoundError")
@@ -0,0 +1,54 @@
+"""
+GET /tasks: keyset pagination on id, filters, NDJSON streaming.
+"""
+
+from __future__ import annotations
+
+import json
+
+from conftest import request_ts
+
+
+def test_keyset_pagination(client, create_task):
+    ids = [create_task(f"task {i}")["id"] for i in range(5)]
+
+    first = client.get("/tasks", params={"limit": 2})
+    second = client.get("/tasks", params={"limit": 2, "after_id": first.headers["x-next-after-id"]})
+    last = client.get("/tasks", params={"limit": 2, "after_id": second.headers["x-next-after-id"]})
+
+    assert [t["id"] for t in first.json()] == ids[:2]
+    assert [t["id"] for t in second.json()] == ids[2:4]
+    assert [t["id"] for t in last.json()] == ids[4:]
+    assert "x-next-after-id" not in last.headers
+
+
+def test_filters(client, create_task):
+    early = create_task("early", due_date="2026-01-10")
+    late = create_task("late", due_date="2026-02-10")
+    create_task("no due date")
+    client.put(f"/tasks/{early['id']}", json={"done": True, "request_timestamp": request_ts()})
+
+    def titles(**params):
+        return [t["title"] for t in client.get("/tasks", params=params).json()]
+
+    assert titles(due_from="2026-01-01", due_to="2026-01-31") == ["early"]
+    assert titles(due_from="2026-02-01") == ["late"]
+    assert titles(done=True) == ["early"]
+    assert titles(done=False) == ["late", "no due date"]
+
+
+def test_limit_bounds(client):
+    assert client.get("/tasks", params={"limit": 0}).status_code == 400
+    assert client.get("/tasks", params={"limit": 1001}).status_code == 400
+
+
+def test_stream(client, create_task):
+    created = [create_task(f"task {i}") for i in range(3)]
+
+    response = client.get("/tasks", params={"stream": "true", "after_id": created[0]["id"]})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.content.splitlines()
+    assert [json.loads(line) for line in lines] == created[1:]
+    assert client.get("/tasks", params={"stream": "true", "limit": 1}).content.count(b"\n") == 1
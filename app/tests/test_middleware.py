@@ -0,0 +1,85 @@
+"""
+CorrelationIdMiddleware on a small app of its own: correlation ID header, the single
+place unhandled errors become a JSON 500, per-route-template request metrics.
+"""
+
+from __future__ import annotations
+
+import re
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from core import metrics
+from core.middleware import HTTP_REQUESTS, CorrelationIdMiddleware
+
+_UUID = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+
+def _build_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CorrelationIdMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"{i}\n".encode()
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return app
+
+
+@pytest.fixture(scope="module")
+def app_client():
+    return TestClient(_build_app(), raise_server_exceptions=False)
+
+
+def test_correlation_id(app_client):
+    echoed = app_client.get("/items/1", headers={"correlation-id": "abc-123"})
+    generated = app_client.get("/items/1", headers={"x-correlation-id": "not valid!"})
+
+    assert echoed.headers["x-correlation-id"] == "abc-123"
+    assert "correlation_id" not in echoed.headers
+    assert _UUID.fullmatch(generated.headers["x-correlation-id"])
+
+
+def test_unhandled_error_is_a_json_500(app_client):
+    response = app_client.get("/boom", headers={"x-correlation-id": "req-1"})
+
+    assert response.status_code == 500
+    assert response.content == b'{"detail":"Internal Server Error"}'
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["x-correlation-id"] == "req-1"
+
+
+def test_streamed_response_passes_through(app_client):
+    response = app_client.get("/stream")
+
+    assert response.content == b"0\n1\n2\n"
+    assert "x-correlation-id" in response.headers
+
+
+def test_requests_counted_by_route_template(app_client):
+    def count(route, status):
+        return metrics.sample_value(HTTP_REQUESTS, method="GET", route=route, status=status)
+
+    before = (count("/items/{item_id}", "200"), count("<unmatched>", "404"), count("/boom", "500"))
+    app_client.get("/items/1")
+    app_client.get("/items/2")
+    app_client.get("/nowhere")
+    app_client.get("/boom")
+
+    after = (count("/items/{item_id}", "200"), count("<unmatched>", "404"), count("/boom", "500"))
+    assert [b - a for a, b in zip(before, after)] == [2, 1, 1]
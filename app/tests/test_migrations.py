@@ -0,0 +1,74 @@
+"""
+Schema migrations on the SQLite backend: versions recorded once in schema_version,
+re-running is a no-op, and a database left at an intermediate version (or with a
+migration applied but not yet recorded) is brought to the latest one without redoing
+completed work.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from conftest import request_ts, sql
+from core.migrations import LATEST_VERSION, MIGRATIONS, run_migrations
+
+
+@pytest.fixture
+def migrate(client):
+    def run():
+        return client.portal.call(run_migrations)
+
+    return run
+
+
+def _versions():
+    return [version for version, in sql("SELECT version FROM schema_version ORDER BY version")]
+
+
+def _stats(client):
+    body = client.get("/tasks/stats").json()
+    return body["total"], body["done"]
+
+
+def test_versions_recorded_once(migrate):
+    assert _versions() == [m.version for m in MIGRATIONS]
+    assert _versions()[-1] == LATEST_VERSION
+
+    assert migrate() == []
+    assert migrate() == []
+    assert _versions() == [m.version for m in MIGRATIONS]
+
+
+def test_resume_from_an_intermediate_version(client, create_task, migrate):
+    create_task("open")
+    done = create_task("done")
+    client.put(f"/tasks/{done['id']}", json={"done": True, "request_timestamp": request_ts()})
+    # The database of a replica that stopped at version 3
+    sql("DROP TABLE task_stats")
+    sql("DELETE FROM schema_version WHERE version > 3")
+
+    assert migrate() == [4]
+    assert _versions() == [m.version for m in MIGRATIONS]
+    # Backfilled from the existing rows
+    assert _stats(client) == (2, 1)
+    assert migrate() == []
+
+
+def test_applied_but_unrecorded_migration_is_rerun_safely(client, create_task, migrate):
+    create_task("first")
+    create_task("second")
+    # task_stats created and backfilled, version row never written
+    sql("DELETE FROM schema_version WHERE version = ?", (LATEST_VERSION,))
+
+    assert migrate() == [LATEST_VERSION]
+    # The backfill is not done twice
+    assert _stats(client) == (2, 0)
+
+
+def test_rerun_from_scratch_keeps_the_data(client, create_task, migrate):
+    task = create_task("kept")
+    sql("DELETE FROM schema_version")
+
+    assert migrate() == [m.version for m in MIGRATIONS]
+    assert client.get(f"/tasks/{task['id']}").json() == task
+    assert _stats(client) == (1, 0)
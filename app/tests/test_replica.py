@@ -0,0 +1,74 @@
+"""
+Read replica routing: GETs go to the replica unless the client just wrote (x-write-token
+or the correlation ID of a recent write) or the replica is marked down. The tests run with
+DATABASE_REPLICA_URL set to the primary's file (conftest).
+"""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from conftest import request_ts
+from core import db, metrics
+from core import middleware
+
+
+@pytest.fixture
+def reads():
+    """
+    db_reads_total increments since the fixture was set up, by (pool, reason).
+    """
+    routes = [("replica", "replica"), ("primary", "read_your_writes"), ("primary", "replica_unavailable")]
+
+    def counts():
+        return {route: metrics.sample_value(db.DB_READS, pool=route[0], reason=route[1]) for route in routes}
+
+    before = counts()
+    return lambda: {route: n - before[route] for route, n in counts().items() if n != before[route]}
+
+
+def test_replica_is_configured():
+    assert db.REPLICA_ENABLED
+
+
+def test_plain_reads_go_to_the_replica(client, create_task, reads):
+    task = create_task("title")
+
+    assert client.get(f"/tasks/{task['id']}").status_code == 200
+    assert client.get("/tasks").status_code == 200
+
+    assert reads() == {("replica", "replica"): 2}
+
+
+def test_read_your_writes(client, reads):
+    response = client.post(
+        "/tasks", json={"title": "title", "request_timestamp": request_ts()}, headers={"x-correlation-id": "writer-1"}
+    )
+    token = response.headers["x-write-token"]
+    task_id = response.json()["id"]
+
+    client.get(f"/tasks/{task_id}", headers={"x-write-token": token})
+    client.get(f"/tasks/{task_id}", headers={"x-correlation-id": "writer-1"})
+    read = client.get(f"/tasks/{task_id}", headers={"x-correlation-id": "someone-else"})
+
+    assert reads() == {("primary", "read_your_writes"): 2, ("replica", "replica"): 1}
+    assert "x-write-token" not in read.headers
+
+
+def test_replica_down_falls_back_to_the_primary(client, create_task, reads, monkeypatch):
+    task = create_task("title")
+    monkeypatch.setattr(db, "_replica_down_until", time.monotonic() + 60)
+
+    assert client.get(f"/tasks/{task['id']}").status_code == 200
+    assert reads() == {("primary", "replica_unavailable"): 1}
+
+
+def test_no_write_token_without_replica(client, monkeypatch):
+    monkeypatch.setattr(middleware, "REPLICA_ENABLED", False)
+
+    response = client.post("/tasks", json={"title": "title", "request_timestamp": request_ts()})
+
+    assert response.status_code == 201
+    assert "x-write-token" not in response.headers
@@ -0,0 +1,72 @@
+"""
+Scheduled-ops executor: future-dated writes are applied once due, and every claimed op is
+counted exactly once, as applied or as dropped.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from conftest import request_ts, sql
+from core import scheduler
+
+
+@pytest.fixture
+def run_due_ops(client):
+    """
+    Make every queued op due and drain the queue once; returns the (applied, dropped)
+    counts of that run.
+    """
+
+    def run():
+        sql("UPDATE scheduled_ops SET execute_at = '2000-01-01 00:00:00'")
+        before = scheduler.metrics.snapshot()
+        client.portal.call(scheduler.process_due_scheduled_ops_once)
+        after = scheduler.metrics.snapshot()
+        return (
+            after["ops_applied_total"] - before["ops_applied_total"],
+            after["ops_dropped_total"] - before["ops_dropped_total"],
+        )
+
+    return run
+
+
+def _schedule_create(client, title, due_date="2026-05-01"):
+    response = client.post("/tasks", json={"title": title, "due_date": due_date, "request_timestamp": request_ts(3600)})
+    assert response.status_code == 201 and response.json()["scheduled"], response.text
+
+
+def test_scheduled_writes_are_applied(client, create_task, run_due_ops):
+    task = create_task("title")
+    gone = create_task("gone")
+    _schedule_create(client, "new")
+    client.put(f"/tasks/{task['id']}", json={"done": True, "request_timestamp": request_ts(3600)})
+    client.request("DELETE", f"/tasks/{gone['id']}", json={"request_timestamp": request_ts(3600)})
+
+    assert run_due_ops() == (3, 0)
+    assert sorted((t["title"], t["done"]) for t in client.get("/tasks").json()) == [("new", False), ("title", True)]
+    assert sql("SELECT COUNT(*) FROM scheduled_ops") == [(0,)]
+    assert client.get("/tasks/stats").json()["total"] == 2
+
+
+def test_duplicate_creates_in_one_batch(client, run_due_ops):
+    _schedule_create(client, "same")
+    _schedule_create(client, "same")
+
+    assert run_due_ops() == (1, 1)
+    assert len(client.get("/tasks").json()) == 1
+
+
+def test_create_losing_the_uniqueness_race_is_dropped(client, create_task, run_due_ops, monkeypatch):
+    for i in range(3):
+        _schedule_create(client, f"task {i}")
+    # The executor's pre-check does not see the immediate create: the INSERT itself fails
+    async def nothing_taken(conn, keys):
+        return {}
+
+    monkeypatch.setattr(scheduler, "fetch_taken_task_keys", nothing_taken)
+    create_task("task 1", due_date="2026-05-01")
+
+    assert run_due_ops() == (2, 1)
+    assert len(client.get("/tasks").json()) == 3
+    assert client.get("/tasks/stats").json()["total"] == 3
@@ -0,0 +1,71 @@
+"""
+GET /tasks/search on the SQLite backend: the in-process inverted index, ranked with BM25
+and kept in sync with writes.
+"""
+
+from __future__ import annotations
+
+from conftest import request_ts
+from core.search import InvertedIndexSearch, query_terms, tokenize
+
+
+def _titles(client, q, **params):
+    response = client.get("/tasks/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return [t["title"] for t in response.json()]
+
+
+def test_tokenize_like_innodb():
+    assert tokenize("The Quick brown-fox, 42 über_cool ok") == ["quick", "brown", "fox", "über_cool"]
+    assert query_terms("the a of") == []
+
+
+def test_bm25_ranking():
+    index = InvertedIndexSearch()
+    index._index(1, "report", "weekly report for the team")
+    index._index(2, "report report report", None)
+    index._index(3, "budget", "long budget notes that mention the report once among many other words")
+    index._index(4, "budget", None)
+
+    assert index._ranked_ids(["report"], 10) == [2, 1, 3]
+    assert index._ranked_ids(["report", "budget"], 10) == [3]
+    assert index._ranked_ids(["missing"], 10) == []
+    assert index._ranked_ids(["report"], 1) == [2]
+
+
+def test_search_requires_every_word(client, create_task):
+    create_task("Quarterly budget review", content="Prepare the slides")
+    create_task("Budget", content="travel")
+    create_task("Slides for the review")
+
+    assert _titles(client, "budget") == ["Budget", "Quarterly budget review"]
+    assert _titles(client, "REVIEW slides") == ["Slides for the review", "Quarterly budget review"]
+    assert _titles(client, "budget travel nothing") == []
+
+
+def test_search_follows_writes(client, create_task):
+    kept = create_task("alpha one")
+    removed = create_task("alpha two")
+    assert len(_titles(client, "alpha")) == 2
+
+    client.put(f"/tasks/{kept['id']}", json={"title": "beta one", "request_timestamp": request_ts()})
+    client.request("DELETE", f"/tasks/{removed['id']}", json={"request_timestamp": request_ts()})
+    create_task("alpha three")
+
+    assert _titles(client, "alpha") == ["alpha three"]
+    assert _titles(client, "beta") == ["beta one"]
+
+
+def test_pagination_and_validation(client, create_task):
+    for i in range(5):
+        create_task(f"page item {i}")
+
+    first = client.get("/tasks/search", params={"q": "page", "limit": 2})
+    second = client.get("/tasks/search", params={"q": "page", "limit": 2, "offset": first.headers["x-next-offset"]})
+    last = client.get("/tasks/search", params={"q": "page", "limit": 2, "offset": 4})
+
+    assert len(first.json()) == len(second.json()) == 2
+    assert {t["id"] for t in first.json()}.isdisjoint(t["id"] for t in second.json())
+    assert len(last.json()) == 1 and "x-next-offset" not in last.headers
+    assert client.get("/tasks/search", params={"q": "to of"}).status_code == 400
+    assert client.get("/tasks/search", params={"q": ""}).status_code == 400
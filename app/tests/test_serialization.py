@@ -0,0 +1,114 @@
+"""
+The fast JSON path (core.serialization) must produce the bytes the pydantic path
+(TaskOut validated, jsonable_encoder, JSONResponse) produced before it.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import sys
+from datetime import date, datetime
+from typing import Any, Dict, List
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from conftest import fetch_row, sql
+from core import serialization
+from core.db import row_to_task
+from core.models import TaskOut
+
+
+def _row(**fields: Any) -> Dict[str, Any]:
+    row = {
+        "id": 1,
+        "title": "title",
+        "content": "content",
+        "due_date": date(2026, 3, 1),
+        "done": 0,
+        "created_at": datetime(2026, 1, 2, 3, 4, 5),
+        "updated_at": datetime(2026, 1, 2, 3, 4, 5),
+        "last_request_ts": datetime(2026, 1, 2, 3, 4, 5, 123456),
+    }
+    row.update(fields)
+    return row
+
+
+# Rows as the MySQL driver returns them (DATETIME / DATE objects) ...
+EDGE_ROWS: List[Dict[str, Any]] = [
+    _row(),
+    _row(id=2, content=None),
+    _row(id=3, due_date=None),
+    _row(id=4, done=1, created_at=datetime(2026, 1, 2, 3, 4, 5, 999999), updated_at=datetime(2026, 1, 2, 3, 4, 5, 1)),
+    _row(id=5, title="Réunion 会議 🚀", content="naïve café line sep"),
+    _row(id=6, title='quote " backslash \\ tab \t', content="ctrl \x00\x01\x1f\x7f end"),
+    _row(id=7, title="", content="", done=None),
+]
+# ... and as SQLite returns them (strings)
+EDGE_ROWS += [
+    _row(id=8, due_date="2026-03-01", created_at="2026-01-02 03:04:05.654321", updated_at="2026-01-02 03:04:05"),
+    _row(id=9, due_date=None, content=None, created_at="2026-01-02 03:04:05.000001", updated_at="2026-01-02 03:04:05.5"),
+]
+
+
+def _pydantic_task(row: Dict[str, Any]) -> bytes:
+    return JSONResponse(jsonable_encoder(TaskOut(**row_to_task(row)))).body
+
+
+def _pydantic_page(rows: List[Dict[str, Any]]) -> bytes:
+    return JSONResponse(jsonable_encoder([TaskOut(**row_to_task(r)) for r in rows])).body
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    """
+    core.serialization as deployed (orjson) and as loaded without orjson installed.
+    """
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+        return serialization
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    spec = importlib.util.find_spec("core.serialization")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    assert module.ENCODER == "json"
+    return module
+
+
+@pytest.mark.parametrize("row", EDGE_ROWS, ids=lambda r: str(r["id"]))
+def test_task_json_matches_pydantic(encoder, row):
+    assert encoder.json_response(encoder.task_json(row)).body == _pydantic_task(row)
+
+
+def test_tasks_json_matches_pydantic(encoder):
+    assert encoder.json_response(encoder.tasks_json(EDGE_ROWS)).body == _pydantic_page(EDGE_ROWS)
+    assert encoder.tasks_json([]) == _pydantic_page([]) == b"[]"
+
+
+@pytest.mark.parametrize("row", EDGE_ROWS, ids=lambda r: str(r["id"]))
+def test_ndjson_line_matches_pydantic(encoder, row):
+    expected = TaskOut(**row_to_task(row)).model_dump_json().encode() + b"\n"
+    assert encoder.task_ndjson_line(row) == expected
+
+
+def test_timestamps_are_whole_seconds(encoder):
+    body = encoder.task_json(_row(created_at=datetime(2026, 1, 2, 3, 4, 5, 999999)))
+    assert b'"created_at":"2026-01-02T03:04:05Z"' in body
+
+
+def test_json_response_headers():
+    response = serialization.json_response(b"{}", status_code=201, headers={"etag": '"x"'})
+    assert response.status_code == 201
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["etag"] == '"x"'
+
+
+def test_api_responses_match_pydantic(client, create_task):
+    task = create_task("Réunion 会議 🚀", content="naïve café", due_date="2026-03-01")
+    create_task("no content")
+    sql("UPDATE tasks SET updated_at = '2026-01-02 03:04:05.987654' WHERE id = ?", (task["id"],))
+    rows = [fetch_row(task["id"]), fetch_row(task["id"] + 1)]
+
+    assert client.get(f"/tasks/{task['id']}").content == _pydantic_task(rows[0])
+    assert client.get("/tasks").content == _pydantic_page(rows)
@@ -0,0 +1,62 @@
+"""
+GET /tasks/stats, served from the task_stats counters maintained by every write, and the
+reconcile that corrects drift.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from conftest import request_ts, sql
+from core.db import get_db
+from core.stats import reconcile_task_stats
+
+
+def _recount():
+    rows = sql("SELECT done, COUNT(*) FROM tasks GROUP BY done")
+    return dict(rows)
+
+
+def test_counts_follow_writes(client, create_task):
+    today = datetime.now(timezone.utc).date()
+    week_end = today + timedelta(days=6 - today.weekday())
+    overdue = create_task("overdue", due_date=(today - timedelta(days=1)).isoformat())
+    create_task("today", due_date=today.isoformat())
+    create_task("week end", due_date=week_end.isoformat())
+    create_task("later", due_date=(week_end + timedelta(days=1)).isoformat())
+    no_date = create_task("no due date")
+    finished = create_task("finished", due_date=today.isoformat())
+    client.put(f"/tasks/{finished['id']}", json={"done": True, "request_timestamp": request_ts()})
+    client.put(f"/tasks/{overdue['id']}", json={"due_date": today.isoformat(), "request_timestamp": request_ts()})
+    client.request("DELETE", f"/tasks/{no_date['id']}", json={"request_timestamp": request_ts()})
+    client.post("/tasks:batch", json=[{"title": "batch", "request_timestamp": request_ts()}])
+
+    stats = client.get("/tasks/stats").json()
+
+    assert stats == {
+        "total": 6,
+        "open": 5,
+        "done": 1,
+        "overdue": 0,
+        "due_this_week": 3,
+        "no_due_date": 1,
+        "today": today.isoformat(),
+        "week_end": week_end.isoformat(),
+    }
+    assert _recount() == {0: 5, 1: 1}
+
+
+def test_reconcile_corrects_drift(client, create_task):
+    create_task("a", due_date="2026-05-01")
+    create_task("b")
+    # A write that missed its delta (e.g. manual SQL)
+    sql("INSERT INTO tasks (title, done, created_at, updated_at, last_request_ts) VALUES ('manual', 1, '2026-01-01 00:00:00', '2026-01-01 00:00:00', '2026-01-01 00:00:00')")
+    assert client.get("/tasks/stats").json()["total"] == 2
+
+    async def reconcile():
+        async with get_db() as conn:
+            return await reconcile_task_stats(conn)
+
+    assert client.portal.call(reconcile) == 1
+    assert client.get("/tasks/stats").json()["total"] == 3
+    assert client.portal.call(reconcile) == 0
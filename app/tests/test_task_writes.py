@@ -0,0 +1,88 @@
+"""
+Immediate updates and deletes: one locked read checks the request_timestamp rule, the
+write follows, and the update response is built from the merged values.
+"""
+
+from __future__ import annotations
+
+from conftest import request_ts, sql
+
+
+def _put(client, task_id, **fields):
+    return client.put(f"/tasks/{task_id}", json={"request_timestamp": request_ts(), **fields})
+
+
+def _delete(client, task_id, ts=None):
+    return client.request("DELETE", f"/tasks/{task_id}", json={"request_timestamp": ts or request_ts()})
+
+
+def test_update_merges_unset_fields(client, create_task):
+    task = create_task("title", content="content", due_date="2026-05-01")
+
+    response = _put(client, task["id"], done=True)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body == {**task, "done": True, "updated_at": body["updated_at"]}
+    assert client.get(f"/tasks/{task['id']}").json() == body
+
+
+def test_update_reads_the_row_once(client, create_task, statements):
+    task = create_task("title")
+    statements.clear()
+
+    assert _put(client, task["id"], title="renamed").json()["title"] == "renamed"
+
+    task_reads = [s for s in statements if s.startswith("SELECT") and "FROM tasks" in s]
+    assert len(task_reads) == 1
+    assert sum(s.startswith("UPDATE tasks") for s in statements) == 1
+
+
+def test_update_conflicts_with_older_or_equal_timestamp(client, create_task):
+    task = create_task("title")
+    stored = sql("SELECT last_request_ts FROM tasks WHERE id = ?", (task["id"],))[0][0]
+
+    older = _put(client, task["id"], title="x", request_timestamp="2000-01-01T00:00:00Z")
+    equal = _put(client, task["id"], title="x", request_timestamp=stored.replace(" ", "T") + "Z")
+
+    assert older.status_code == 409
+    assert equal.status_code == 409
+    assert client.get(f"/tasks/{task['id']}").json()["title"] == "title"
+
+
+def test_update_missing_task(client):
+    assert _put(client, 12345, title="x").status_code == 404
+
+
+def test_delete(client, create_task, statements):
+    task = create_task("title")
+    statements.clear()
+
+    response = _delete(client, task["id"])
+
+    assert response.status_code == 200
+    assert response.json() == {"id": task["id"], "deleted": True}
+    assert sum(s.startswith("DELETE FROM tasks WHERE id = ?") for s in statements) == 1
+    assert client.get(f"/tasks/{task['id']}").status_code == 404
+    assert sql("SELECT task_id FROM task_tombstones") == [(task["id"],)]
+    assert _delete(client, task["id"]).status_code == 404
+
+
+def test_delete_conflicts_with_older_timestamp(client, create_task):
+    task = create_task("title")
+
+    assert _delete(client, task["id"], "2000-01-01T00:00:00Z").status_code == 409
+    assert client.get(f"/tasks/{task['id']}").status_code == 200
+
+
+def test_future_update_is_scheduled_after_the_rule_check(client, create_task):
+    task = create_task("title")
+
+    scheduled = _put(client, task["id"], title="later", request_timestamp=request_ts(3600))
+    stale = _put(client, task["id"], title="x", request_timestamp="2000-01-01T00:00:00Z")
+
+    assert scheduled.status_code == 200
+    assert scheduled.json()["scheduled"] is True
+    assert stale.status_code == 409
+    assert sql("SELECT op_type, task_id FROM scheduled_ops") == [("update", task["id"])]
+    assert client.get(f"/tasks/{task['id']}").json()["title"] == "title"
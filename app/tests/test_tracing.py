@@ -0,0 +1,142 @@
+"""
+Request tracing: root span per sampled request (trace ID from the correlation ID or an
+incoming traceparent), error status, ratio sampling and the OTLP/JSON file exporter.
+"""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opentelemetry.trace import StatusCode
+
+from core import middleware, tracing
+from core.middleware import CorrelationIdMiddleware
+
+CORRELATION_ID = "0f8fad5b-d9cb-469f-a165-70867728950e"
+TRACEPARENT = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-{flags}"
+
+
+def _build_tracer(monkeypatch, ratio=1.0, exporter="memory"):
+    monkeypatch.setattr(tracing, "TRACING_ENABLED", True)
+    monkeypatch.setattr(tracing, "SAMPLE_RATIO", ratio)
+    monkeypatch.setattr(tracing, "EXPORTER", exporter)
+    test_tracer = tracing.build_tracer()
+    monkeypatch.setattr(middleware, "tracer", test_tracer)
+    return test_tracer
+
+
+@pytest.fixture
+def test_tracer(monkeypatch):
+    test_tracer = _build_tracer(monkeypatch)
+    yield test_tracer
+    test_tracer.shutdown()
+
+
+@pytest.fixture
+def app_client():
+    app = FastAPI()
+    app.add_middleware(CorrelationIdMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def _trace_id(span):
+    return "%032x" % span.context.trace_id
+
+
+def test_root_span_per_request(app_client, test_tracer):
+    app_client.get("/items/7", headers={"x-correlation-id": CORRELATION_ID})
+
+    [span] = test_tracer.exporter.get_finished_spans()
+    assert span.name == "GET /items/{item_id}"
+    assert span.parent is None
+    assert span.kind == tracing.SPAN_KIND_SERVER
+    assert _trace_id(span) == CORRELATION_ID.replace("-", "")
+    assert span.attributes["correlation_id"] == CORRELATION_ID
+    assert span.attributes["http.route"] == "/items/{item_id}"
+    assert span.attributes["http.status_code"] == 200
+    assert span.status.is_unset
+
+
+def test_trace_id_from_other_correlation_ids():
+    assert tracing.trace_id_from_correlation_id(CORRELATION_ID.upper()) == CORRELATION_ID.replace("-", "")
+    hashed = tracing.trace_id_from_correlation_id("req-1")
+    assert len(hashed) == 32
+    assert hashed == tracing.trace_id_from_correlation_id("req-1")
+
+
+def test_unhandled_error_marks_the_span(app_client, test_tracer):
+    response = app_client.get("/boom")
+
+    assert response.status_code == 500
+    [span] = test_tracer.exporter.get_finished_spans()
+    assert span.attributes["http.status_code"] == 500
+    assert span.status.status_code == StatusCode.ERROR
+    assert span.status.description == "RuntimeError: boom"
+    assert [event.name for event in span.events] == ["exception"]
+
+
+def test_traceparent_decides_sampling(app_client, test_tracer):
+    app_client.get("/items/1", headers={"traceparent": TRACEPARENT.format(flags="00")})
+    assert test_tracer.exporter.get_finished_spans() == ()
+
+    app_client.get("/items/1", headers={"traceparent": TRACEPARENT.format(flags="01")})
+    [span] = test_tracer.exporter.get_finished_spans()
+    assert _trace_id(span) == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert "%016x" % span.parent.span_id == "00f067aa0ba902b7"
+
+
+def test_ratio_sampling_is_per_trace_id(monkeypatch, app_client):
+    test_tracer = _build_tracer(monkeypatch, ratio=0.25)
+    try:
+        for i in range(400):
+            app_client.get("/items/1", headers={"x-correlation-id": f"req-{i}"})
+            app_client.get("/items/2", headers={"x-correlation-id": f"req-{i}"})
+        spans = test_tracer.exporter.get_finished_spans()
+    finally:
+        test_tracer.shutdown()
+
+    sampled = {span.attributes["correlation_id"] for span in spans}
+    # Both requests of a correlation ID are sampled, or neither
+    assert len(spans) == 2 * len(sampled)
+    assert 60 <= len(sampled) <= 140
+
+
+def test_disabled_tracing_records_nothing(monkeypatch, app_client):
+    monkeypatch.setattr(tracing, "TRACING_ENABLED", False)
+    monkeypatch.setattr(tracing, "EXPORTER", "memory")
+    test_tracer = tracing.build_tracer()
+    monkeypatch.setattr(middleware, "tracer", test_tracer)
+
+    app_client.get("/items/1", headers={"x-correlation-id": CORRELATION_ID})
+
+    assert test_tracer.start_trace("x") is tracing.NOOP_SPAN
+    assert test_tracer.exporter.get_finished_spans() == ()
+
+
+def test_file_exporter_writes_otlp_json(monkeypatch, tmp_path, app_client):
+    trace_file = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "TRACE_FILE", str(trace_file))
+    test_tracer = _build_tracer(monkeypatch, exporter="file")
+
+    app_client.get("/items/3", headers={"x-correlation-id": CORRELATION_ID})
+    test_tracer.shutdown()
+
+    [line] = trace_file.read_text().splitlines()
+    [resource_spans] = json.loads(line)["resourceSpans"]
+    [span] = resource_spans["scopeSpans"][0]["spans"]
+    assert span["traceId"] == CORRELATION_ID.replace("-", "")
+    assert span["name"] == "GET /items/{item_id}"
+    attributes = {a["key"]: a["value"] for a in span["attributes"]}
+    assert attributes["http.route"] == {"stringValue": "/items/{item_id}"}
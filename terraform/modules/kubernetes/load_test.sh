@@ -29,7 +29,8 @@ NC='\033[0m' # No Color
 LOAD_BALANCER_IP=${1:-""}
 CONCURRENT_REQUESTS=50
 DURATION=300  # 5 minutes
-REQUEST_RATE=10  # Requêtes par seconde
+REQUESTS_PER_WORKLOAD=3000  # Opérations par workload et par tour
+APP_DIR="$(cd "$(dirname "$0")/../../../app" && pwd)"
 
 # Fonction d'affichage
 print_header() {
@@ -73,6 +74,14 @@ check_prerequisites() {
     fi
     print_success "Accès au cluster Kubernetes OK"
     
+    # Vérifier la suite de benchmarks (python3 + httpx)
+    if ! (cd "$APP_DIR" && python3 -c "import benchmarks.suite") &> /dev/null; then
+        print_error "La suite de benchmarks n'est pas utilisable"
+        print_info "Exécutez : pip install -r $APP_DIR/benchmarks/requirements.txt"
+        exit 1
+    fi
+    print_success "Suite de benchmarks disponible"
+    
     # Vérifier si l'IP du Load Balancer est fournie
     if [ -z "$LOAD_BALANCER_IP" ]; then
         print_warning "IP du Load Balancer non fournie"
@@ -138,39 +147,32 @@ start_watchers() {
     echo ""
 }
 
-# Générer la charge
+# Générer la charge avec la suite de benchmarks Python (app/benchmarks/suite.py) :
+# des tours successifs de tous les workloads jusqu'à la fin de DURATION, un rapport
+# JSON (débit, latences p50/p95/p99, codes HTTP) par tour
 generate_load() {
     print_header "Génération de charge"
     
-    print_warning "Génération de $CONCURRENT_REQUESTS requêtes concurrentes pendant $DURATION secondes"
+    print_warning "Suite de benchmarks avec $CONCURRENT_REQUESTS clients concurrents pendant $DURATION secondes"
     print_info "URL cible : http://$LOAD_BALANCER_IP"
     print_info "Appuyez sur Ctrl+C pour arrêter"
     echo ""
     
-    # Utiliser Apache Bench si disponible
-    if command -v ab &> /dev/null; then
-        print_info "Utilisation d'Apache Bench (ab)"
-        ab -n $((DURATION * REQUEST_RATE)) -c $CONCURRENT_REQUESTS -t $DURATION "http://$LOAD_BALANCER_IP/" 2>&1 | tee "$LOG_DIR/load_test.log"
-    # Sinon utiliser curl en boucle
-    else
-        print_info "Apache Bench non disponible, utilisation de curl"
-        print_warning "Pour de meilleurs résultats, installez Apache Bench : apt-get install apache2-utils"
-        
-        END_TIME=$(($(date +%s) + DURATION))
-        REQUEST_COUNT=0
-        
-        while [ $(date +%s) -lt $END_TIME ]; do
-            for i in $(seq 1 $CONCURRENT_REQUESTS); do
-                curl -s -o /dev/null -w "%{http_code}\n" "http://$LOAD_BALANCER_IP/" >> "$LOG_DIR/load_test.log" 2>&1 &
-            done
-            REQUEST_COUNT=$((REQUEST_COUNT + CONCURRENT_REQUESTS))
-            echo -ne "\rRequêtes envoyées : $REQUEST_COUNT"
-            sleep 1
-        done
-        echo ""
-    fi
+    END_TIME=$(($(date +%s) + DURATION))
+    ROUND=0
+    
+    while [ $(date +%s) -lt $END_TIME ]; do
+        ROUND=$((ROUND + 1))
+        print_info "Tour $ROUND"
+        (cd "$APP_DIR" && python3 -m benchmarks.suite \
+            --target "http://$LOAD_BALANCER_IP" \
+            --concurrency $CONCURRENT_REQUESTS \
+            --requests $REQUESTS_PER_WORKLOAD \
+            --seed $ROUND \
+            --output "$LOG_DIR/bench_round_$ROUND.json" > /dev/null) 2>&1 | tee -a "$LOG_DIR/load_test.log"
+    done
     
-    print_success "Génération de charge terminée"
+    print_success "Génération de charge terminée ($ROUND tours)"
     echo ""
 }
 
@@ -213,8 +215,8 @@ cleanup() {
         print_success "Observateur de nœuds arrêté"
     fi
     
-    # Tuer tous les processus curl en arrière-plan
-    pkill -P $$ curl 2>/dev/null || true
+    # Arrêter la suite de benchmarks si elle tourne encore
+    pkill -f "benchmarks.suite --target http://$LOAD_BALANCER_IP" 2>/dev/null || true
 }
 
 # Afficher le rapport
@@ -237,6 +239,7 @@ show_report() {
     echo "  2. L'ajout de nouveaux nœuds (Cluster Autoscaler)"
     echo "  3. Les logs dans $LOG_DIR"
     echo "  4. Les métriques CPU/mémoire avec : kubectl top pods"
+    echo "  5. Débit et latences par tour : $LOG_DIR/bench_round_*.json"
     echo ""
 }
 